@@ -0,0 +1,80 @@
+"""Benchmark the batch price extractor on synthetic search snippets.
+
+Usage::
+
+    uv run python benchmarks/bench_price_extraction.py --snippets 5000
+
+Prints a JSON line with snippets/sec and µs per snippet so runs can be
+compared between commits.
+"""
+import argparse
+import json
+import random
+import time
+
+from pricewise.prices import extract_prices_batch, summarize_prices
+
+TEMPLATES = [
+    "{name} - ${p1} at Amazon. Free shipping on orders over $35.",
+    "Was ${p2}, now ${p1} at Best Buy. Save ${d} today only.",
+    "{name} deals range ${p1} - ${p2} across retailers, rated 4.5/5.",
+    "Buy {name} for {p1e} € at Fnac, livraison gratuite.",
+    "{name} review: great sound, list price ${p2}, street price around ${p1}.",
+    "Coffee pods ${u}/oz, {name} bundle ${p1k} with ${d} off coupon.",
+    "{name} is in stock at Walmart for ${p1} (was ${p2}).",
+    "No pricing information in this snippet about {name}, just specs and reviews.",
+]
+NAMES = ["Sony WH-1000XM5", "AirPods Pro 2", "Bose QC Ultra", "Dell XPS 15", "LG UltraWide 34"]
+
+
+def make_snippets(n: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    snippets = []
+    for i in range(n):
+        p1 = rng.uniform(20, 2500)
+        text = rng.choice(TEMPLATES).format(
+            name=rng.choice(NAMES),
+            p1=f"{p1:.2f}",
+            p2=f"{p1 * rng.uniform(1.1, 1.5):.2f}",
+            p1k=f"{p1 * 3:,.2f}",
+            p1e=f"{p1:,.2f}".replace(",", " ").replace(".", ",").replace(" ", "."),
+            d=rng.randint(5, 100),
+            u=f"{rng.uniform(0.2, 3):.2f}",
+        )
+        snippets.append({"url": f"https://retailer{i % 12}.com/item/{i}", "content": text})
+    return snippets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--snippets", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    snippets = make_snippets(args.snippets)
+    texts = [s["content"] for s in snippets]
+
+    extract_times, summarize_times = [], []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        mentions = extract_prices_batch(texts)
+        extract_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        summarize_prices(snippets)
+        summarize_times.append(time.perf_counter() - start)
+
+    best_extract = min(extract_times)
+    print(json.dumps({
+        "benchmark": "price_extraction",
+        "snippets": args.snippets,
+        "mentions": sum(len(m) for m in mentions),
+        "extract_best_s": round(best_extract, 4),
+        "snippets_per_s": round(args.snippets / best_extract),
+        "us_per_snippet": round(best_extract / args.snippets * 1e6, 2),
+        "summarize_best_s": round(min(summarize_times), 4),
+    }))
+
+
+if __name__ == "__main__":
+    main()
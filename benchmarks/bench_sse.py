@@ -0,0 +1,115 @@
+"""Benchmark SSE encoding of a streamed answer.
+
+Usage::
+
+    uv run python benchmarks/bench_sse.py --tokens 2000 --answers 200
+
+Feeds synthetic answers, one token per chunk arriving every
+``--token-interval-ms`` on a simulated clock, through three encoders:
+the old per-token ``json.dumps`` path, ``SSEEncoder`` with coalescing
+off, and the coalescing ``SSEEncoder``. Prints a JSON line with
+events/sec, frames (socket writes) and CPU µs per streamed answer.
+"""
+import argparse
+import json
+import random
+import time
+
+from pricewise.api.streaming import SSEEncoder
+
+WORDS = [
+    "The", " Sony", " WH", "-1000", "XM5", " is", " $", "348", ".99", " at", " Amazon", ",",
+    " down", " from", " $", "399", ".", " Reviews", " rate", " it", " 4", ".6", "/5", "\n",
+]
+
+
+def make_answer(n: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [rng.choice(WORDS) for _ in range(n)]
+
+
+class SimulatedClock:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def tick(self):
+        self.now += self.interval
+
+
+def legacy(tokens: list[str], clock) -> list[str]:
+    """One json.dumps'd event per token, as before."""
+    frames = []
+    for t in tokens:
+        clock.tick()
+        frames.append(f"event: token\ndata: {json.dumps({'content': t})}\n\n")
+    frames.append(f"event: done\ndata: {json.dumps({})}\n\n")
+    return frames
+
+
+def run_encoder(tokens: list[str], encoder: SSEEncoder, clock) -> list[str]:
+    frames = []
+    for t in tokens:
+        clock.tick()
+        frame = encoder.token(t)
+        if frame:
+            frames.append(frame)
+    frames.append(encoder.event("done", {}))
+    return frames
+
+
+def measure(name: str, answers: list[list[str]], interval: float, build) -> dict:
+    clock = SimulatedClock(interval)
+    frames = payload = 0
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for tokens in answers:
+        out = build(tokens, clock)
+        frames += len(out)
+        payload += sum(len(f) for f in out)
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    events = sum(len(a) + 1 for a in answers)
+    return {
+        "encoder": name,
+        "events_per_sec": round(events / wall),
+        "frames_per_answer": round(frames / len(answers), 1),
+        "bytes_per_answer": round(payload / len(answers)),
+        "cpu_us_per_answer": round(cpu / len(answers) * 1e6, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=2000, help="tokens per answer")
+    parser.add_argument("--answers", type=int, default=200)
+    parser.add_argument("--token-interval-ms", type=float, default=5.0)
+    parser.add_argument("--window-ms", type=float, default=20.0)
+    parser.add_argument("--max-bytes", type=int, default=1024)
+    args = parser.parse_args()
+
+    answers = [make_answer(args.tokens, seed) for seed in range(args.answers)]
+    interval = args.token_interval_ms / 1000
+
+    results = [
+        measure("legacy_json", answers, interval, legacy),
+        measure("per_token", answers, interval, lambda tokens, clock: run_encoder(
+            tokens, SSEEncoder(window_ms=0, max_bytes=0, clock=clock), clock)),
+        measure("coalesced", answers, interval, lambda tokens, clock: run_encoder(
+            tokens, SSEEncoder(window_ms=args.window_ms, max_bytes=args.max_bytes, clock=clock), clock)),
+    ]
+    print(json.dumps({
+        "tokens_per_answer": args.tokens,
+        "answers": args.answers,
+        "token_interval_ms": args.token_interval_ms,
+        "window_ms": args.window_ms,
+        "max_bytes": args.max_bytes,
+        "results": results,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Summarization calls and prompt tokens per turn against conversation length.
+
+Replays a synthetic shopping conversation through the summarization
+hook, calling it before each model step of the ReAct loop the way the
+agent does. Compares the rolling summary kept in state with the old
+behaviour of re-summarizing the full history on every call, and the
+message-count trigger with the token budget (``token_budget`` mode), with
+and without old tool outputs digested first.
+
+Usage::
+
+    uv run python benchmarks/bench_summarization.py --turns 40
+
+Prints a JSON object with, for each mode, the summarization calls and
+summary-prompt tokens at each turn, plus the average model-call prompt
+size, so runs can be compared between commits.
+"""
+import argparse
+import asyncio
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from pricewise.middleware.context_budget import ContextBudget
+from pricewise.middleware.summarization import (
+    create_summarization_hook,
+    get_prompt_token_stats,
+    get_summarization_stats,
+)
+from pricewise.replay import synthetic_prompts, synthetic_search
+
+
+class CountingModel:
+    """Returns a fixed-size summary; the hook's stats do the counting."""
+
+    async def ainvoke(self, messages):
+        return AIMessage(content=" ".join(["summary"] * 80))
+
+
+def turn_messages(i: int, prompt: str) -> list:
+    call_id = f"call_{i}"
+    results = synthetic_search(prompt)["results"]
+    return [
+        HumanMessage(content=prompt),
+        AIMessage(content="", tool_calls=[{"name": "compare_prices", "args": {"product_name": prompt}, "id": call_id}]),
+        ToolMessage(content="\n\n".join(r["content"] for r in results), tool_call_id=call_id, name="compare_prices"),
+        AIMessage(content=f"The best price I found for {prompt} is in the first result."),
+    ]
+
+
+async def run(turns: int, rolling: bool, budget: ContextBudget | None = None, evict: bool = True) -> list[dict]:
+    if budget is None:
+        hook = create_summarization_hook(CountingModel(), max_messages=5, evict_tools=evict)
+    else:
+        hook = create_summarization_hook(CountingModel(), budget=budget, evict_tools=evict)
+    stats = get_summarization_stats()
+    state: dict = {"messages": []}
+    series = []
+    for i, prompt in enumerate(synthetic_prompts(turns)):
+        before = stats.stats()
+        messages = turn_messages(i, prompt)
+        # Two model steps per turn: after the user message and after the tool result.
+        for upto in (1, 3):
+            view = {**state, "messages": state["messages"] + messages[:upto]}
+            update = await hook(view)
+            if rolling:
+                state.update({k: v for k, v in update.items() if k in ("summary", "summary_watermark")})
+        state["messages"] = state["messages"] + messages
+        after = stats.stats()
+        series.append({
+            "turn": i + 1,
+            "messages": len(state["messages"]),
+            "calls": after["calls"] - before["calls"],
+            "prompt_tokens": after["prompt_tokens"] - before["prompt_tokens"],
+        })
+    return series
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40)
+    args = parser.parse_args()
+
+    parser.add_argument("--budget-tokens", type=int, default=6000)
+    args = parser.parse_args()
+
+    report = {"benchmark": "summarization", "turns": args.turns}
+    budget = ContextBudget.from_total(args.budget_tokens)
+    modes = (
+        ("rolling", True, None, False),
+        ("full_resummarize", False, None, False),
+        ("token_budget", True, budget, False),
+        ("token_budget_evicted", True, budget, True),
+    )
+    for mode, rolling, budget, evict in modes:
+        prompt_stats = get_prompt_token_stats()
+        calls_before = prompt_stats.stats()["calls"]
+        total_before = prompt_stats.stats()["avg"] * calls_before
+        series = asyncio.run(run(args.turns, rolling, budget, evict))
+        calls = prompt_stats.stats()["calls"] - calls_before
+        total = prompt_stats.stats()["avg"] * prompt_stats.stats()["calls"] - total_before
+        report[mode] = {
+            "total_calls": sum(s["calls"] for s in series),
+            "total_prompt_tokens": sum(s["prompt_tokens"] for s in series),
+            "avg_model_prompt_tokens": round(total / max(calls, 1), 1),
+            "per_turn": series,
+        }
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,13 @@ to the old class-based AgentExecutor. Key advantages:
   - Built-in interrupt: human-in-the-loop via interrupt_before, no custom chains needed
   - Composable hooks: pre_model_hook for message management, response_format for output
 """
-from langchain.chat_models import init_chat_model
+import os
+
 from langgraph.prebuilt import create_react_agent
 from langgraph.checkpoint.memory import InMemorySaver
 
-from pricewise.schemas import Receipt
+from pricewise.models import ModelTiers, get_model_tiers
+from pricewise.state import PricewiseState
 from pricewise.tools import (
     search_product,
     compare_prices,
@@ -24,26 +26,69 @@ from pricewise.tools import (
     check_availability,
     delegate_research,
 )
-from pricewise.middleware.summarization import create_summarization_hook
-from pricewise.middleware.selective_interrupt import with_approval
+from pricewise.middleware.context_budget import ContextBudget
+from pricewise.middleware.receipt import create_receipt_hook
+from pricewise.middleware.summarization import create_summarization_hook, create_summary_precompute_hook
+from pricewise.middleware.selective_interrupt import APPROVAL_TOOLS, with_approval
+
+
+def _chain_hooks(*hooks):
+    """Run several post_model_hooks in order as one node, merging their updates."""
+    hooks = [h for h in hooks if h is not None]
+
+    async def chained(state: dict, config=None) -> dict:
+        update = {}
+        for hook in hooks:
+            update.update(await hook(state, config))
+        return update
 
+    return chained
 
-def build_agent(checkpointer=None):
+
+def build_agent(checkpointer=None, model=None, tiers: ModelTiers | None = None):
     """Build and return the compiled agent graph.
 
     The agent:
-      1. Uses gpt-4o via init_chat_model (provider-agnostic initialization)
+      1. Reasons with gpt-4o and leaves summaries and the Receipt to a small model (pricewise.models)
       2. Has tools for search, price comparison, reviews, budget, wishlist, and URL scraping
-      3. Summarizes conversation history after 5 messages (pre_model_hook)
+      3. Folds history beyond the context token budget into a rolling summary kept in state (pre_model_hook)
       4. Selectively pauses for approval: web-calling tools require HITL, safe tools auto-execute
-      5. Returns a structured Receipt as its final output (response_format)
+      5. Returns a structured Receipt as its final output (post_model_hook)
+
+    ``tiers`` defaults to the process-wide tiers from env. ``model`` runs
+    every job on one chat model instead, e.g. a ``pricewise.replay``
+    stand-in for offline runs.
     """
-    model = init_chat_model("gpt-4o", model_provider="openai")
+    if model is not None:
+        tiers = ModelTiers.single(model)
+    elif tiers is None:
+        tiers = get_model_tiers()
     if checkpointer is None:
         checkpointer = InMemorySaver()
 
-    # Summarization hook: compresses history when messages exceed threshold
-    summarization_hook = create_summarization_hook(model, max_messages=5)
+    # Summarization hook: compresses history once it outgrows the token
+    # budget (CONTEXT_BUDGET_TOKENS) for recent turns and tool outputs.
+    # SUMMARIZE_IN_BACKGROUND moves the summarizer off the critical path and
+    # starts the next turn's summary as soon as this turn's answer is out.
+    background = os.getenv("SUMMARIZE_IN_BACKGROUND", "false").lower() == "true"
+    # Old tool outputs are digested without a model call before that.
+    budget = ContextBudget.from_env()
+    evict_tools = os.getenv("EVICT_OLD_TOOL_OUTPUTS", "true").lower() == "true"
+    summarization_hook = create_summarization_hook(
+        tiers.summarization, background=background, budget=budget, evict_tools=evict_tools
+    )
+    precompute_hook = (
+        create_summary_precompute_hook(
+            tiers.summarization, budget=budget, evict_tools=evict_tools, approval_tools=APPROVAL_TOOLS,
+        )
+        if background else None
+    )
+    # The Receipt is built from the turn's tool artifacts after the final
+    # answer; the structured tier only runs when there are none (or with
+    # RECEIPT_MODE=llm).
+    local_receipt = os.getenv("RECEIPT_MODE", "local").lower() != "llm"
+    receipt_hook = create_receipt_hook(tiers.structured, local=local_receipt)
+    post_model_hook = _chain_hooks(precompute_hook, receipt_hook)
 
     # Unsafe tools (external API calls) require human approval.
     # Safe tools (pure computation, local state) auto-execute.
@@ -61,11 +106,12 @@ def build_agent(checkpointer=None):
     ]
 
     agent = create_react_agent(
-        model=model,
+        model=tiers.reasoning,
         tools=tools,
         checkpointer=checkpointer,
         pre_model_hook=summarization_hook,
-        response_format=Receipt,
+        post_model_hook=post_model_hook,
+        state_schema=PricewiseState,
     )
 
     return agent
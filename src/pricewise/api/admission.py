@@ -0,0 +1,224 @@
+"""Admission control and fair queuing for agent runs.
+
+Without a bound, a traffic spike slows every session down together and
+OpenAI rate-limit errors cascade into ``error`` events. Every run now
+takes a slot from the ``AdmissionController`` before it executes:
+
+  - at most ``limit`` runs execute at once; the rest queue
+  - the queue is fair: one FIFO per client (IP, or session when the IP
+    is unknown), served round-robin, so one busy client can't starve
+    the others
+  - a full queue (``ADMISSION_MAX_QUEUE`` overall or
+    ``ADMISSION_MAX_QUEUED_PER_CLIENT`` for one client) rejects the run
+    with ``QueueFull``, which the API turns into 429 with Retry-After
+  - ``limit`` adapts between ``ADMISSION_MIN_CONCURRENT`` and
+    ``RUN_MAX_CONCURRENT`` (AIMD): it grows by one per ``limit``
+    healthy runs and is cut by 30% when a run hits a rate limit or its
+    first event takes longer than ``ADMISSION_TARGET_LATENCY_MS``
+
+Queued runs report their position on the SSE stream (``queued``
+events); depth, waits and the current limit are under ``admission`` in
+``/metrics``.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable
+
+
+class QueueFull(Exception):
+    """The run was not queued; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Too many queued runs, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def is_rate_limit(exc: BaseException) -> bool:
+    """True if ``exc``, or an exception it was raised from, is an HTTP 429.
+
+    Covers the OpenAI SDK's ``RateLimitError`` (``status_code``) and httpx
+    ``HTTPStatusError`` (``response.status_code``).
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        status = getattr(exc, "status_code", None)
+        if status is None:
+            status = getattr(getattr(exc, "response", None), "status_code", None)
+        if status == 429:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class Ticket:
+    """One run's place in the admission queue."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.admitted = False
+        self.released = False
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    """Bounded, fair, adaptive admission of runs.
+
+    Args:
+        min_limit: Floor of the adaptive concurrency limit.
+        max_limit: Ceiling (and starting value) of the limit.
+        max_queue: Runs waiting at once, over all clients.
+        max_queued_per_client: Runs one client may have waiting.
+        target_latency: Seconds to a run's first event above which the limit backs off.
+    """
+
+    def __init__(
+        self,
+        min_limit: int = 4,
+        max_limit: int = 32,
+        max_queue: int = 256,
+        max_queued_per_client: int = 8,
+        target_latency: float = 5.0,
+    ):
+        self.min_limit = min(min_limit, max_limit)
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.max_queued_per_client = max_queued_per_client
+        self.target_latency = target_latency
+        self.limit = float(max_limit)
+        self.active = 0
+        self._queues: OrderedDict[str, deque[Ticket]] = OrderedDict()
+        self._queued = 0
+        self._changed = asyncio.Event()
+        self._lock = threading.Lock()
+        self._waits: deque[float] = deque(maxlen=1000)
+        self._run_seconds = 10.0  # EWMA of run durations, for Retry-After
+        self._stats = {"admitted": 0, "queued": 0, "rejected": 0, "backoffs": 0, "rate_limited": 0}
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        per_slot = self._run_seconds / max(1, int(self.limit))
+        return max(1, min(60, math.ceil((self._queued + 1) * per_slot)))
+
+    def enqueue(self, key: str) -> Ticket:
+        """Admit a run for ``key`` now or queue it; raises QueueFull if it can't wait."""
+        ticket = Ticket(key)
+        with self._lock:
+            if not self._queued and self.active < int(self.limit):
+                self._admit(ticket)
+                return ticket
+            queue = self._queues.get(key)
+            if self._queued >= self.max_queue or (queue and len(queue) >= self.max_queued_per_client):
+                self._stats["rejected"] += 1
+                raise QueueFull(self.retry_after())
+            if queue is None:
+                queue = self._queues[key] = deque()
+            queue.append(ticket)
+            self._queued += 1
+            self._stats["queued"] += 1
+        return ticket
+
+    def _admit(self, ticket: Ticket) -> None:
+        # Caller holds the lock.
+        ticket.admitted = True
+        self.active += 1
+        self._stats["admitted"] += 1
+        self._waits.append(time.monotonic() - ticket.enqueued_at)
+
+    def _dispatch(self) -> None:
+        """Admit queued runs round-robin across clients while slots are free."""
+        with self._lock:
+            while self._queued and self.active < int(self.limit):
+                key, queue = next(iter(self._queues.items()))
+                self._admit(queue.popleft())
+                self._queued -= 1
+                del self._queues[key]
+                if queue:
+                    self._queues[key] = queue  # back of the round
+        self._notify()
+
+    def position(self, ticket: Ticket) -> int:
+        """1-based place of a queued ticket in admission order (0 once admitted)."""
+        with self._lock:
+            if ticket.admitted:
+                return 0
+            queue = self._queues.get(ticket.key)
+            if queue is None or ticket not in queue:
+                return 0
+            index = queue.index(ticket)
+            ahead = index
+            before = True
+            for key, other in self._queues.items():
+                if key == ticket.key:
+                    before = False
+                    continue
+                # Each round serves one run per client, in ring order.
+                ahead += min(len(other), index + (1 if before else 0))
+            return ahead + 1
+
+    async def wait(self, ticket: Ticket, on_position: Callable[[int, int], None] | None = None) -> None:
+        """Wait until ``ticket`` is admitted, reporting (position, depth) as it moves."""
+        reported = None
+        while not ticket.admitted:
+            changed = self._changed
+            position = self.position(ticket)
+            if on_position is not None and position and position != reported:
+                on_position(position, self._queued)
+                reported = position
+            if ticket.admitted:
+                break
+            await changed.wait()
+
+    def release(self, ticket: Ticket, latency: float | None = None, rate_limited: bool = False,
+                duration: float | None = None) -> None:
+        """Give back ``ticket``'s slot (or its queue place) and adapt the limit.
+
+        ``latency`` is the seconds to the run's first event; with
+        ``rate_limited`` or a latency over target the limit backs off.
+        """
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            if not ticket.admitted:
+                queue = self._queues.get(ticket.key)
+                if queue is not None and ticket in queue:
+                    queue.remove(ticket)
+                    self._queued -= 1
+                    if not queue:
+                        del self._queues[ticket.key]
+            else:
+                self.active -= 1
+                if duration is not None:
+                    self._run_seconds = 0.8 * self._run_seconds + 0.2 * duration
+                if rate_limited:
+                    self._stats["rate_limited"] += 1
+                if rate_limited or (latency is not None and latency > self.target_latency):
+                    self.limit = max(float(self.min_limit), self.limit * 0.7)
+                    self._stats["backoffs"] += 1
+                elif latency is not None:
+                    self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        self._dispatch()
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                **self._stats,
+                "active": self.active,
+                "limit": int(self.limit),
+                "queue_depth": self._queued,
+                "queued_clients": len(self._queues),
+                "wait_ms": {
+                    "avg": round(sum(waits) / len(waits) * 1000, 1) if waits else None,
+                    "p95": round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 1) if waits else None,
+                },
+            }
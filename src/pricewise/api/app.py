@@ -3,12 +3,40 @@ import os
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from langgraph.checkpoint.memory import InMemorySaver
 
 from pricewise.agent import build_agent
+from pricewise.api.admission import AdmissionController
+from pricewise.api.events import EventBuffers
 from pricewise.api.routes import router
+from pricewise.api.runs import RunManager
+from pricewise.api.sessions import create_session_registry
+from pricewise.api.snapshots import ThreadSnapshots
+from pricewise.api.streaming import get_sse_stats
+from pricewise.middleware.summarization import (
+    get_prompt_token_stats,
+    get_summarization_stats,
+    get_summary_worker,
+)
+from pricewise.llm_cache import get_llm_cache
+from pricewise.middleware.prefetch import get_prefetcher
+from pricewise.middleware.receipt import get_receipt_stats
+from pricewise.middleware.selective_interrupt import get_approval_policy
+from pricewise.middleware.tool_eviction import get_tool_evictor
+from pricewise.models import get_model_stats
+from pricewise.replay import get_replay
+from pricewise.tools._client import (
+    get_compaction_stats,
+    get_profile_stats,
+    get_rerank_stats,
+    get_search_cache,
+    get_singleflight,
+)
+from pricewise.tokens import get_message_token_counter
+from pricewise.tools._http import close_http_pools
+from pricewise.tools._scheduler import get_research_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -16,15 +44,34 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     use_memory = os.getenv("USE_MEMORY_SAVER", "false").lower() == "true"
+    app.state.events = EventBuffers(
+        max_sessions=int(os.getenv("EVENT_BUFFER_SESSIONS", "1000")),
+        max_events=int(os.getenv("EVENT_BUFFER_SIZE", "2048")),
+        heartbeat=float(os.getenv("SSE_HEARTBEAT_SECONDS", "15")),
+    )
+    admission = AdmissionController(
+        min_limit=int(os.getenv("ADMISSION_MIN_CONCURRENT", "4")),
+        max_limit=int(os.getenv("RUN_MAX_CONCURRENT", "32")),
+        max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "256")),
+        max_queued_per_client=int(os.getenv("ADMISSION_MAX_QUEUED_PER_CLIENT", "8")),
+        target_latency=float(os.getenv("ADMISSION_TARGET_LATENCY_MS", "5000")) / 1000,
+    )
+    app.state.runs = RunManager(admission, max_history=int(os.getenv("RUN_HISTORY_SIZE", "1000")))
+    app.state.sessions = create_session_registry()
+    # Snapshots are only current while this process is the only one resuming its threads.
+    snapshot_size = 0 if app.state.sessions.backend.shared else int(os.getenv("SNAPSHOT_CACHE_SIZE", "10000"))
+    app.state.snapshots = ThreadSnapshots(max_threads=snapshot_size)
 
     try:
         if use_memory:
             logger.info("Starting with InMemorySaver")
             checkpointer = InMemorySaver()
             app.state.agent = build_agent(checkpointer=checkpointer)
-            app.state.sessions = {}
             logger.info("Agent ready (in-memory)")
-            yield
+            try:
+                yield
+            finally:
+                await app.state.runs.cancel_all()
         else:
             from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 
@@ -33,12 +80,21 @@ async def lifespan(app: FastAPI):
             async with AsyncPostgresSaver.from_conn_string(conn_string) as checkpointer:
                 await checkpointer.setup()
                 app.state.agent = build_agent(checkpointer=checkpointer)
-                app.state.sessions = {}
                 logger.info("Agent ready (postgres)")
-                yield
+                try:
+                    yield
+                finally:
+                    # Before the saver closes, so cancelled runs can still reach it.
+                    await app.state.runs.cancel_all()
     except Exception:
         logger.exception("Failed during startup")
         raise
+    finally:
+        app.state.sessions.close()
+        get_summary_worker().cancel_all()
+        await close_http_pools()
+        if get_replay() is not None:
+            get_replay().save()
 
 
 def create_app() -> FastAPI:
@@ -61,5 +117,33 @@ def create_app() -> FastAPI:
     async def health():
         return {"status": "ok"}
 
+    @app.get("/metrics")
+    async def metrics(request: Request):
+        return {
+            "search_cache": get_search_cache().stats(),
+            "single_flight": get_singleflight().stats(),
+            "research_scheduler": get_research_scheduler().stats(),
+            "compaction": get_compaction_stats().stats(),
+            "rerank": get_rerank_stats().stats(),
+            "search_profiles": get_profile_stats().stats(),
+            "summarization": {**get_summarization_stats().stats(), "worker": get_summary_worker().stats()},
+            "prompt_tokens": {
+                **get_prompt_token_stats().stats(),
+                "counter": get_message_token_counter().stats(),
+            },
+            "tool_eviction": get_tool_evictor().stats(),
+            "models": get_model_stats(),
+            "receipt": get_receipt_stats().stats(),
+            "llm_cache": get_llm_cache().stats(),
+            "approvals": get_approval_policy().stats(),
+            "prefetch": get_prefetcher().stats(),
+            "sessions": request.app.state.sessions.stats(),
+            "snapshots": request.app.state.snapshots.stats(),
+            "runs": request.app.state.runs.stats(),
+            "admission": request.app.state.runs.admission.stats(),
+            "sse": {**get_sse_stats().stats(), "buffers": request.app.state.events.stats()},
+            "replay": get_replay().stats() if get_replay() else None,
+        }
+
     app.include_router(router, prefix="/chat")
     return app
@@ -0,0 +1,176 @@
+"""Per-session SSE event buffers, so a dropped client can resume.
+
+Each agent run streams into its session's ``SessionEvents`` from a
+background task (:mod:`pricewise.api.runs`) rather than from the HTTP
+response, so the run keeps going (and its LLM and Tavily calls stay
+paid for once) when the client disconnects. Every frame carries an
+``id:``; the response, and any later reconnect that sends
+``Last-Event-ID``, replays the buffered frames after that id and then
+follows the run live until it finishes. Idle streams get a keepalive
+comment every ``SSE_HEARTBEAT_SECONDS``.
+
+Buffers are bounded: ``EVENT_BUFFER_SIZE`` frames per session (older
+frames fall off; a reconnect that has lost frames is told to ``reset``
+and reload the history) and ``EVENT_BUFFER_SESSIONS`` sessions (LRU).
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from typing import AsyncIterator
+
+from pricewise.api.streaming import format_sse_event
+
+
+def frame_id(frame: str) -> int | None:
+    if frame.startswith("id: "):
+        return int(frame[4:frame.index("\n")])
+    return None
+
+
+class SessionEvents:
+    """Ring buffer of one session's numbered SSE frames, with live followers.
+
+    Runs (see :mod:`pricewise.api.runs`) write into it; ``follow`` and
+    ``resume`` read either every run of the session or a single one.
+
+    Args:
+        max_events: Frames kept for replay.
+        heartbeat: Seconds of silence after which followers get an SSE
+                   comment, so idle-timeout proxies keep the stream open.
+    """
+
+    def __init__(self, max_events: int = 2048, heartbeat: float = 15.0):
+        self.max_events = max_events
+        self.heartbeat = heartbeat
+        self._frames: deque[tuple[int, str | None, str]] = deque(maxlen=max_events)
+        self._last_id = 0
+        self._active = 0
+        self._changed = asyncio.Event()
+
+    def next_id(self) -> int:
+        self._last_id += 1
+        return self._last_id
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    @property
+    def active(self) -> bool:
+        return self._active > 0
+
+    def begin(self) -> None:
+        """A run started writing to this session."""
+        self._active += 1
+
+    def end(self) -> None:
+        """A run stopped writing; followers waiting on it are woken."""
+        self._active -= 1
+        self._notify()
+
+    def append(self, chunk: str, run_id: str | None = None) -> None:
+        """Buffer ``chunk``'s frames and wake the followers."""
+        for frame in chunk.split("\n\n")[:-1]:
+            event_id = frame_id(frame)
+            if event_id is not None:
+                self._frames.append((event_id, run_id, frame + "\n\n"))
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def since(self, last_id: int, run_id: str | None = None) -> list[str] | None:
+        """Frames after ``last_id`` (of ``run_id`` only, if given), or None if some were dropped."""
+        if self._frames and last_id < self._frames[0][0] - 1:
+            return None
+        if not self._frames and last_id < self._last_id:
+            return None
+        return [
+            frame for event_id, frame_run, frame in self._frames
+            if event_id > last_id and (run_id is None or frame_run == run_id)
+        ]
+
+    def _done(self, run) -> bool:
+        # Checked before reading the buffer: a finished run has written everything.
+        return run.finished if run is not None else not self.active
+
+    async def follow(self, last_id: int, run=None) -> AsyncIterator[str]:
+        """Yield the frames after ``last_id``, then new ones as they come.
+
+        Follows every run of the session until none is active, or only
+        ``run`` until it finishes. Raises LookupError if frames after
+        ``last_id`` are no longer buffered.
+        """
+        run_id = run.id if run is not None else None
+        while True:
+            changed = self._changed
+            done = self._done(run)
+            frames = self.since(last_id, run_id)
+            if frames is None:
+                raise LookupError(last_id)
+            for frame in frames:
+                yield frame
+            if frames:
+                last_id = frame_id(frames[-1])
+            if done:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), self.heartbeat)
+            except TimeoutError:
+                yield ": keepalive\n\n"
+
+    async def resume(self, last_id: int, run=None) -> AsyncIterator[str]:
+        """``follow`` for a reconnecting client.
+
+        If frames after ``last_id`` were already dropped, sends a ``reset``
+        event (reload the history, e.g. via ``GET /messages``) and carries
+        on with the live frames.
+        """
+        while True:
+            try:
+                async for frame in self.follow(last_id, run):
+                    yield frame
+                return
+            except LookupError:
+                last_id = self._last_id
+                yield format_sse_event("reset", {"last_event_id": last_id})
+
+
+class EventBuffers:
+    """``SessionEvents`` per session, least recently used dropped first.
+
+    Args:
+        max_sessions: Sessions whose events are kept.
+        max_events: Frames kept per session.
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_events: int = 2048, heartbeat: float = 15.0):
+        self.max_sessions = max_sessions
+        self.max_events = max_events
+        self.heartbeat = heartbeat
+        self._sessions: OrderedDict[str, SessionEvents] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"reconnects": 0}
+
+    def get(self, session_id: str, create: bool = False) -> SessionEvents | None:
+        with self._lock:
+            events = self._sessions.get(session_id)
+            if events is None:
+                if not create:
+                    return None
+                events = self._sessions[session_id] = SessionEvents(self.max_events, self.heartbeat)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            return events
+
+    def record(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            active = sum(1 for events in self._sessions.values() if events.active)
+            return {**self._stats, "sessions": len(self._sessions), "active_runs": active}
@@ -1,11 +1,17 @@
-import uuid
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import StreamingResponse
+import os
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from langgraph.types import Command
 from pydantic import BaseModel
 from langchain_core.messages import AIMessageChunk, HumanMessage, AIMessage, ToolMessage
 
-from pricewise.api.streaming import format_sse_event
+from pricewise.api.admission import QueueFull, is_rate_limit
+from pricewise.api.runs import RunInProgress, RunOutcome
+from pricewise.api.snapshots import ThreadSnapshot, ThreadSnapshots
+from pricewise.api.streaming import SSEEncoder
+from pricewise.middleware.prefetch import get_prefetcher, prefetch_enabled
+from pricewise.middleware.selective_interrupt import APPROVAL_TOOLS, ToolCall, get_approval_policy
 from pricewise.tools.wishlist import session_id_var
 
 router = APIRouter()
@@ -25,122 +31,230 @@ class ApprovalRequest(BaseModel):
     approved: bool
 
 
+class TrustRequest(BaseModel):
+    tool: str
+    trusted: bool = True
+
+
 async def _get_session(request: Request, session_id: str) -> dict:
     """Look up a session or raise 404."""
-    sessions = request.app.state.sessions
-    if session_id in sessions:
-        return sessions[session_id]
 
-    # Check if the checkpointer has persisted state for this thread
-    agent = request.app.state.agent
-    config = {"configurable": {"thread_id": session_id}}
-    try:
-        state = await agent.aget_state(config)
+    async def rehydrate(thread_id: str) -> dict | None:
+        # A thread the checkpointer has saved messages for is a session.
+        config = {"configurable": {"thread_id": thread_id}}
+        state = await request.app.state.snapshots.read_state(request.app.state.agent, config)
         if state and state.values and state.values.get("messages"):
-            sessions[session_id] = {"thread_id": session_id}
-            return sessions[session_id]
-    except Exception:
-        pass
-
-    raise HTTPException(status_code=404, detail="Session not found")
+            return {"thread_id": thread_id}
+        return None
 
-
-async def _stream_agent(agent, config, input_value, session_id: str = "default"):
+    try:
+        session = await request.app.state.sessions.get(session_id, rehydrate)
+    except Exception as exc:
+        # Not cached as unknown: a transient checkpointer error must not 404 a real session.
+        raise HTTPException(status_code=503, detail="Session store unavailable") from exc
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+async def _stream_agent(
+    agent, config, input_value, session_id: str = "default",
+    snapshots: ThreadSnapshots | None = None, encoder: SSEEncoder | None = None,
+    outcome: RunOutcome | None = None,
+):
     """Shared SSE generator used by both message and approve endpoints.
 
+    Pending interrupts and the Receipt are read from the stream itself
+    (``__interrupt__`` and ``structured_response`` updates), so the
+    checkpoint is not loaded again once the stream ends.
+
     Args:
         agent: The compiled LangGraph agent.
         config: The LangGraph runnable config with thread_id.
         input_value: The input to pass to agent.astream (dict for new message,
                      Command(resume=...) for approval, None for legacy resume).
         session_id: Session ID for wishlist context.
+        snapshots: Where the thread's pending interrupts are recorded for
+                   the next request.
+        encoder: Coalesces token events into frames (default: from env).
+        outcome: Records the error, if the stream fails, for the run.
     """
+    encoder = encoder or SSEEncoder.from_env()
+    thread_id = config["configurable"]["thread_id"]
+    if snapshots is not None:
+        snapshots.invalidate(thread_id)
     token = session_id_var.set(session_id)
     try:
-        async for mode, payload in agent.astream(
-            input_value, config=config, stream_mode=["messages", "updates"]
-        ):
-            if mode == "messages":
+        interrupts = {}
+        structured = None
+        async for mode, payload in encoder.paced(agent.astream(
+            input_value, config=config, stream_mode=["messages", "updates", "custom"]
+        )):
+            if mode == "frame":
+                # Held tokens whose coalescing window ended while the graph was quiet.
+                yield payload
+            elif mode == "messages":
+                # Receipt JSON and summaries are produced with the "nostream"
+                # tag, so only the reasoning model's output arrives here.
                 message, _metadata = payload
-                # Skip structured Receipt JSON — it arrives via "receipt" event
-                if _metadata.get("langgraph_node") == "generate_structured_response":
-                    continue
                 if isinstance(message, AIMessageChunk):
                     if message.content:
-                        yield format_sse_event("token", {"content": message.content})
+                        frame = encoder.token(message.content)
+                        if frame:
+                            yield frame
                     if message.tool_calls:
                         for tc in message.tool_calls:
-                            yield format_sse_event("tool_call", {
+                            yield encoder.event("tool_call", {
                                 "name": tc["name"],
                                 "args": tc["args"],
                             })
             elif mode == "updates":
-                # Emit tool results when the tools node completes
                 if isinstance(payload, dict):
                     for node_name, node_output in payload.items():
-                        if node_name == "tools" and isinstance(node_output, dict):
-                            for msg in node_output.get("messages", []):
-                                if isinstance(msg, ToolMessage):
-                                    yield format_sse_event("tool_result", {
-                                        "name": msg.name or "",
-                                        "result": msg.content[:2000] if msg.content else "",
-                                    })
-
-        # After streaming completes, inspect the state
-        state = await agent.aget_state(config)
-
-        if state.next:
-            # Agent is interrupted — either from interrupt_before or per-tool interrupt().
-            # With per-tool interrupt(), the interrupt data is in state.tasks.
-            tool_calls = []
-            interrupt_ids = []
-            for task in state.tasks:
-                if hasattr(task, "interrupts") and task.interrupts:
-                    for intr in task.interrupts:
-                        if isinstance(intr.value, dict) and "tool" in intr.value:
-                            tool_calls.append({
-                                "name": intr.value["tool"],
-                                "args": intr.value.get("args", {}),
-                            })
-                            interrupt_ids.append(intr.id)
-
-            # Fallback: read tool_calls from the last AI message
-            if not tool_calls:
-                last_msg = state.values["messages"][-1]
-                if hasattr(last_msg, "tool_calls") and last_msg.tool_calls:
-                    tool_calls = [
-                        {"name": tc["name"], "args": tc["args"]}
-                        for tc in last_msg.tool_calls
-                    ]
+                        if node_name == "__interrupt__":
+                            # Per-tool interrupt() calls pausing the graph.
+                            for intr in node_output:
+                                interrupts.setdefault(intr.id, intr)
+                        elif isinstance(node_output, dict):
+                            if node_output.get("structured_response") is not None:
+                                structured = node_output["structured_response"]
+                            # Emit tool results when the tools node completes
+                            if node_name == "tools":
+                                for msg in node_output.get("messages", []):
+                                    if isinstance(msg, ToolMessage):
+                                        yield encoder.event("tool_result", {
+                                            "name": msg.name or "",
+                                            "result": msg.content[:2000] if msg.content else "",
+                                        })
+            elif mode == "custom":
+                # Progress pushed by tools through LangGraph's stream writer,
+                # e.g. each product from delegate_research as it finishes.
+                if isinstance(payload, dict) and "event" in payload:
+                    event = payload["event"]
+                    yield encoder.event(event, {k: v for k, v in payload.items() if k != "event"})
+
+        tool_calls = []
+        interrupt_ids = []
+        for intr in interrupts.values():
+            if isinstance(intr.value, dict) and "tool" in intr.value:
+                tool_calls.append({
+                    "name": intr.value["tool"],
+                    "args": intr.value.get("args", {}),
+                })
+                interrupt_ids.append(intr.id)
 
+        if interrupts:
             if tool_calls:
-                yield format_sse_event("approval_required", {
+                if prefetch_enabled():
+                    # Start read-only searches while the user decides; the
+                    # results stay private until the call is approved.
+                    for tc in tool_calls:
+                        get_prefetcher().start(ToolCall(tc["name"], tc["args"], thread_id, thread_id))
+                yield encoder.event("approval_required", {
                     "tool_calls": tool_calls,
                     "interrupt_ids": interrupt_ids,
                 })
-        else:
-            # Check for structured Receipt
-            structured = state.values.get("structured_response")
-            if structured:
-                yield format_sse_event("receipt", structured.model_dump())
+        elif structured is not None:
+            yield encoder.event("receipt", structured.model_dump())
 
-        yield format_sse_event("done", {})
+        if snapshots is not None:
+            snapshots.put(thread_id, ThreadSnapshot(tuple(interrupts)))
+        yield encoder.event("done", {})
 
     except Exception as exc:
-        yield format_sse_event("error", {"message": str(exc)})
-        yield format_sse_event("done", {})
+        error = {"message": str(exc)}
+        rate_limited = is_rate_limit(exc)
+        if rate_limited:
+            error["code"] = "rate_limited"
+        if outcome is not None:
+            outcome.error, outcome.rate_limited = str(exc), rate_limited
+        yield encoder.event("error", error) + encoder.event("done", {})
     finally:
         session_id_var.reset(token)
 
 
+def _trusted_proxies() -> frozenset[str]:
+    return frozenset(ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "").split(",") if ip.strip())
+
+
+def _client_key(request: Request, session_id: str) -> str:
+    """Whose turn in the fair queue a request is: its IP, else its session.
+
+    ``X-Forwarded-For`` is only believed when the connection comes from
+    one of ``TRUSTED_PROXIES`` (``*`` trusts any); the client is then the
+    last address in it that isn't a trusted proxy. Otherwise a client
+    could claim a new address per request and dodge the per-client limits.
+    """
+    host = request.client.host if request.client else None
+    proxies = _trusted_proxies()
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and host is not None and ("*" in proxies or host in proxies):
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if hop not in proxies:
+                return hop
+        if hops:
+            return hops[0]
+    return host or session_id
+
+
+def _run_in_progress(exc: RunInProgress) -> HTTPException:
+    return HTTPException(status_code=409, detail={"message": str(exc), "run_id": exc.run.id})
+
+
+def _check_idle(request: Request, session_id: str) -> None:
+    """409 if the session's previous run is still going (attach to it instead)."""
+    try:
+        request.app.state.runs.check_idle(session_id)
+    except RunInProgress as exc:
+        raise _run_in_progress(exc) from exc
+
+
+async def _start_run(request: Request, session_id: str, config: dict, input_value, detach: bool):
+    """Start the agent as a managed background run and attach this client to it.
+
+    The run writes into the session's event buffer, not the response, so
+    it carries on if the client disconnects; the client can re-attach
+    through ``GET /runs/{id}/events``. With ``detach`` the response is
+    just the run id, to poll with ``GET /runs/{id}``. Answers 409 while
+    the session has another unfinished run, and 429 with Retry-After when
+    admission control can't queue the run.
+    """
+    events = request.app.state.events.get(session_id, create=True)
+    outcome = RunOutcome()
+    frames = _stream_agent(
+        request.app.state.agent, config, input_value,
+        session_id=session_id,
+        snapshots=request.app.state.snapshots,
+        encoder=SSEEncoder.from_env(next_id=events.next_id),
+        outcome=outcome,
+    )
+    try:
+        run = request.app.state.runs.start(
+            session_id, events, frames, client=_client_key(request, session_id), outcome=outcome,
+        )
+    except RunInProgress as exc:
+        await frames.aclose()
+        raise _run_in_progress(exc) from exc
+    except QueueFull as exc:
+        await frames.aclose()
+        raise HTTPException(
+            status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+    if detach:
+        return JSONResponse(run.to_dict(), status_code=202)
+    return StreamingResponse(
+        events.follow(run.first_event_id, run),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Run-Id": run.id},
+    )
+
+
 @router.post("/sessions")
 async def create_session(request: Request):
     """Create a new chat session."""
-    session_id = str(uuid.uuid4())
-    request.app.state.sessions[session_id] = {
-        "thread_id": session_id,
-    }
-    return {"session_id": session_id}
+    session = request.app.state.sessions.create()
+    return {"session_id": session["session_id"]}
 
 
 @router.get("/sessions/{session_id}/messages")
@@ -150,7 +264,7 @@ async def get_messages(session_id: str, request: Request):
     agent = request.app.state.agent
     config = {"configurable": {"thread_id": session["thread_id"]}}
 
-    state = await agent.aget_state(config)
+    state = await request.app.state.snapshots.read_state(agent, config)
     raw_messages = state.values.get("messages", [])
 
     messages = []
@@ -173,50 +287,102 @@ async def get_messages(session_id: str, request: Request):
 
 
 @router.post("/sessions/{session_id}/messages")
-async def send_message(session_id: str, body: MessageRequest, request: Request):
+async def send_message(session_id: str, body: MessageRequest, request: Request, detach: bool = False):
     """Send a user message and stream the agent's response via SSE."""
     session = await _get_session(request, session_id)
-    agent = request.app.state.agent
+    _check_idle(request, session_id)
     config = {"configurable": {"thread_id": session["thread_id"]}}
+    # A new message abandons any approval still pending on the thread.
+    get_prefetcher().discard_thread(session["thread_id"])
 
-    return StreamingResponse(
-        _stream_agent(
-            agent, config,
-            {"messages": [("user", body.content)]},
-            session_id=session_id,
-        ),
-        media_type="text/event-stream",
-        headers=SSE_HEADERS,
-    )
+    return await _start_run(request, session_id, config, {"messages": [("user", body.content)]}, detach)
 
 
 @router.post("/sessions/{session_id}/approve")
-async def approve_tool(session_id: str, body: ApprovalRequest, request: Request):
+async def approve_tool(session_id: str, body: ApprovalRequest, request: Request, detach: bool = False):
     """Approve or deny pending tool calls, then stream the rest of the response."""
     session = await _get_session(request, session_id)
+    _check_idle(request, session_id)
     agent = request.app.state.agent
     config = {"configurable": {"thread_id": session["thread_id"]}}
 
     # Build resume value. Multiple interrupts require a dict of {id: value}.
-    state = await agent.aget_state(config)
-    interrupt_ids = [
-        intr.id
-        for task in state.tasks
-        if hasattr(task, "interrupts") and task.interrupts
-        for intr in task.interrupts
-    ]
+    snapshots = request.app.state.snapshots
+    snapshot = snapshots.get(session["thread_id"])
+    if snapshot is not None:
+        interrupt_ids = list(snapshot.interrupt_ids)
+    else:
+        # Nothing streamed on this thread since startup.
+        state = await snapshots.read_state(agent, config)
+        interrupt_ids = [intr.id for intr in state.interrupts]
 
     if len(interrupt_ids) > 1:
         resume_value = {iid: body.approved for iid in interrupt_ids}
+        get_approval_policy().record_batch(len(interrupt_ids))
     else:
         resume_value = body.approved
+    if not body.approved:
+        get_prefetcher().discard_thread(session["thread_id"])
 
+    return await _start_run(request, session_id, config, Command(resume=resume_value), detach)
+
+
+@router.post("/sessions/{session_id}/trust")
+async def trust_tool(session_id: str, body: TrustRequest, request: Request):
+    """Trust (or stop trusting) a tool, so its calls in this session skip approval."""
+    session = await _get_session(request, session_id)
+    if body.tool not in APPROVAL_TOOLS:
+        raise HTTPException(status_code=400, detail=f"Tool '{body.tool}' does not require approval")
+    trusted = get_approval_policy().trust(session["thread_id"], body.tool, body.trusted)
+    return {"trusted_tools": sorted(trusted)}
+
+
+@router.get("/sessions/{session_id}/events")
+async def resume_events(
+    session_id: str,
+    request: Request,
+    last_event_id: int = Header(0, alias="Last-Event-ID"),
+):
+    """Replay the events after ``Last-Event-ID``, then follow the run still in progress."""
+    events = request.app.state.events.get(session_id)
+    if events is None:
+        raise HTTPException(status_code=404, detail="No events for this session")
+    request.app.state.events.record("reconnects")
+    return StreamingResponse(events.resume(last_event_id), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def _get_run(request: Request, run_id: str):
+    run = request.app.state.runs.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+
+@router.get("/runs/{run_id}")
+async def get_run(run_id: str, request: Request):
+    """Status of a run."""
+    return _get_run(request, run_id).to_dict()
+
+
+@router.get("/runs/{run_id}/events")
+async def attach_run(
+    run_id: str,
+    request: Request,
+    last_event_id: int | None = Header(None, alias="Last-Event-ID"),
+):
+    """Attach to a run: its events after ``Last-Event-ID`` (default: all), then live until it ends."""
+    run = _get_run(request, run_id)
+    request.app.state.events.record("reconnects")
+    after = run.first_event_id if last_event_id is None else last_event_id
     return StreamingResponse(
-        _stream_agent(
-            agent, config,
-            Command(resume=resume_value),
-            session_id=session_id,
-        ),
+        run.events.resume(after, run),
         media_type="text/event-stream",
-        headers=SSE_HEADERS,
+        headers={**SSE_HEADERS, "X-Run-Id": run.id},
     )
+
+
+@router.post("/runs/{run_id}/cancel")
+async def cancel_run(run_id: str, request: Request):
+    """Cancel a queued or running run. Attached clients get ``cancelled`` and ``done``."""
+    _get_run(request, run_id)
+    return request.app.state.runs.cancel(run_id).to_dict()
@@ -0,0 +1,218 @@
+"""Agent runs as managed background tasks.
+
+A run executes ``_stream_agent`` for one message or approval and writes
+its frames into the session's event buffer (:mod:`pricewise.api.events`).
+HTTP requests only attach to it: any number of connections can follow
+a run, drop, and re-attach with ``Last-Event-ID``, or not follow it at
+all and poll ``GET /runs/{id}`` instead. That keeps every request short
+enough for a CDN or proxy with aggressive timeouts.
+
+A session has at most one unfinished run: two would resume the same
+interrupt or interleave writes to one checkpoint, so a second message or
+approval while one is running is refused (409 from the API, with the
+run to attach to).
+
+Runs take a slot from the :class:`AdmissionController` before they
+execute and wait as ``queued`` (with ``queued`` position events) until
+they get one. Finished runs are remembered (for status and replay) up
+to ``RUN_HISTORY_SIZE``.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from pricewise.api.admission import AdmissionController
+from pricewise.api.events import SessionEvents
+from pricewise.api.streaming import format_sse_event
+
+FINISHED = ("completed", "failed", "cancelled")
+
+
+class RunInProgress(Exception):
+    """The session already has a run that hasn't finished."""
+
+    def __init__(self, run: "Run"):
+        super().__init__(f"Run {run.id} is still in progress for this session")
+        self.run = run
+
+
+@dataclass
+class RunOutcome:
+    """How the agent stream ended, filled in by ``_stream_agent`` as it fails.
+
+    Lets the run judge the failure from the exception itself rather than
+    from the frames it was serialized into.
+    """
+
+    error: str | None = None
+    rate_limited: bool = False
+
+
+class Run:
+    """One agent run and where its events go."""
+
+    def __init__(self, session_id: str, events: SessionEvents, outcome: RunOutcome | None = None):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.events = events
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        # Frames of this run have ids after this one.
+        self.first_event_id = events.last_id
+        self.last_event_id = events.last_id
+        self.task: asyncio.Task | None = None
+        self.outcome = outcome or RunOutcome()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def to_dict(self) -> dict:
+        return {
+            "run_id": self.id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "last_event_id": self.last_event_id,
+        }
+
+
+class RunManager:
+    """Starts, tracks and cancels runs, admitted by ``admission``.
+
+    Args:
+        admission: Decides when each run may execute.
+        max_history: Finished runs remembered for status and replay.
+    """
+
+    def __init__(self, admission: AdmissionController | None = None, max_history: int = 1000):
+        self.admission = admission or AdmissionController()
+        self.max_history = max_history
+        self._runs: OrderedDict[str, Run] = OrderedDict()
+        self._active: dict[str, Run] = {}
+        self._lock = threading.Lock()
+        self._stats = {"started": 0, "completed": 0, "failed": 0, "cancelled": 0, "conflicts": 0}
+
+    def start(
+        self, session_id: str, events: SessionEvents, frames: AsyncIterator[str], client: str | None = None,
+        outcome: RunOutcome | None = None,
+    ) -> Run:
+        """Run ``frames`` (a ``_stream_agent`` generator) in the background.
+
+        ``client`` keys the fair queue (default: the session). ``outcome``
+        is the one the generator records its failure in. Raises,
+        before anything starts, RunInProgress if the session already has
+        an unfinished run (two runs would resume or write the same
+        checkpoint) and QueueFull if the run can't be queued.
+        """
+        self.check_idle(session_id)
+        ticket = self.admission.enqueue(client or session_id)
+        run = Run(session_id, events, outcome)
+        events.begin()
+
+        def report_position(position: int, depth: int) -> None:
+            events.append(
+                format_sse_event("queued", {"position": position, "queue_depth": depth}, events.next_id()),
+                run.id,
+            )
+            run.last_event_id = events.last_id
+
+        async def execute():
+            latency = None
+            try:
+                await self.admission.wait(ticket, report_position)
+                run.status, run.started_at = "running", time.time()
+                async for chunk in frames:
+                    if latency is None:
+                        latency = time.time() - run.started_at
+                    events.append(chunk, run.id)
+                    run.last_event_id = events.last_id
+                run.status = "failed" if run.outcome.error is not None else "completed"
+            except asyncio.CancelledError:
+                await frames.aclose()
+                run.status = "cancelled"
+                events.append(
+                    format_sse_event("cancelled", {"run_id": run.id}, events.next_id())
+                    + format_sse_event("done", {}, events.next_id()),
+                    run.id,
+                )
+                run.last_event_id = events.last_id
+            finally:
+                if not run.finished:
+                    run.status = "failed"
+                run.finished_at = time.time()
+                duration = run.finished_at - run.started_at if run.started_at else None
+                self.admission.release(ticket, latency, run.outcome.rate_limited, duration)
+                self._finish(run)
+                events.end()
+
+        run.task = asyncio.create_task(execute())
+        with self._lock:
+            self._runs[run.id] = run
+            self._active[session_id] = run
+            self._stats["started"] += 1
+        return run
+
+    def _finish(self, run: Run) -> None:
+        with self._lock:
+            self._stats[run.status] += 1
+            if self._active.get(run.session_id) is run:
+                del self._active[run.session_id]
+            finished = [r for r in self._runs.values() if r.finished]
+            for old in finished[:max(0, len(finished) - self.max_history)]:
+                del self._runs[old.id]
+
+    def get(self, run_id: str) -> Run | None:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def active(self, session_id: str) -> Run | None:
+        """The session's unfinished run, if any."""
+        with self._lock:
+            return self._active.get(session_id)
+
+    def check_idle(self, session_id: str) -> None:
+        """Raise RunInProgress if ``session_id`` has an unfinished run."""
+        with self._lock:
+            active = self._active.get(session_id)
+            if active is not None:
+                self._stats["conflicts"] += 1
+        if active is not None:
+            raise RunInProgress(active)
+
+    def cancel(self, run_id: str) -> Run | None:
+        """Cancel a queued or running run; returns it, or None if unknown."""
+        run = self.get(run_id)
+        if run is not None and not run.finished and run.task is not None:
+            run.task.cancel()
+        return run
+
+    async def cancel_all(self) -> None:
+        """Cancel every unfinished run and wait for them to wind down.
+
+        Call it while the checkpointer is still open: cancelled runs close
+        their agent streams, which may still touch it.
+        """
+        with self._lock:
+            tasks = [r.task for r in self._runs.values() if not r.finished and r.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [r.status for r in self._runs.values()]
+            return {
+                **self._stats,
+                "queued": statuses.count("queued"),
+                "running": statuses.count("running"),
+            }
@@ -0,0 +1,303 @@
+"""Session registry: bounded, shared between workers, rehydrated on demand.
+
+``app.state.sessions`` used to be a plain dict that grew by one entry
+per ``POST /chat/sessions`` forever, and an unknown id cost a
+checkpointer query on every request. ``SessionRegistry`` looks a
+session up in order:
+
+  1. a per-process LRU capped at ``SESSION_CACHE_SIZE`` entries and
+     dropped after ``SESSION_TTL`` idle seconds
+  2. a negative cache of ids recently found nowhere
+     (``SESSION_NEGATIVE_TTL``), so bots probing random ids cost nothing
+  3. the shared backend, where ``create`` writes every session so any
+     uvicorn worker can serve it
+  4. the checkpointer (lazy rehydration): a thread with saved messages
+     is a session even if every cache has forgotten it
+
+Backends store a small dict per session id with an expiry. ``memory``
+(default) is per process; ``sqlite`` is a file every worker on the
+host can open (``SESSION_DB_PATH``), and the stand-in for a networked
+store (Redis, Postgres) implementing the same three methods.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Protocol
+
+_UNKNOWN = object()
+
+
+class SessionBackend(Protocol):
+    # Whether other workers read and write the same sessions.
+    shared: bool
+
+    def get(self, session_id: str) -> dict | None: ...
+
+    def put(self, session_id: str, session: dict, ttl: float) -> None: ...
+
+    def touch(self, session_id: str, ttl: float) -> bool: ...
+
+    def delete(self, session_id: str) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class MemoryBackend:
+    """Per-process backend; sessions are not shared between workers."""
+
+    shared = False
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[session_id]
+                return None
+            return dict(entry[1])
+
+    def put(self, session_id: str, session: dict, ttl: float) -> None:
+        with self._lock:
+            self._entries[session_id] = (time.time() + ttl, dict(session))
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def touch(self, session_id: str, ttl: float) -> bool:
+        """Push back ``session_id``'s expiry; False if it isn't stored."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[0] <= time.time():
+                return False
+            self._entries[session_id] = (time.time() + ttl, entry[1])
+            self._entries.move_to_end(session_id)
+            return True
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBackend:
+    """Sessions in a SQLite file shared by every worker that opens it."""
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, session_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data, expires_at FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def put(self, session_id: str, session: dict, ttl: float) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(session), time.time() + ttl),
+            )
+            self._db.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+
+    def touch(self, session_id: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE sessions SET expires_at = ? WHERE id = ? AND expires_at > ?",
+                (now + ttl, session_id, now),
+            )
+            self._db.commit()
+        return cursor.rowcount > 0
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class SessionRegistry:
+    """Finds sessions through a local LRU, a negative cache, the backend and the checkpointer.
+
+    Args:
+        backend: Shared store ``create`` writes to (default: in memory).
+        max_sessions: Sessions cached in this process.
+        ttl: Idle seconds before a session is dropped, here and in the
+             backend. Use refreshes the backend's expiry too, at most
+             every ``refresh_interval`` seconds per session, so other
+             workers keep a session this one is serving.
+        negative_ttl: Seconds an unknown id is remembered as unknown.
+        max_negative: Unknown ids remembered.
+        refresh_interval: Default: a tenth of ``ttl``.
+    """
+
+    def __init__(
+        self,
+        backend: SessionBackend | None = None,
+        max_sessions: int = 10_000,
+        ttl: float = 24 * 60 * 60,
+        negative_ttl: float = 60.0,
+        max_negative: int = 10_000,
+        refresh_interval: float | None = None,
+    ):
+        self.backend = backend or MemoryBackend()
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_negative = max_negative
+        self.refresh_interval = ttl / 10 if refresh_interval is None else refresh_interval
+        # session id -> (last used, backend expiry last refreshed, session)
+        self._sessions: OrderedDict[str, tuple[float, float, dict]] = OrderedDict()
+        self._unknown: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "created": 0,
+            "hits": 0,
+            "backend_hits": 0,
+            "rehydrated": 0,
+            "negative_hits": 0,
+            "not_found": 0,
+            "evictions": 0,
+            "refreshes": 0,
+        }
+
+    def _cache(self, session_id: str, session: dict) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._sessions[session_id] = (now, now, session)
+            self._sessions.move_to_end(session_id)
+            self._unknown.pop(session_id, None)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _remember(self, session_id: str, session: dict) -> dict:
+        self.backend.put(session_id, session, self.ttl)
+        self._cache(session_id, session)
+        return session
+
+    def create(self) -> dict:
+        session_id = str(uuid.uuid4())
+        session = self._remember(session_id, {"thread_id": session_id})
+        with self._lock:
+            self._stats["created"] += 1
+        return {"session_id": session_id, **session}
+
+    def _local(self, session_id: str):
+        """The cached session, ``_UNKNOWN`` if known not to exist, else None."""
+        now = time.monotonic()
+        session = None
+        refresh = False
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                used, refreshed, cached = entry
+                if now - used < self.ttl:
+                    session = cached
+                    refresh = now - refreshed >= self.refresh_interval
+                    self._sessions[session_id] = (now, now if refresh else refreshed, cached)
+                    self._sessions.move_to_end(session_id)
+                    self._stats["hits"] += 1
+                    self._stats["refreshes"] += refresh
+                else:
+                    del self._sessions[session_id]
+                    self._stats["evictions"] += 1
+            if session is None:
+                expires_at = self._unknown.get(session_id)
+                if expires_at is not None:
+                    if expires_at > now:
+                        self._stats["negative_hits"] += 1
+                        return _UNKNOWN
+                    del self._unknown[session_id]
+        if refresh and not self.backend.touch(session_id, self.ttl):
+            # Expired or evicted in the backend while in use here.
+            self.backend.put(session_id, session, self.ttl)
+        return session
+
+    async def get(
+        self, session_id: str, rehydrate: Callable[[str], Awaitable[dict | None]] | None = None,
+    ) -> dict | None:
+        """The session, or None if it exists nowhere.
+
+        ``rehydrate`` rebuilds a session from persisted state (the
+        checkpointer) when neither cache nor backend knows it. Its
+        errors propagate and the id is not remembered as unknown.
+        """
+        session = self._local(session_id)
+        if session is _UNKNOWN:
+            return None
+        if session is not None:
+            return session
+
+        session = self.backend.get(session_id)
+        if session is not None:
+            with self._lock:
+                self._stats["backend_hits"] += 1
+            return self._remember(session_id, session)
+
+        if rehydrate is not None:
+            session = await rehydrate(session_id)
+            if session is not None:
+                with self._lock:
+                    self._stats["rehydrated"] += 1
+                return self._remember(session_id, session)
+
+        with self._lock:
+            self._stats["not_found"] += 1
+            self._unknown[session_id] = time.monotonic() + self.negative_ttl
+            self._unknown.move_to_end(session_id)
+            while len(self._unknown) > self.max_negative:
+                self._unknown.popitem(last=False)
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "size": len(self._sessions), "unknown": len(self._unknown)}
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def create_session_registry() -> SessionRegistry:
+    """Build the registry from env (``SESSION_BACKEND=memory|sqlite`` and friends)."""
+    backend: SessionBackend
+    if os.getenv("SESSION_BACKEND", "memory") == "sqlite":
+        backend = SQLiteBackend(os.getenv("SESSION_DB_PATH", "sessions.db"))
+    else:
+        backend = MemoryBackend()
+    return SessionRegistry(
+        backend,
+        max_sessions=int(os.getenv("SESSION_CACHE_SIZE", "10000")),
+        ttl=float(os.getenv("SESSION_TTL", str(24 * 60 * 60))),
+        negative_ttl=float(os.getenv("SESSION_NEGATIVE_TTL", "60")),
+    )
@@ -0,0 +1,75 @@
+"""Per-thread snapshot of what the last stream left behind.
+
+Every ``aget_state`` loads the thread's whole checkpoint, all messages
+included; with ``AsyncPostgresSaver`` that is a query per call. The
+pending interrupts are already in the stream (``__interrupt__``
+updates), so ``_stream_agent`` records their ids here as it goes and
+``approve_tool`` reads them back instead of the checkpoint.
+
+The snapshot is write-through: it is invalidated when a stream on the
+thread starts and written when the stream finishes, so a failed or
+still-running stream never leaves a stale one behind. A miss falls back
+to the checkpoint through ``read_state``, which counts every read.
+
+A snapshot is only current while this process is the thread's only
+writer. With a shared session backend another worker may resume the
+thread, so the app then turns the cache off (``max_threads=0``) and
+every approval reads the checkpoint.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ThreadSnapshot:
+    interrupt_ids: tuple[str, ...] = ()
+
+
+class ThreadSnapshots:
+    """LRU of the latest snapshot per thread, plus checkpoint read counts.
+
+    Args:
+        max_threads: Threads whose snapshot is kept; 0 keeps none.
+    """
+
+    def __init__(self, max_threads: int = 10_000):
+        self.max_threads = max_threads
+        self._snapshots: OrderedDict[str, ThreadSnapshot] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "checkpoint_reads": 0}
+
+    def get(self, thread_id: str) -> ThreadSnapshot | None:
+        with self._lock:
+            snapshot = self._snapshots.get(thread_id)
+            if snapshot is None:
+                self._stats["misses"] += 1
+                return None
+            self._snapshots.move_to_end(thread_id)
+            self._stats["hits"] += 1
+            return snapshot
+
+    def put(self, thread_id: str, snapshot: ThreadSnapshot) -> None:
+        if self.max_threads <= 0:
+            return
+        with self._lock:
+            self._snapshots[thread_id] = snapshot
+            self._snapshots.move_to_end(thread_id)
+            while len(self._snapshots) > self.max_threads:
+                self._snapshots.popitem(last=False)
+
+    def invalidate(self, thread_id: str) -> None:
+        with self._lock:
+            if self._snapshots.pop(thread_id, None) is not None:
+                self._stats["invalidations"] += 1
+
+    async def read_state(self, agent, config):
+        """``agent.aget_state(config)``, counted."""
+        with self._lock:
+            self._stats["checkpoint_reads"] += 1
+        return await agent.aget_state(config)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "threads": len(self._snapshots)}
@@ -1,14 +1,199 @@
+"""Server-Sent Event encoding.
+
+A streamed answer arrives as thousands of small AIMessageChunks. Sent
+one event each, every chunk costs a JSON encode, a socket write and a
+proxy flush. ``SSEEncoder`` merges consecutive ``token`` events into
+one frame until the coalescing window closes:
+
+  - ``SSE_COALESCE_MS``: the oldest held token waits at most this long,
+    also when nothing else arrives (``SSEEncoder.paced``)
+  - ``SSE_COALESCE_BYTES``: held token text is flushed at this size
+
+Any other event (tool_call, approval_required, receipt, done, ...)
+flushes the held tokens first and goes out at once. Setting both knobs
+to 0 sends every token as its own event. Payloads are serialized
+exactly as before (``json.dumps`` defaults), so clients that match on
+the raw ``data:`` text keep working; only how many events share a
+write changes.
+"""
+
+import asyncio
 import json
+import os
+import threading
+import time
+from contextlib import suppress
+from typing import AsyncGenerator, AsyncIterator, Callable
+
 
+def dumps(data) -> str:
+    """JSON for an event payload, byte-compatible with the original wire format."""
+    return json.dumps(data, default=str)
 
-def format_sse_event(event: str, data: dict) -> str:
+
+def format_sse_event(event: str, data: dict, event_id: int | None = None) -> str:
     """Format a Server-Sent Event string.
 
     Args:
         event: Event type name (e.g. "token", "approval_required", "done")
         data: Event payload dict, will be JSON-serialized
+        event_id: Sent as the ``id:`` field, which the client echoes back
+                  as ``Last-Event-ID`` when it reconnects.
 
     Returns:
         Formatted SSE string: "event: <type>\\ndata: <json>\\n\\n"
     """
-    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    if event_id is not None:
+        return f"id: {event_id}\nevent: {event}\ndata: {dumps(data)}\n\n"
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+class SSEStats:
+    """Events handed to the encoder vs. frames actually written."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"events": 0, "tokens": 0, "frames": 0, "bytes": 0}
+
+    def record(self, events: int, tokens: int, frame: str) -> None:
+        with self._lock:
+            self._stats["events"] += events
+            self._stats["tokens"] += tokens
+            self._stats["frames"] += 1
+            self._stats["bytes"] += len(frame)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        frames = stats["frames"]
+        return {**stats, "events_per_frame": round(stats["events"] / frames, 2) if frames else None}
+
+
+_stats = SSEStats()
+
+
+def get_sse_stats() -> SSEStats:
+    return _stats
+
+
+class SSEEncoder:
+    """Turns one stream's events into SSE frames, coalescing tokens.
+
+    Args:
+        window_ms: Longest a held token waits for more to join it; 0 disables.
+        max_bytes: Held token text flushed at this size; 0 disables.
+        clock: Seconds source, replaceable for benchmarks.
+        next_id: Numbers each frame; without it frames carry no ``id:``.
+    """
+
+    def __init__(
+        self, window_ms: float = 20.0, max_bytes: int = 1024, clock=time.perf_counter,
+        next_id: Callable[[], int] | None = None,
+    ):
+        self.window = window_ms / 1000
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.next_id = next_id
+        self._held: list[str] = []
+        self._held_bytes = 0
+        self._held_since = 0.0
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "SSEEncoder":
+        return cls(
+            window_ms=float(os.getenv("SSE_COALESCE_MS", "20")),
+            max_bytes=int(os.getenv("SSE_COALESCE_BYTES", "1024")),
+            **kwargs,
+        )
+
+    def _format(self, event: str, data: dict) -> str:
+        return format_sse_event(event, data, self.next_id() if self.next_id else None)
+
+    @property
+    def coalescing(self) -> bool:
+        return self.window > 0 or self.max_bytes > 0
+
+    def token(self, content: str) -> str:
+        """Add a token; returns the frame to send now, or "" while it is held."""
+        if not self.coalescing:
+            frame = self._format("token", {"content": content})
+            _stats.record(1, 1, frame)
+            return frame
+        now = self.clock()
+        if not self._held:
+            self._held_since = now
+        self._held.append(content)
+        self._held_bytes += len(content)
+        if (self.max_bytes > 0 and self._held_bytes >= self.max_bytes) or (
+            self.window > 0 and now - self._held_since >= self.window
+        ):
+            return self.flush()
+        return ""
+
+    def due_in(self) -> float | None:
+        """Seconds until the held tokens must go out, or None if there is no deadline."""
+        if not self._held or self.window <= 0:
+            return None
+        return max(0.0, self._held_since + self.window - self.clock())
+
+    async def paced(self, stream: AsyncGenerator) -> AsyncIterator:
+        """Items of ``stream``, plus ``("frame", held tokens)`` when the window ends first.
+
+        ``token`` only checks the window as tokens arrive, so a stalled
+        provider or a tool call being generated would hide text that is
+        already here. ``stream`` is read by its own task (one context for
+        the whole iteration) while this waits for it with the deadline.
+        """
+        if self.window <= 0:
+            async for item in stream:
+                yield item
+            return
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        end = object()
+
+        async def pump():
+            try:
+                async for item in stream:
+                    await queue.put((item, None))
+            except Exception as exc:
+                await queue.put((end, exc))
+            else:
+                await queue.put((end, None))
+            finally:
+                await stream.aclose()
+
+        task = asyncio.create_task(pump())
+        try:
+            while True:
+                try:
+                    item, error = await asyncio.wait_for(queue.get(), self.due_in())
+                except TimeoutError:
+                    yield "frame", self.flush()
+                    continue
+                if item is end:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def flush(self) -> str:
+        """The held tokens as one frame ("" if none are held)."""
+        if not self._held:
+            return ""
+        frame = self._format("token", {"content": "".join(self._held)})
+        _stats.record(len(self._held), len(self._held), frame)
+        self._held.clear()
+        self._held_bytes = 0
+        return frame
+
+    def event(self, event: str, data: dict) -> str:
+        """Held tokens, then ``event``, ready to send at once."""
+        held = self.flush()
+        frame = self._format(event, data)
+        _stats.record(1, 0, frame)
+        return held + frame
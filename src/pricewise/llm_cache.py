@@ -0,0 +1,221 @@
+"""Response cache for the summarization and structured-output models.
+
+Sessions follow the same few flows ("best headphones under $100"), so
+summarization prompts and Receipt extractions over identical message
+prefixes come up again and again. ``LLMResponseCache`` plugs into
+LangChain's per-model ``cache`` slot and answers repeats without a
+model call:
+
+  - the key hashes the model and its parameters (LangChain's
+    ``llm_string``) with the prompt messages normalized: message and
+    tool-call ids dropped, whitespace collapsed
+  - tier 1 is an in-process LRU; tier 2 an optional SQLite file shared
+    by every worker pointing at the same path (``LLM_CACHE_PATH``)
+  - calls that bind tools without forcing one (the ReAct reasoning
+    turns) are never cached unless ``cache_tool_calls`` is set; their
+    answers depend on tool results that may have changed
+
+Models opt in via ``pricewise.models`` (``LLM_CACHE_TIERS``); hit rates
+are reported under ``llm_cache`` in ``/metrics``.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+_WHITESPACE = re.compile(r"\s+")
+_TOOL_CHOICE = re.compile(r"\('tool_choice', '?([^',)]+)")
+# Fields that differ between otherwise identical requests.
+_VOLATILE_KEYS = {"id", "tool_call_id", "response_metadata", "usage_metadata"}
+
+
+def _normalize(node: Any) -> Any:
+    if isinstance(node, dict):
+        # Serialized messages are {"lc": 1, "id": [class path], "kwargs": {...}};
+        # the class path is kept, ids inside kwargs and tool calls are not.
+        is_constructor = node.get("type") == "constructor"
+        return {
+            k: (v if is_constructor and k == "id" else _normalize(v))
+            for k, v in node.items()
+            if is_constructor and k == "id" or k not in _VOLATILE_KEYS
+        }
+    if isinstance(node, list):
+        return [_normalize(v) for v in node]
+    if isinstance(node, str):
+        return _WHITESPACE.sub(" ", node).strip()
+    return node
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Canonical form of a serialized prompt, for keying."""
+    try:
+        parsed = json.loads(prompt)
+    except ValueError:
+        return _WHITESPACE.sub(" ", prompt).strip()
+    return json.dumps(_normalize(parsed), sort_keys=True, separators=(",", ":"))
+
+
+def make_llm_cache_key(prompt: str, llm_string: str) -> str:
+    data = f"{llm_string}\x00{normalize_prompt(prompt)}"
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def is_tool_calling_turn(llm_string: str) -> bool:
+    """True when tools are bound but the model is free to pick (or not) one."""
+    if "('tools', " not in llm_string:
+        return False
+    choice = _TOOL_CHOICE.search(llm_string)
+    return choice is None or choice.group(1) in ("auto", "none")
+
+
+class LLMResponseCache(BaseCache):
+    """In-process LRU with an optional SQLite tier behind it.
+
+    Args:
+        max_entries: Capacity of the in-memory LRU.
+        ttl: Seconds an entry stays valid in either tier.
+        path: SQLite file for the persistent tier, or None to disable it.
+        cache_tool_calls: Also cache free tool-calling turns.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl: float = 24 * 60 * 60,
+        path: str | None = None,
+        cache_tool_calls: bool = False,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.cache_tool_calls = cache_tool_calls
+        self._entries: OrderedDict[str, tuple[float, list]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "skipped": 0,
+            "evictions": 0,
+            "sets": 0,
+        }
+        self._db: sqlite3.Connection | None = None
+        if path:
+            self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def _skip(self, llm_string: str) -> bool:
+        return not self.cache_tool_calls and is_tool_calling_turn(llm_string)
+
+    def lookup(self, prompt: str, llm_string: str):
+        if self._skip(llm_string):
+            with self._lock:
+                self._stats["skipped"] += 1
+            return None
+        key = make_llm_cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, generations = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return generations
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    generations = [loads(g) for g in json.loads(row[0])]
+                    self._remember(key, generations, row[1])
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    return generations
+
+            self._stats["misses"] += 1
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        if self._skip(llm_string):
+            return
+        key = make_llm_cache_key(prompt, llm_string)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, list(return_val), expires_at)
+            self._stats["sets"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps([dumps(g) for g in return_val]), expires_at),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, generations: list, expires_at: float) -> None:
+        # Caller holds the lock.
+        self._entries[key] = (expires_at, generations)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self, **kwargs) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "persistent": self._db is not None,
+            }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+_llm_cache: LLMResponseCache | None = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Return the process-wide LLM response cache, configured from env on first use.
+
+    ``LLM_CACHE_SIZE`` sets the in-memory LRU capacity, ``LLM_CACHE_TTL``
+    the entry lifetime in seconds and ``LLM_CACHE_PATH`` enables the
+    shared SQLite tier.
+    """
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache(
+            max_entries=int(os.getenv("LLM_CACHE_SIZE", "2048")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", str(24 * 60 * 60))),
+            path=os.getenv("LLM_CACHE_PATH") or None,
+        )
+    return _llm_cache
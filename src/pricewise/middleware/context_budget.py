@@ -0,0 +1,115 @@
+"""Token budget for what the model sees on each call.
+
+Replaces the fixed message-count trigger: five short chat lines no
+longer force a summarization, and two huge scrape_url outputs no longer
+slip through. The budget is split three ways:
+
+  - ``recent``: user/assistant messages kept verbatim
+  - ``tools``: tool outputs kept verbatim
+  - ``summary``: the rolling summary of everything older
+
+``CONTEXT_BUDGET_TOKENS`` sets the total; the split fractions are fixed
+here. Every model call's prompt is accounted per bucket and reported
+both as a ``prompt_tokens`` stream event and in ``/metrics``.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+from pricewise.tokens import MessageTokenCounter, estimate_tokens
+
+
+@dataclass(frozen=True)
+class ContextBudget:
+    recent: int = 2400
+    tools: int = 2700
+    summary: int = 900
+
+    @classmethod
+    def from_total(cls, total: int) -> "ContextBudget":
+        return cls(recent=int(total * 0.4), tools=int(total * 0.45), summary=int(total * 0.15))
+
+    @classmethod
+    def from_env(cls) -> "ContextBudget":
+        return cls.from_total(int(os.getenv("CONTEXT_BUDGET_TOKENS", "6000")))
+
+    @property
+    def summary_words(self) -> int:
+        return max(50, int(self.summary * 0.75))
+
+    def window_start(self, messages, watermark: int, counter: MessageTokenCounter) -> int:
+        """Index where the verbatim window starts; everything before it is summarized.
+
+        Walks back from the newest message while the recent and tool
+        buckets have room. The latest message (and the tool call that
+        produced it) is always kept, and a window never starts on an
+        orphaned ToolMessage.
+        """
+        used = {"recent": 0, "tools": 0}
+        limits = {"recent": self.recent, "tools": self.tools}
+        start = len(messages)
+        for i in range(len(messages) - 1, watermark - 1, -1):
+            bucket = "tools" if isinstance(messages[i], ToolMessage) else "recent"
+            tokens = counter.count(messages[i])
+            if used[bucket] + tokens > limits[bucket]:
+                break
+            used[bucket] += tokens
+            start = i
+
+        start = min(start, _minimal_window_start(messages))
+        while start < len(messages) and isinstance(messages[start], ToolMessage):
+            start += 1
+        return max(start, watermark)
+
+
+def _minimal_window_start(messages) -> int:
+    """The last message, or the last tool call plus its results."""
+    i = len(messages) - 1
+    while i > 0 and isinstance(messages[i], ToolMessage):
+        i -= 1
+    if i < len(messages) - 1 and not (isinstance(messages[i], AIMessage) and messages[i].tool_calls):
+        # Stray results with no call in sight; keep them anyway.
+        return i + 1
+    return max(i, 0)
+
+
+def account(llm_input_messages, counter: MessageTokenCounter) -> dict:
+    """Estimated prompt tokens per bucket for one model call."""
+    usage = {"summary": 0, "recent": 0, "tools": 0}
+    for m in llm_input_messages:
+        if m.type == "system":
+            usage["summary"] += estimate_tokens(m.content)
+        elif isinstance(m, ToolMessage):
+            usage["tools"] += counter.count(m)
+        else:
+            usage["recent"] += counter.count(m)
+    usage["total"] = sum(usage.values())
+    return usage
+
+
+class PromptTokenStats:
+    """Running totals of estimated prompt tokens per model call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "total": 0, "max": 0, "summary": 0, "recent": 0, "tools": 0}
+
+    def record(self, usage: dict) -> None:
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["max"] = max(self._stats["max"], usage["total"])
+            for key in ("total", "summary", "recent", "tools"):
+                self._stats[key] += usage[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self._stats["calls"] or 1
+            return {
+                "calls": self._stats["calls"],
+                "max": self._stats["max"],
+                "avg": round(self._stats["total"] / calls, 1),
+                "avg_by_bucket": {k: round(self._stats[k] / calls, 1) for k in ("summary", "recent", "tools")},
+            }
@@ -0,0 +1,172 @@
+"""Speculative prefetch of read-only searches while an approval is pending.
+
+Once ``approval_required`` goes out, the server would sit idle until the
+user answers and only then start a 1-3 s Tavily call. For the read-only
+search tools (those registered with ``@search_query``) the search is
+started as soon as the approval is requested and its response held in a
+slot keyed by thread and call:
+
+  - approved: the tool's approval wrapper claims the slot, moves the
+    response into the search cache and the tool answers from it
+  - denied, a new message on the thread, or ``PREFETCH_TTL`` seconds
+    without an answer: the slot is dropped and the search cancelled
+
+A prefetched response only reaches the shared cache after the user
+approves the call. The same query can still land in the cache from
+another session meanwhile; a denied call stays denied regardless,
+because the approval wrapper never re-checks its auto-approval rules
+once the call has been put to the user. At most ``PREFETCH_MAX_SLOTS`` slots are held; the
+oldest is dropped first. ``PREFETCH_ON_APPROVAL=false`` turns it off.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from pricewise.tools._client import build_search_query, get_tavily
+
+if TYPE_CHECKING:
+    from pricewise.middleware.selective_interrupt import ToolCall
+
+
+@dataclass
+class _Slot:
+    tool: str
+    query: str
+    task: asyncio.Task
+    started: float
+
+
+class PrefetchStats:
+    """What became of each speculative search."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {
+            "started": 0,
+            "used": 0,
+            "ready": 0,
+            "denied": 0,
+            "expired": 0,
+            "evicted": 0,
+            "errors": 0,
+        }
+        self._wait = 0.0
+
+    def record(self, key: str, wait: float = 0.0) -> None:
+        with self._lock:
+            self._stats[key] += 1
+            self._wait += wait
+
+    def stats(self) -> dict:
+        with self._lock:
+            used = self._stats["used"]
+            return {
+                **self._stats,
+                "avg_wait_ms": round(self._wait / used * 1000, 1) if used else None,
+            }
+
+
+class SpeculativePrefetcher:
+    """Per-interrupt slots of searches started before the user approved them.
+
+    Args:
+        ttl: Seconds a slot waits for the approval before it is dropped.
+        max_slots: Slots held at once across all threads (oldest dropped first).
+    """
+
+    def __init__(self, ttl: float = 120.0, max_slots: int = 256):
+        self.ttl = ttl
+        self.max_slots = max_slots
+        self._slots: OrderedDict[tuple[str, str], _Slot] = OrderedDict()
+        self._stats = PrefetchStats()
+
+    def _drop(self, key: tuple[str, str], reason: str) -> None:
+        slot = self._slots.pop(key, None)
+        if slot is not None:
+            slot.task.cancel()
+            self._stats.record(reason)
+
+    def _expire(self) -> None:
+        deadline = time.monotonic() - self.ttl
+        for key in [k for k, slot in self._slots.items() if slot.started < deadline]:
+            self._drop(key, "expired")
+
+    def start(self, call: "ToolCall") -> bool:
+        """Start ``call``'s search in the background. Must run on the event loop."""
+        query = build_search_query(call.tool, call.args)
+        key = (call.thread_id, call.key)
+        if query is None or key in self._slots:
+            return False
+        self._expire()
+        while len(self._slots) >= self.max_slots:
+            self._drop(next(iter(self._slots)), "evicted")
+
+        task = asyncio.create_task(get_tavily(call.tool).afetch(query))
+        # Retrieve the exception so an unclaimed failure isn't logged as never retrieved.
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._slots[key] = _Slot(call.tool, query, task, time.monotonic())
+        self._stats.record("started")
+        return True
+
+    async def claim(self, call: "ToolCall") -> bool:
+        """Hand an approved call's prefetched response to the search cache.
+
+        Waits for the search if it is still running. Returns True when the
+        tool will now answer from the cache.
+        """
+        self._expire()
+        slot = self._slots.pop((call.thread_id, call.key), None)
+        if slot is None:
+            return False
+        ready = slot.task.done()
+        start = time.perf_counter()
+        try:
+            response = await asyncio.shield(slot.task)
+        except asyncio.CancelledError:
+            if not slot.task.cancelled():
+                raise
+            self._stats.record("errors")
+            return False
+        except Exception:
+            self._stats.record("errors")
+            return False
+        get_tavily(slot.tool).store(slot.query, response)
+        self._stats.record("used", time.perf_counter() - start)
+        if ready:
+            self._stats.record("ready")
+        return True
+
+    def discard(self, call: "ToolCall") -> None:
+        """Drop a denied call's slot."""
+        self._drop((call.thread_id, call.key), "denied")
+
+    def discard_thread(self, thread_id: str) -> None:
+        """Drop every slot of ``thread_id`` (its approvals were denied or abandoned)."""
+        for key in [k for k in self._slots if k[0] == thread_id]:
+            self._drop(key, "denied")
+
+    def stats(self) -> dict:
+        return {**self._stats.stats(), "slots": len(self._slots)}
+
+
+_prefetcher: SpeculativePrefetcher | None = None
+
+
+def prefetch_enabled() -> bool:
+    return os.getenv("PREFETCH_ON_APPROVAL", "true").lower() == "true"
+
+
+def get_prefetcher() -> SpeculativePrefetcher:
+    """Return the process-wide prefetcher, configured from env on first use."""
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = SpeculativePrefetcher(
+            ttl=float(os.getenv("PREFETCH_TTL", "120")),
+            max_slots=int(os.getenv("PREFETCH_MAX_SLOTS", "256")),
+        )
+    return _prefetcher
@@ -0,0 +1,220 @@
+"""Receipt generation after the final answer, locally when possible.
+
+``create_react_agent(response_format=...)`` spends one more model round
+trip after every final answer just to extract the Receipt. Most turns
+don't need it: ``compare_prices`` and ``delegate_research`` already
+return the figures a Receipt holds as structured artifacts. This
+post_model_hook builds the Receipt from the current turn's artifacts
+(prices, retailer ranges, ratings from ``get_reviews``) and only calls
+a model, normally the small ``structured`` tier from
+:mod:`pricewise.models`, when the turn produced no price artifact.
+"""
+
+import re
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.constants import TAG_NOSTREAM
+
+from pricewise.prices import currency_symbol, extract_prices, product_prices
+from pricewise.schemas import ProductSummary, Receipt
+
+_RATING_VALUE = re.compile(
+    r"\b(\d(?:\.\d)?)\s?(?:/|out of)\s?(5|10)\b|\b(\d(?:\.\d)?)\s?stars?\b",
+    re.IGNORECASE,
+)
+
+
+class ReceiptStats:
+    """How many receipts were built locally vs. by the model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"local": 0, "llm": 0}
+
+    def record(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+_stats = ReceiptStats()
+
+
+def get_receipt_stats() -> ReceiptStats:
+    return _stats
+
+
+def _current_turn(messages) -> list:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return list(messages[i + 1:])
+    return list(messages)
+
+
+def average_rating(text: str) -> float | None:
+    """Mean of the ratings in ``text`` on a five-point scale."""
+    ratings = []
+    for m in _RATING_VALUE.finditer(text):
+        if m.group(1):
+            ratings.append(float(m.group(1)) * 5 / int(m.group(2)))
+        else:
+            ratings.append(float(m.group(3)))
+    ratings = [r for r in ratings if 0 < r <= 5]
+    return round(sum(ratings) / len(ratings), 1) if ratings else None
+
+
+def _quoted_price(answer: str, summary: dict) -> float:
+    """The first price the answer quotes within the found range, else the lowest."""
+    overall = summary["overall"]
+    for value in product_prices([m for m in extract_prices(answer) if m.currency == summary["currency"]]):
+        if overall["min"] <= value <= overall["max"]:
+            return value
+    return overall["min"]
+
+
+def _price_range(summary: dict) -> str | None:
+    overall = summary["overall"]
+    if overall["count"] < 2:
+        return None
+    symbol = currency_symbol(summary["currency"])
+    return f"{symbol}{overall['min']:,.2f} - {symbol}{overall['max']:,.2f}"
+
+
+def _price_reason(summary: dict, price: float) -> str | None:
+    """Why ``price``: the cheapest retailer's, or who listed it and how it compares."""
+    retailers = summary["retailers"]
+    if not retailers:
+        return None
+    cheapest = min(retailers, key=lambda r: r["min"])
+    if price <= cheapest["min"]:
+        return f"Lowest current price at {cheapest['retailer']} among {len(retailers)} retailer(s)."
+    sellers = [r for r in retailers if r["min"] <= price <= r["max"]]
+    if not sellers:
+        return None
+    # Prefer the retailer whose own lowest price is the quoted one.
+    seller = min(sellers, key=lambda r: abs(r["min"] - price))
+    symbol = currency_symbol(summary["currency"])
+    return (
+        f"Listed at {symbol}{price:,.2f} by {seller['retailer']}; "
+        f"lowest is {symbol}{cheapest['min']:,.2f} at {cheapest['retailer']} "
+        f"among {len(retailers)} retailer(s)."
+    )
+
+
+def _products(turn, answer: str) -> list[dict]:
+    """One entry per product the turn priced, in the order they were priced."""
+    args_by_call = {
+        tc["id"]: tc["args"]
+        for m in turn if isinstance(m, AIMessage)
+        for tc in m.tool_calls
+    }
+    ratings = {}
+    for m in turn:
+        if isinstance(m, ToolMessage) and m.name == "get_reviews":
+            product = args_by_call.get(m.tool_call_id, {}).get("product_name")
+            rating = average_rating(str(m.content))
+            if product and rating is not None:
+                ratings[product.lower()] = rating
+
+    products: dict[str, dict] = {}
+    for m in turn:
+        artifact = m.artifact if isinstance(m, ToolMessage) else None
+        if not isinstance(artifact, dict):
+            continue
+        if artifact.get("tool") == "compare_prices":
+            price = _quoted_price(answer, artifact)
+            products[artifact["product"].lower()] = {
+                "product_name": artifact["product"],
+                "price": price,
+                "currency": artifact["currency"],
+                "price_range": _price_range(artifact),
+                "reason": _price_reason(artifact, price),
+            }
+        elif artifact.get("tool") == "delegate_research":
+            for p in artifact["products"]:
+                if p["price"] is None:
+                    continue
+                products[p["product"].lower()] = {
+                    "product_name": p["product"],
+                    "price": p["price"],
+                    "currency": p["prices"]["currency"],
+                    "price_range": _price_range(p["prices"]),
+                    "reason": f"Median current price across {len(p['prices']['retailers'])} retailer(s).",
+                }
+    for key, product in products.items():
+        product["average_rating"] = ratings.get(key)
+    return list(products.values())
+
+
+def build_receipt(messages) -> Receipt | None:
+    """Build the Receipt from the current turn's tool artifacts, or None if it has none."""
+    turn = _current_turn(messages)
+    final = turn[-1] if turn and isinstance(turn[-1], AIMessage) else None
+    answer = final.content if final is not None and isinstance(final.content, str) else ""
+    products = _products(turn, answer)
+    if not products:
+        return None
+
+    # The recommendation is the product the answer names first.
+    lowered = answer.lower()
+    positions = [lowered.find(p["product_name"].lower()) for p in products]
+    named = [i for i, pos in enumerate(positions) if pos >= 0]
+    main = products[min(named, key=lambda i: positions[i])] if named else products[0]
+    others = [p for p in products if p is not main]
+
+    receipt = Receipt(
+        product_name=main["product_name"],
+        price=main["price"],
+        currency=main["currency"],
+        average_rating=main["average_rating"],
+        price_range=main["price_range"],
+        recommendation_reason=main["reason"],
+    )
+    if others:
+        receipt.comparison_products = [
+            ProductSummary(
+                product_name=p["product_name"],
+                price=p["price"],
+                currency=p["currency"],
+                average_rating=p["average_rating"],
+                price_range=p["price_range"],
+            )
+            for p in others
+        ]
+        cheapest = min(products, key=lambda p: p["price"])
+        symbol = currency_symbol(cheapest["currency"])
+        receipt.comparison_summary = (
+            f"Compared {len(products)} products; lowest price is {cheapest['product_name']} "
+            f"at {symbol}{cheapest['price']:,.2f}."
+        )
+    return receipt
+
+
+def create_receipt_hook(model, local: bool = True):
+    """Create a post_model_hook that fills ``structured_response``.
+
+    Runs only after a final answer (an AIMessage without tool calls).
+    With ``local`` the Receipt is built from tool artifacts and ``model``
+    is only the fallback; its extraction call is tagged so the JSON never
+    streams to the client.
+    """
+    structured = model.with_structured_output(Receipt).with_config(tags=[TAG_NOSTREAM])
+
+    async def generate_receipt(state: dict, config=None) -> dict:
+        messages = state["messages"]
+        last = messages[-1] if messages else None
+        if not isinstance(last, AIMessage) or last.tool_calls:
+            return {}
+        if local:
+            receipt = build_receipt(messages)
+            if receipt is not None:
+                _stats.record("local")
+                return {"structured_response": receipt}
+        _stats.record("llm")
+        return {"structured_response": await structured.ainvoke(list(messages))}
+
+    return generate_receipt
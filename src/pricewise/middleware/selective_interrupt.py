@@ -3,13 +3,302 @@
 Instead of interrupt_before=["tools"] (which pauses before EVERY tool call),
 this module provides a decorator that adds per-tool interrupt() calls.
 Safe tools like calculate_budget skip the interrupt entirely.
+
+Both the sync ``func`` and the native async ``coroutine`` of a tool are
+wrapped, so the API server's ``agent.astream`` path never falls back to a
+worker thread just to pause for approval.
+
+Every interrupt costs the client a full round trip (stream teardown,
+``/approve`` POST, checkpoint reads, graph resume), so before pausing
+the wrapper asks an :class:`ApprovalPolicy` whether a rule already
+covers the call:
+
+  - ``cache_hit``: the search would be answered from the search cache
+  - ``repeated_call``: the same call was already approved in this thread
+  - ``trusted_tool``: the user marked the tool as trusted
+  - ``session_quota``: the first ``APPROVAL_SEARCH_QUOTA`` read-only
+    searches of a session (off by default)
+
+``APPROVAL_AUTO_RULES`` picks the rules (default: cache_hit, repeated_call,
+trusted_tool); unknown names are rejected. Interrupts raised in the same step are answered by one
+``/approve`` call; the policy counts those and every auto-approval as
+round trips avoided. Read-only searches awaiting approval are started
+early by :mod:`pricewise.middleware.prefetch` and only used once approved.
 """
 
+import json
+import os
+import threading
+from collections import Counter, OrderedDict
 from copy import copy
+from dataclasses import dataclass
 from functools import wraps
 
+from langgraph.config import get_config
+from langgraph.errors import GraphInterrupt
 from langgraph.types import interrupt
 
+from pricewise.middleware.prefetch import get_prefetcher
+from pricewise.tools._cache import normalize_query
+from pricewise.tools._client import is_search_cached, search_query_args
+from pricewise.tools.wishlist import session_id_var
+
+# Read-only web searches eligible for the per-session quota. scrape_url
+# (arbitrary URLs) and delegate_research (a fan-out) always ask.
+READ_ONLY_SEARCH_TOOLS = frozenset({
+    "search_product", "compare_prices", "get_reviews", "find_coupons", "check_availability",
+})
+
+# Names of every tool wrapped with with_approval.
+APPROVAL_TOOLS: set[str] = set()
+
+
+@dataclass(frozen=True)
+class ToolCall:
+    """One call waiting on approval, with who made it."""
+
+    tool: str
+    args: dict
+    thread_id: str
+    user_id: str
+
+    @property
+    def key(self) -> str:
+        # Search text is folded the way the search cache folds it; URLs and
+        # every other argument must match exactly.
+        query_args = search_query_args(self.tool)
+        args = {
+            k: normalize_query(v) if k in query_args and isinstance(v, str) else v
+            for k, v in self.args.items()
+        }
+        return f"{self.tool}:{json.dumps(args, sort_keys=True, default=str)}"
+
+
+class CacheHitRule:
+    name = "cache_hit"
+
+    def check(self, call: ToolCall, policy: "ApprovalPolicy") -> bool:
+        return is_search_cached(call.tool, call.args)
+
+
+class RepeatedCallRule:
+    name = "repeated_call"
+
+    def check(self, call: ToolCall, policy: "ApprovalPolicy") -> bool:
+        return policy.was_approved(call)
+
+
+class TrustedToolRule:
+    name = "trusted_tool"
+
+    def check(self, call: ToolCall, policy: "ApprovalPolicy") -> bool:
+        return call.tool in policy.trusted_tools(call.user_id)
+
+
+class SessionQuotaRule:
+    name = "session_quota"
+
+    def __init__(self, quota: int, tools=READ_ONLY_SEARCH_TOOLS):
+        self.quota = quota
+        self.tools = tools
+
+    @classmethod
+    def from_env(cls) -> "SessionQuotaRule":
+        return cls(int(os.getenv("APPROVAL_SEARCH_QUOTA", "0")))
+
+    def check(self, call: ToolCall, policy: "ApprovalPolicy") -> bool:
+        return call.tool in self.tools and policy.take_quota(call.thread_id, self.quota)
+
+
+class ApprovalPolicy:
+    """Decides which tool calls skip the human, and remembers approvals per thread.
+
+    Args:
+        rules: Checked in order; the first that matches approves the call.
+        max_threads: Threads (and users) whose approvals, quota use and
+                     trusted tools are remembered (LRU).
+        max_calls_per_thread: Approved calls remembered per thread.
+    """
+
+    def __init__(self, rules=(), max_threads: int = 10_000, max_calls_per_thread: int = 256):
+        self.rules = list(rules)
+        self.max_threads = max_threads
+        self.max_calls_per_thread = max_calls_per_thread
+        self._approved: OrderedDict[str, OrderedDict[str, None]] = OrderedDict()
+        self._quota_used: OrderedDict[str, int] = OrderedDict()
+        self._trusted: OrderedDict[str, set[str]] = OrderedDict()
+        self._pending: OrderedDict[str, Counter] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"interrupts": 0, "approved": 0, "denied": 0, "batched": 0}
+        self._auto = {rule.name: 0 for rule in self.rules}
+
+    def _touch(self, table: OrderedDict, thread_id: str, default):
+        # Caller holds the lock.
+        if thread_id not in table:
+            table[thread_id] = default()
+            while len(table) > self.max_threads:
+                table.popitem(last=False)
+        table.move_to_end(thread_id)
+        return table[thread_id]
+
+    def auto_approve(self, call: ToolCall) -> str | None:
+        """Name of the rule that approves ``call``, or None if a human must."""
+        for rule in self.rules:
+            if rule.check(call, self):
+                with self._lock:
+                    self._auto[rule.name] += 1
+                self._remember(call)
+                return rule.name
+        return None
+
+    def was_approved(self, call: ToolCall) -> bool:
+        with self._lock:
+            calls = self._approved.get(call.thread_id)
+            return calls is not None and call.key in calls
+
+    def take_quota(self, thread_id: str, quota: int) -> bool:
+        with self._lock:
+            used = self._quota_used.get(thread_id, 0)
+            if used >= quota:
+                return False
+            self._touch(self._quota_used, thread_id, int)
+            self._quota_used[thread_id] = used + 1
+            return True
+
+    def _remember(self, call: ToolCall) -> None:
+        with self._lock:
+            calls = self._touch(self._approved, call.thread_id, OrderedDict)
+            calls[call.key] = None
+            calls.move_to_end(call.key)
+            while len(calls) > self.max_calls_per_thread:
+                calls.popitem(last=False)
+
+    def is_pending(self, call: ToolCall) -> bool:
+        """Whether ``call`` was put to the human and is still awaiting an answer."""
+        with self._lock:
+            calls = self._pending.get(call.thread_id)
+            return calls is not None and calls[call.key] > 0
+
+    def record_interrupt(self, call: ToolCall, pending: bool = False) -> None:
+        """``call`` paused for the human; ``pending`` if it already was (a re-run)."""
+        with self._lock:
+            self._stats["interrupts"] += 1
+            if not pending:
+                self._touch(self._pending, call.thread_id, Counter)[call.key] += 1
+
+    def record_decision(self, call: ToolCall, approved: bool) -> None:
+        with self._lock:
+            self._stats["approved" if approved else "denied"] += 1
+            calls = self._pending.get(call.thread_id)
+            if calls is not None and calls[call.key] > 0:
+                calls[call.key] -= 1
+                if not any(calls.values()):
+                    del self._pending[call.thread_id]
+        if approved:
+            self._remember(call)
+
+    def record_batch(self, interrupts: int) -> None:
+        """One ``/approve`` call answered ``interrupts`` pending interrupts."""
+        if interrupts > 1:
+            with self._lock:
+                self._stats["batched"] += interrupts - 1
+
+    def trust(self, user_id: str, tool: str, trusted: bool = True) -> set[str]:
+        with self._lock:
+            tools = self._touch(self._trusted, user_id, set)
+            if trusted:
+                tools.add(tool)
+            else:
+                tools.discard(tool)
+            return set(tools)
+
+    def trusted_tools(self, user_id: str) -> set[str]:
+        with self._lock:
+            tools = self._trusted.get(user_id)
+            if tools is None:
+                return set()
+            self._trusted.move_to_end(user_id)
+            return set(tools)
+
+    def stats(self) -> dict:
+        with self._lock:
+            auto = dict(self._auto)
+            return {
+                **self._stats,
+                "auto_approved": auto,
+                "round_trips_avoided": sum(auto.values()) + self._stats["batched"],
+                "threads": len(self._approved),
+                "trusting_users": len(self._trusted),
+                "pending": sum(sum(calls.values()) for calls in self._pending.values()),
+            }
+
+
+RULES = {
+    "cache_hit": CacheHitRule,
+    "repeated_call": RepeatedCallRule,
+    "trusted_tool": TrustedToolRule,
+    "session_quota": SessionQuotaRule.from_env,
+}
+
+_policy: ApprovalPolicy | None = None
+
+
+def get_approval_policy() -> ApprovalPolicy:
+    """Return the process-wide approval policy, configured from env on first use."""
+    global _policy
+    if _policy is None:
+        setting = os.getenv("APPROVAL_AUTO_RULES", "cache_hit,repeated_call,trusted_tool")
+        names = [name.strip() for name in setting.split(",") if name.strip()]
+        unknown = [name for name in names if name not in RULES]
+        if unknown:
+            raise ValueError(
+                f"Unknown APPROVAL_AUTO_RULES {', '.join(unknown)}; expected any of {', '.join(RULES)}"
+            )
+        # A positive quota turns the rule on even when it isn't listed.
+        if "session_quota" not in names and int(os.getenv("APPROVAL_SEARCH_QUOTA", "0")) > 0:
+            names.append("session_quota")
+        rules = [RULES[name]() for name in names]
+        _policy = ApprovalPolicy(rules)
+    return _policy
+
+
+def _tool_call(tool_name: str, kwargs: dict) -> ToolCall:
+    try:
+        configurable = get_config().get("configurable") or {}
+    except RuntimeError:
+        configurable = {}  # called outside a graph run
+    thread_id = str(configurable.get("thread_id") or session_id_var.get())
+    return ToolCall(tool_name, dict(kwargs), thread_id, str(configurable.get("user_id") or thread_id))
+
+
+def _approve(tool, kwargs: dict) -> ToolCall | None:
+    """Approve by policy, or pause the graph until the human answers.
+
+    Returns the approved call, or None if the human denied it. Once a
+    call has been put to the human, the rules are not consulted again
+    when the graph resumes: the cache, trust or approvals may have
+    changed while it waited, and the answer must stand. The policy keeps
+    track of which calls are waiting (in memory, so a restart while one
+    waits falls back to checking the rules again).
+    """
+    policy = get_approval_policy()
+    call = _tool_call(tool.name, kwargs)
+    pending = policy.is_pending(call)
+    if not pending and policy.auto_approve(call):
+        return call
+    # Pause the graph — the host loop must resume with Command(resume=value).
+    # interrupt() returns the value passed via Command(resume=...).
+    try:
+        approved = interrupt({"tool": tool.name, "args": kwargs})
+    except GraphInterrupt:
+        policy.record_interrupt(call, pending)
+        raise
+    policy.record_decision(call, bool(approved))
+    if not approved:
+        get_prefetcher().discard(call)
+        return None
+    return call
+
 
 def with_approval(tool_fn):
     """Wrap a LangChain tool so it pauses for human approval before executing.
@@ -25,15 +314,36 @@ def with_approval(tool_fn):
     """
     wrapped = copy(tool_fn)
     original = tool_fn.func
+    original_coroutine = tool_fn.coroutine
+    APPROVAL_TOOLS.add(tool_fn.name)
 
     @wraps(original)
     def wrapper(*args, **kwargs):
-        # Pause the graph — the host loop must resume with Command(resume=value).
-        # interrupt() returns the value passed via Command(resume=...).
-        approved = interrupt({"tool": wrapped.name, "args": kwargs})
-        if not approved:
-            return f"User denied execution of tool '{wrapped.name}'. Do not retry this tool unless the user asks."
+        if _approve(wrapped, kwargs) is None:
+            return _denied(wrapped)
         return original(*args, **kwargs)
 
     wrapped.func = wrapper
+
+    if original_coroutine is not None:
+
+        @wraps(original_coroutine)
+        async def async_wrapper(*args, **kwargs):
+            call = _approve(wrapped, kwargs)
+            if call is None:
+                return _denied(wrapped)
+            # A search started while the approval was pending lands in the cache now.
+            await get_prefetcher().claim(call)
+            return await original_coroutine(*args, **kwargs)
+
+        wrapped.coroutine = async_wrapper
+
     return wrapped
+
+
+def _denied(tool):
+    message = f"User denied execution of tool '{tool.name}'. Do not retry this tool unless the user asks."
+    # content_and_artifact tools must hand back a (content, artifact) pair.
+    if tool.response_format == "content_and_artifact":
+        return message, None
+    return message
@@ -1,54 +1,403 @@
-from langchain_core.messages import AIMessage, SystemMessage, ToolMessage
+import asyncio
+import logging
+import os
+import threading
+from collections.abc import Collection
 
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.config import get_stream_writer
 
-def create_summarization_hook(model, max_messages: int = 5):
-    """Create a pre_model_hook that summarizes conversation history.
+from pricewise.middleware.context_budget import ContextBudget, PromptTokenStats, account
+from pricewise.middleware.tool_eviction import evict_tool_outputs
+from pricewise.tokens import estimate_tokens, get_message_token_counter
 
-    Uses the provided model to compress older messages into a summary,
-    keeping only the last 2 messages for immediate context.
-    """
+logger = logging.getLogger(__name__)
 
-    async def summarize_messages(state: dict) -> dict:
-        messages = state["messages"]
 
-        if len(messages) <= max_messages:
-            return {"llm_input_messages": messages}
+class SummarizationStats:
+    """Process-wide counts of summarization work, for /metrics and benchmarks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0, "reused": 0, "messages_summarized": 0, "prompt_tokens": 0,
+            "background_scheduled": 0, "background_adopted": 0, "background_dropped": 0,
+            "background_cancelled": 0, "fallbacks": 0,
+        }
+
+    def record(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += amount
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+_stats = SummarizationStats()
+_prompt_tokens = PromptTokenStats()
+_counter = get_message_token_counter()
 
-        # Find a safe split point that doesn't break tool_call/response pairs.
-        # Walk backwards from the target split to avoid cutting between an
-        # AIMessage with tool_calls and its corresponding ToolMessages.
-        split = len(messages) - 2
+
+def get_summarization_stats() -> SummarizationStats:
+    return _stats
+
+
+def get_prompt_token_stats() -> PromptTokenStats:
+    return _prompt_tokens
+
+
+def _split_point(messages) -> int:
+    """Index that starts the recent window without breaking tool_call/response pairs.
+
+    Walks backwards from the target split so an AIMessage with tool_calls
+    is never separated from its ToolMessages.
+    """
+    split = len(messages) - 2
+    while split > 0 and isinstance(messages[split], ToolMessage):
+        split -= 1
+    if split > 0 and isinstance(messages[split], AIMessage) and getattr(messages[split], "tool_calls", None):
+        split -= 1
         while split > 0 and isinstance(messages[split], ToolMessage):
             split -= 1
-        if split > 0 and isinstance(messages[split], AIMessage) and getattr(messages[split], "tool_calls", None):
-            split -= 1
-            while split > 0 and isinstance(messages[split], ToolMessage):
-                split -= 1
+    return split
 
-        if split <= 0:
-            return {"llm_input_messages": messages}
 
-        messages_to_summarize = messages[:split]
-        recent_messages = messages[split:]
+def _transcript(messages) -> str:
+    """Render messages as plain text, so a window may start or end anywhere."""
+    lines = []
+    for m in messages:
+        if isinstance(m, ToolMessage):
+            lines.append(f"Tool result ({m.name or 'tool'}): {m.content}")
+        elif isinstance(m, AIMessage):
+            if m.content:
+                lines.append(f"Assistant: {m.content}")
+            for tc in m.tool_calls or []:
+                lines.append(f"Assistant called {tc['name']} with {tc['args']}")
+        elif m.type == "human":
+            lines.append(f"User: {m.content}")
+        else:
+            lines.append(f"{m.type.capitalize()}: {m.content}")
+    return "\n".join(lines)
+
+
+def _abridged(messages, line_chars: int = 200, total_chars: int = 2000) -> str:
+    """Cheap deterministic stand-in for a summary: clipped lines, newest kept."""
+    lines = []
+    for line in _transcript(messages).splitlines():
+        lines.append(line if len(line) <= line_chars else line[: line_chars - 1] + "…")
+    kept, size = [], 0
+    for line in reversed(lines):
+        size += len(line) + 1
+        if size > total_chars:
+            break
+        kept.append(line)
+    return "\n".join(reversed(kept))
+
+
+async def _summarize(model, summary: str, new_messages, max_words: int | None = None) -> str:
+    """Fold ``new_messages`` into ``summary`` with one model call."""
+    if summary:
+        instruction = (
+            "Update the running summary of a shopping conversation with the new messages below. "
+            "Preserve key facts, decisions, and product details mentioned. "
+            "Reply with the full updated summary only."
+        )
+        body = f"Current summary:\n{summary}\n\nNew messages:\n{_transcript(new_messages)}"
+    else:
+        instruction = (
+            "Summarize the following conversation concisely. "
+            "Preserve key facts, decisions, and product details mentioned."
+        )
+        body = _transcript(new_messages)
+    if max_words:
+        instruction += f" Keep it under {max_words} words."
+
+    response = await model.ainvoke([SystemMessage(content=instruction), HumanMessage(content=body)])
+    _stats.record("calls")
+    _stats.record("messages_summarized", len(new_messages))
+    _stats.record("prompt_tokens", estimate_tokens(instruction) + estimate_tokens(body))
+    return response.content
+
+
+class SummaryWorker:
+    """Bounded pool of background summarizations, at most one per thread.
+
+    ``schedule`` starts folding a thread's uncovered messages into its
+    summary without waiting; the next ``pre_model_hook`` on that thread
+    picks the result up through ``take``. At most ``max_concurrent``
+    summaries run at once and at most ``max_pending`` are queued or
+    running; beyond that new work is dropped and the hook keeps using
+    its truncation fallback.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_pending: int = 256):
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self._tasks: dict[str, tuple[asyncio.Task, int]] = {}
+        self._results: dict[str, tuple[str, int]] = {}
+        self._sem: asyncio.Semaphore | None = None
+        self._loop = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._sem is None or self._loop is not loop:
+            self._sem, self._loop = asyncio.Semaphore(self.max_concurrent), loop
+        return self._sem
+
+    def take(self, thread_id: str, watermark: int, limit: int) -> tuple[str, int] | None:
+        """Hand over a finished summary that covers more than ``watermark`` messages, if any."""
+        result = self._results.get(thread_id)
+        if result is not None and watermark < result[1] <= limit:
+            del self._results[thread_id]
+            return result
+        return None
+
+    def pending(self, thread_id: str) -> int | None:
+        """Watermark the thread's in-flight summary will reach, if one is running."""
+        entry = self._tasks.get(thread_id)
+        return entry[1] if entry is not None else None
+
+    def schedule(
+        self, thread_id: str, model, summary: str, watermark: int, messages, target: int,
+        max_words: int | None = None,
+    ) -> bool:
+        """Start summarizing ``messages[watermark:target]`` on top of ``summary``."""
+        current = self._tasks.get(thread_id)
+        if current is not None:
+            if current[1] >= target:
+                return False
+            # Superseded: the new task covers everything the old one would.
+            self.cancel(thread_id)
+        if len(self._tasks) >= self.max_pending:
+            _stats.record("background_dropped")
+            return False
+
+        new_messages = list(messages[watermark:target])
+
+        async def run():
+            async with self._semaphore():
+                text = await _summarize(model, summary, new_messages, max_words)
+            self._results.pop(thread_id, None)
+            self._results[thread_id] = (text, target)
+            while len(self._results) > self.max_pending:
+                # Threads that never came back; drop the oldest.
+                del self._results[next(iter(self._results))]
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks[thread_id] = (task, target)
+        task.add_done_callback(lambda t, tid=thread_id: self._finished(tid, t))
+        _stats.record("background_scheduled")
+        return True
+
+    def _finished(self, thread_id: str, task: asyncio.Task) -> None:
+        if self._tasks.get(thread_id, (None,))[0] is task:
+            del self._tasks[thread_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("background summarization failed for %s: %r", thread_id, task.exception())
 
-        # Build summarization prompt
-        summary_prompt = [
-            SystemMessage(
-                content=(
-                    "Summarize the following conversation concisely. "
-                    "Preserve key facts, decisions, and product details mentioned."
-                )
-            ),
-            *messages_to_summarize,
-        ]
+    def cancel(self, thread_id: str) -> bool:
+        """Cancel the thread's in-flight summarization and forget its result."""
+        self._results.pop(thread_id, None)
+        entry = self._tasks.pop(thread_id, None)
+        if entry is None or entry[0].done():
+            return False
+        entry[0].cancel()
+        _stats.record("background_cancelled")
+        return True
 
-        summary_response = await model.ainvoke(summary_prompt)
+    def cancel_all(self) -> None:
+        for thread_id in list(self._tasks):
+            self.cancel(thread_id)
 
-        summarized_messages = [
-            SystemMessage(content=f"Summary of earlier conversation:\n{summary_response.content}"),
-            *recent_messages,
-        ]
+    def stats(self) -> dict:
+        return {
+            "running_or_queued": len(self._tasks),
+            "ready": len(self._results),
+            "max_concurrent": self.max_concurrent,
+            "max_pending": self.max_pending,
+        }
 
-        return {"llm_input_messages": summarized_messages}
+
+_worker: SummaryWorker | None = None
+
+
+def get_summary_worker() -> SummaryWorker:
+    """Return the process-wide background summarizer, configured from env on first use."""
+    global _worker
+    if _worker is None:
+        _worker = SummaryWorker(
+            max_concurrent=int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4")),
+            max_pending=int(os.getenv("SUMMARY_MAX_PENDING", "256")),
+        )
+    return _worker
+
+
+def _thread_id(config) -> str:
+    return ((config or {}).get("configurable") or {}).get("thread_id", "default")
+
+
+def _window_fn(max_messages: int | None, budget: ContextBudget | None):
+    """Return ``start(messages, watermark, summary)``: where the verbatim window begins.
+
+    Token budget by default; ``max_messages`` keeps the old count trigger.
+    """
+    if max_messages is None:
+        budget = budget or ContextBudget.from_env()
+
+        def start(messages, watermark, summary):
+            return budget.window_start(messages, watermark, _counter)
+    else:
+        def start(messages, watermark, summary):
+            if len(messages) <= max_messages and not summary:
+                return 0
+            return _split_point(messages)
+
+    return start
+
+
+def _report_usage(llm_input_messages) -> None:
+    usage = account(llm_input_messages, _counter)
+    _prompt_tokens.record(usage)
+    try:
+        get_stream_writer()({"event": "prompt_tokens", **usage})
+    except (RuntimeError, KeyError):
+        pass  # called outside a graph run
+
+
+def create_summarization_hook(
+    model,
+    max_messages: int | None = None,
+    background: bool = False,
+    budget: ContextBudget | None = None,
+    evict_tools: bool = True,
+):
+    """Create a pre_model_hook that summarizes conversation history.
+
+    Older messages are folded into a rolling summary kept in graph state
+    (``summary``) together with a watermark (``summary_watermark``, how
+    many leading messages it covers). Each call summarizes only the
+    messages that crossed the window since the last summary, and the
+    stored summary is reused as-is when nothing new did. The model sees
+    the summary plus the recent messages.
+
+    What stays verbatim is decided by a :class:`ContextBudget` (from env
+    unless given): recent turns and tool outputs each get a token share,
+    and the summary is asked to fit the third. Passing ``max_messages``
+    instead keeps the last two messages once the thread is longer than
+    that. Every call's prompt tokens are accounted per bucket.
+
+    With ``evict_tools`` (the default), tool outputs older than the
+    current step are first replaced by digests
+    (:mod:`pricewise.middleware.tool_eviction`), so the summarizer only
+    runs once the digested history still overflows the budget.
+
+    With ``background=True`` the hook never waits for the summarizer: it
+    adopts a summary the :class:`SummaryWorker` finished in the meantime,
+    schedules one for whatever is still uncovered, and stands in an
+    abridged transcript of those messages for this call.
+    """
+
+    window_start = _window_fn(max_messages, budget)
+    max_words = (budget or ContextBudget.from_env()).summary_words if max_messages is None else None
+
+    async def summarize_messages(state: dict, config=None) -> dict:
+        result = await _summarize_state(state, config)
+        _report_usage(result["llm_input_messages"])
+        return result
+
+    async def _summarize_state(state: dict, config) -> dict:
+        messages = evict_tool_outputs(state["messages"]) if evict_tools else state["messages"]
+        summary = state.get("summary") or ""
+        watermark = state.get("summary_watermark") or 0
+        if watermark > len(messages):
+            # History was rewritten under us; start over.
+            summary, watermark = "", 0
+
+        split = window_start(messages, watermark, summary)
+        if split <= 0 and not summary:
+            return {"llm_input_messages": messages}
+        split = max(split, watermark)
+
+        update = {}
+        if background:
+            thread_id = _thread_id(config)
+            worker = get_summary_worker()
+            finished = worker.take(thread_id, watermark, split)
+            if finished is not None:
+                summary, watermark = finished
+                update = {"summary": summary, "summary_watermark": watermark}
+                _stats.record("background_adopted")
+            if split > watermark:
+                worker.schedule(thread_id, model, summary, watermark, messages, split, max_words)
+                _stats.record("fallbacks")
+                context = []
+                if summary:
+                    context.append(SystemMessage(content=f"Summary of earlier conversation:\n{summary}"))
+                context.append(SystemMessage(
+                    content=f"Earlier conversation (abridged):\n{_abridged(messages[watermark:split])}"
+                ))
+                return {"llm_input_messages": [*context, *messages[split:]], **update}
+            _stats.record("reused")
+        elif split > watermark:
+            new_messages = messages[watermark:split]
+            summary = await _summarize(model, summary, new_messages, max_words)
+            logger.debug("summarized %d new messages (watermark %d→%d)", len(new_messages), watermark, split)
+            update = {"summary": summary, "summary_watermark": split}
+        else:
+            _stats.record("reused")
+
+        return {
+            "llm_input_messages": [
+                SystemMessage(content=f"Summary of earlier conversation:\n{summary}"),
+                *messages[split:],
+            ],
+            **update,
+        }
 
     return summarize_messages
+
+
+def create_summary_precompute_hook(
+    model, max_messages: int | None = None, budget: ContextBudget | None = None, evict_tools: bool = True,
+    approval_tools: Collection[str] = (),
+):
+    """Create a post_model_hook that starts the next model call's summary early.
+
+    The graph goes idle in two places: after the final answer, while the
+    user reads the receipt, and after a call to one of ``approval_tools``,
+    while they decide on it. That time is used to summarize the messages
+    the next call's window will drop (the next user message, or the tool
+    results), so its ``pre_model_hook`` usually finds the summary ready.
+    Other tool calls run straight away, leaving nothing to overlap.
+    """
+    window_start = _window_fn(max_messages, budget)
+    max_words = (budget or ContextBudget.from_env()).summary_words if max_messages is None else None
+
+    async def precompute(state: dict, config=None) -> dict:
+        messages = state["messages"]
+        last = messages[-1] if messages else None
+        if not isinstance(last, AIMessage):
+            return {}
+        if last.tool_calls:
+            if not any(tc["name"] in approval_tools for tc in last.tool_calls):
+                return {}
+            # Paused for approval; the next call sees the tool results.
+            following = [ToolMessage(content="", tool_call_id=tc["id"], name=tc["name"]) for tc in last.tool_calls]
+        else:
+            # The next turn appends a user message.
+            following = [HumanMessage(content="")]
+        if evict_tools:
+            messages = evict_tool_outputs(messages)
+        # Split where the next call's window will, never past what exists now.
+        upcoming = [*messages, *following]
+        summary = state.get("summary") or ""
+        watermark = state.get("summary_watermark") or 0
+        target = min(window_start(upcoming, watermark, summary), len(messages))
+        if target > watermark:
+            get_summary_worker().schedule(
+                _thread_id(config), model, summary, watermark, messages, target, max_words
+            )
+        return {}
+
+    return precompute
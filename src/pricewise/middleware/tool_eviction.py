@@ -0,0 +1,157 @@
+"""Deterministic eviction of old tool outputs before each model call.
+
+Most of a long thread's context is raw search snippets and scraped pages
+the model already read and answered from. Before summarization runs,
+``evict_tool_outputs`` replaces every ToolMessage older than the current
+step with a short digest: the tool name and the facts worth keeping
+(prices, ratings, stock phrases, coupon codes and URLs), pulled out with
+regexes. No model call is made, so with old outputs digested most threads
+stay under the context budget and the LLM summarizer never runs.
+
+Digests keep the original ``tool_call_id``, so every tool call still has
+its result and the message sequence stays valid for the API. Checkpointed
+state is untouched; only the model's view is rewritten.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+from pricewise.tokens import estimate_tokens
+from pricewise.tools._patterns import CODE, RATING, STOCK
+
+# Outputs at or below this many tokens are cheaper to keep than to digest.
+MIN_EVICT_TOKENS = 80
+
+_PRICE_VALUE = re.compile(
+    r"(?:US\$|C\$|A\$|[$€£¥₹])\s?\d[\d,]*(?:\.\d{1,2})?|\b\d[\d,]*(?:\.\d{1,2})?\s?(?:USD|EUR|GBP)\b"
+)
+_URL = re.compile(r"https?://[^\s)\]>\"']+")
+
+# (label, pattern, max items kept)
+_FACTS = (
+    ("prices", _PRICE_VALUE, 8),
+    ("ratings", RATING, 5),
+    ("stock", STOCK, 4),
+    ("codes", CODE, 4),
+    ("urls", _URL, 5),
+)
+
+
+def _unique(matches, limit: int) -> list[str]:
+    kept, seen = [], set()
+    for m in matches:
+        m = m.strip().rstrip(".,;")
+        if m and m.lower() not in seen:
+            seen.add(m.lower())
+            kept.append(m)
+            if len(kept) == limit:
+                break
+    return kept
+
+
+def digest(tool: str, content: str) -> str:
+    """A compact, deterministic digest of one tool output."""
+    parts = [f"[{tool} output digested, was ~{estimate_tokens(content)} tokens]"]
+    for label, pattern, limit in _FACTS:
+        found = _unique((m.group(0) for m in pattern.finditer(content)), limit)
+        if found:
+            parts.append(f"{label}: {', '.join(found)}")
+    if len(parts) == 1:
+        # Nothing structured to keep; the first line says what it was about.
+        first_line = content.strip().splitlines()[0] if content.strip() else ""
+        parts.append(first_line[:160])
+    return "\n".join(parts)
+
+
+def _current_step_start(messages) -> int:
+    """Index of the first ToolMessage the model has not seen yet."""
+    i = len(messages)
+    while i > 0 and isinstance(messages[i - 1], ToolMessage):
+        i -= 1
+    if i > 0 and isinstance(messages[i - 1], AIMessage) and messages[i - 1].tool_calls:
+        return i
+    return len(messages)
+
+
+class ToolEvictionStats:
+    """Running totals of tool outputs digested and the tokens saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"evicted": 0, "tokens_before": 0, "tokens_after": 0}
+
+    def record(self, before: str, after: str) -> None:
+        with self._lock:
+            self._stats["evicted"] += 1
+            self._stats["tokens_before"] += estimate_tokens(before)
+            self._stats["tokens_after"] += estimate_tokens(after)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "tokens_saved": self._stats["tokens_before"] - self._stats["tokens_after"]}
+
+
+class ToolEvictor:
+    """Digests old tool outputs, each computed once per message id."""
+
+    def __init__(self, max_entries: int = 10_000, min_tokens: int = MIN_EVICT_TOKENS):
+        self.max_entries = max_entries
+        self.min_tokens = min_tokens
+        self._digests: OrderedDict[str, ToolMessage | None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = ToolEvictionStats()
+
+    def _digest_message(self, message: ToolMessage) -> ToolMessage | None:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if estimate_tokens(content) <= self.min_tokens:
+            return None
+        text = digest(message.name or "tool", content)
+        self._stats.record(content, text)
+        return ToolMessage(
+            content=text,
+            tool_call_id=message.tool_call_id,
+            name=message.name,
+            id=f"{message.id}:digest" if message.id else None,
+        )
+
+    def _lookup(self, message: ToolMessage) -> ToolMessage | None:
+        if message.id is None:
+            return self._digest_message(message)
+        with self._lock:
+            if message.id in self._digests:
+                self._digests.move_to_end(message.id)
+                return self._digests[message.id]
+        replacement = self._digest_message(message)
+        with self._lock:
+            self._digests[message.id] = replacement
+            if len(self._digests) > self.max_entries:
+                self._digests.popitem(last=False)
+        return replacement
+
+    def evict(self, messages) -> list:
+        """``messages`` with tool outputs older than the current step digested."""
+        current = _current_step_start(messages)
+        out = list(messages)
+        for i in range(current):
+            if isinstance(out[i], ToolMessage):
+                replacement = self._lookup(out[i])
+                if replacement is not None:
+                    out[i] = replacement
+        return out
+
+    def stats(self) -> dict:
+        return self._stats.stats()
+
+
+_evictor = ToolEvictor()
+
+
+def get_tool_evictor() -> ToolEvictor:
+    return _evictor
+
+
+def evict_tool_outputs(messages) -> list:
+    return _evictor.evict(messages)
@@ -0,0 +1,205 @@
+"""Chat model tiers.
+
+A turn used to make every model call on gpt-4o: the ReAct reasoning
+steps, the history summary and the final Receipt extraction. The last
+two are simple jobs a small model does as well and much faster, so each
+job gets its own tier, configured from env:
+
+  - ``MODEL_REASONING`` (default ``gpt-4o``): tool choice and answers
+  - ``MODEL_SUMMARIZATION`` (default ``gpt-4o-mini``): rolling summaries
+  - ``MODEL_STRUCTURED`` (default ``gpt-4o-mini``): the Receipt
+
+Names take ``provider:model``; a bare name is an OpenAI model. Tiers
+are created once per process (``get_model_tiers``) and shared by every
+agent built from them. Each tier's calls are timed and their tokens
+counted, reported under ``models`` in ``/metrics``. Tiers listed in
+``LLM_CACHE_TIERS`` (default: summarization and structured) answer
+repeated prompts from :mod:`pricewise.llm_cache`.
+
+Under ``REPLAY_MODE`` every tier is a replay model; tiers not running
+the reasoning model are made faster by ``REPLAY_SMALL_MODEL_LATENCY_SCALE``
+so record/replay benchmarks show the end-to-end effect of tiering.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+from langchain.chat_models import init_chat_model
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.constants import TAG_NOSTREAM
+
+from pricewise.llm_cache import get_llm_cache
+from pricewise.replay import get_replay
+from pricewise.tokens import estimate_tokens, get_message_token_counter
+
+TIERS = ("reasoning", "summarization", "structured")
+
+DEFAULT_MODELS = {
+    "reasoning": "gpt-4o",
+    "summarization": "gpt-4o-mini",
+    "structured": "gpt-4o-mini",
+}
+
+# Tiers whose output is internal: kept out of the "messages" stream so
+# summaries and Receipt JSON never reach the client as tokens.
+_QUIET_TIERS = ("summarization", "structured")
+
+
+def tier_model_name(tier: str) -> str:
+    return os.getenv(f"MODEL_{tier.upper()}", DEFAULT_MODELS[tier])
+
+
+def cached_tiers() -> set[str]:
+    value = os.getenv("LLM_CACHE_TIERS", "summarization,structured")
+    return {t.strip() for t in value.split(",") if t.strip()}
+
+
+class ModelStats:
+    """Latency and token totals for one tier's calls."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._first_tokens: deque[float] = deque(maxlen=window)
+        self._stats = {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def record(self, latency: float, first_token: float | None, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["prompt_tokens"] += prompt_tokens
+            self._stats["completion_tokens"] += completion_tokens
+            self._latencies.append(latency)
+            if first_token is not None:
+                self._first_tokens.append(first_token)
+
+    def record_error(self) -> None:
+        with self._lock:
+            self._stats["errors"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._latencies)
+            first = list(self._first_tokens)
+            stats = dict(self._stats)
+
+        def pct(p: float) -> float | None:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+
+        return {
+            **stats,
+            "latency_ms": {
+                "avg": round(sum(ordered) / len(ordered) * 1000, 1) if ordered else None,
+                "p50": pct(0.5),
+                "p95": pct(0.95),
+            },
+            "first_token_ms": round(sum(first) / len(first) * 1000, 1) if first else None,
+        }
+
+
+class TierMetricsCallback(BaseCallbackHandler):
+    """Times each chat model call of one tier and counts its tokens.
+
+    Token counts come from the provider's usage metadata when it is
+    returned and are estimated locally otherwise.
+    """
+
+    run_inline = True
+
+    def __init__(self, stats: ModelStats):
+        self.stats = stats
+        self._runs: dict[Any, dict] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        prompt = get_message_token_counter().count_all(messages[0]) if messages else 0
+        self._runs[run_id] = {"start": time.perf_counter(), "first_token": None, "prompt_tokens": prompt}
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs) -> None:
+        run = self._runs.get(run_id)
+        if run is not None and run["first_token"] is None:
+            run["first_token"] = time.perf_counter() - run["start"]
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        prompt_tokens, completion_tokens = run["prompt_tokens"], 0
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, "message", None)
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            prompt_tokens, completion_tokens = usage["input_tokens"], usage["output_tokens"]
+        elif message is not None:
+            completion_tokens = get_message_token_counter().count(message)
+        elif generation is not None:
+            completion_tokens = estimate_tokens(generation.text)
+        self.stats.record(time.perf_counter() - run["start"], run["first_token"], prompt_tokens, completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        self._runs.pop(run_id, None)
+        self.stats.record_error()
+
+
+_model_stats = {tier: ModelStats() for tier in TIERS}
+
+
+def get_model_stats() -> dict:
+    return {tier: {"model": tier_model_name(tier), **s.stats()} for tier, s in _model_stats.items()}
+
+
+@dataclass(frozen=True)
+class ModelTiers:
+    reasoning: Any
+    summarization: Any
+    structured: Any
+
+    @classmethod
+    def single(cls, model) -> "ModelTiers":
+        """Every job on one model, as before tiering (tests, custom models).
+
+        Summaries and the Receipt still run tagged ``nostream``, as the
+        quiet tiers of ``get_model_tiers`` are, so their output never
+        reaches the client as tokens.
+        """
+        quiet = model.with_config(tags=[TAG_NOSTREAM])
+        return cls(reasoning=model, summarization=quiet, structured=quiet)
+
+
+def create_tier_model(tier: str):
+    """Create ``tier``'s chat model with metrics (and, if enabled, the response cache) attached."""
+    name = tier_model_name(tier)
+    replay = get_replay()
+    scale = 1.0
+    if name != tier_model_name("reasoning"):
+        scale = float(os.getenv("REPLAY_SMALL_MODEL_LATENCY_SCALE", "0.4"))
+    if replay is not None and replay.mode != "record":
+        model = replay.chat_model(latency_scale=scale)
+    else:
+        if ":" in name:
+            model = init_chat_model(name)
+        else:
+            model = init_chat_model(name, model_provider="openai")
+        if replay is not None:
+            model = replay.chat_model(inner=model, latency_scale=scale)
+    model.callbacks = [TierMetricsCallback(_model_stats[tier])]
+    if tier in cached_tiers():
+        model.cache = get_llm_cache()
+    if tier in _QUIET_TIERS:
+        model.tags = [*(model.tags or []), TAG_NOSTREAM]
+    return model
+
+
+_tiers: ModelTiers | None = None
+
+
+def get_model_tiers() -> ModelTiers:
+    """Return the process-wide model tiers, created from env on first use."""
+    global _tiers
+    if _tiers is None:
+        _tiers = ModelTiers(**{tier: create_tier_model(tier) for tier in TIERS})
+    return _tiers
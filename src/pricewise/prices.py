@@ -0,0 +1,248 @@
+"""Structured price extraction from search-result snippets.
+
+Replaces the old "first ``$`` match in the top result" heuristic with a
+batch extractor that understands:
+
+  - currency symbols and codes (``$``, ``US$``, ``€``, ``£``, ``299 USD``,
+    ``USD 299``)
+  - thousands separators in both styles (``$1,299.99``, ``1.299,99 €``),
+    and spaces when the amount has cents (``1 299,00 €``); without cents
+    ``1 299 €`` could as well be two numbers, so it isn't read as ``299``
+  - ranges (``$49 - $79``, ``$49–79``, ``from $49 to $79``)
+  - was/now pairs (``was $399, now $299``; ``list price $399``)
+  - per-unit prices (``$2.99/oz``, ``$29 per month``, ``$0.99 each``),
+    which are kept out of product price statistics
+  - discounts and thresholds (``save $50``, ``save up to $100``, ``$10 off``,
+    ``orders over $35``)
+
+``summarize_prices`` turns a whole Tavily result list into per-retailer
+min/median/max figures plus a compact dict artifact for downstream code.
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from statistics import median
+from urllib.parse import urlparse
+
+_SYMBOLS = {
+    "$": "USD", "US$": "USD", "C$": "CAD", "CA$": "CAD", "A$": "AUD", "AU$": "AUD",
+    "€": "EUR", "£": "GBP", "¥": "JPY", "₹": "INR",
+}
+_CODES = {"USD", "EUR", "GBP", "CAD", "AUD", "JPY", "INR"}
+
+_NUM = (
+    r"\d{1,3}(?:[,.\u00a0\u202f]\d{3})+(?:[.,]\d{1,2})?"
+    r"|\d{1,3}(?: \d{3})+[.,]\d{2}(?!\d)"  # "1 299,00": plain spaces only with cents
+    r"|\d+(?:[.,]\d{1,2})?"
+)
+_PRICE_RE = re.compile(
+    r"(?P<sym>US\$|CA\$|AU\$|C\$|A\$|[$€£¥₹]|(?<![A-Za-z])(?:USD|EUR|GBP|CAD|AUD|JPY|INR)(?=\s?\d))"
+    r"\s?(?P<num>" + _NUM + r")"
+    # Not the tail of "1 299 €": a number right after digits and a space.
+    r"|(?<![\w.,])(?<!\d )(?P<num2>" + _NUM + r")\s?(?P<code>USD|EUR|GBP|CAD|AUD|JPY|INR|€|£)(?!\w)"
+)
+# "$49-79" / "$49 – 79": a bare number right after a price closes a range.
+_RANGE_TAIL_RE = re.compile(r"\s*(?:-|–|—|to)\s*(?P<num>" + _NUM + r")(?![\d%])")
+_RANGE_JOIN_RE = re.compile(r"^\s*(?:-|–|—|to)\s*$")
+_UNIT_RE = re.compile(
+    r"\s*(?:(?:/|per\s+|a\s+)\s*(?P<unit>oz|ounce|fl\.? ?oz|lb|pound|kg|g|ml|l|liter|litre|"
+    r"count|ct|each|unit|item|pack|month|mo|year|yr|week|day|hour)\b|(?P<each>each|apiece|ea\.)(?!\w))",
+    re.IGNORECASE,
+)
+_WAS_RE = re.compile(
+    r"(?:\bwas|\blist(?: price)?|\breg(?:ular|\.)?(?: price)?|\boriginally|\bmsrp|\brrp"
+    r"|\bcompare at|\bretail(?: price)?)\W{0,3}$",
+    re.IGNORECASE,
+)
+_DISCOUNT_BEFORE_RE = re.compile(
+    r"(?:\bsave|\bsaving|\boff|\bover|\bunder|\babove|\bcoupon|\brebate|\bcredit|\bdiscount of)"
+    r"(?:\s+up\s+to)?\W{0,3}$",
+    re.IGNORECASE,
+)
+_DISCOUNT_AFTER_RE = re.compile(r"^\s*(?:off\b|discount\b|savings?\b|rebate\b|cash ?back\b)", re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class PriceMention:
+    """One price found in a snippet.
+
+    ``kind`` is ``"price"`` (a product price), ``"range"`` (``low``..``high``),
+    ``"was"`` (a list/reference price), ``"unit"`` (per-unit or recurring),
+    or ``"discount"`` (savings, thresholds). Only ``price`` and ``range``
+    feed the price statistics.
+    """
+
+    value: float
+    currency: str
+    kind: str = "price"
+    high: float | None = None
+    was: float | None = None
+    unit: str | None = None
+
+
+def parse_amount(text: str) -> float:
+    """Parse a number with either thousands style: ``1,299.99`` or ``1.299,99``."""
+    text = text.replace("\u00a0", "").replace("\u202f", "").replace(" ", "")
+    last_sep = max(text.rfind(","), text.rfind("."))
+    if last_sep != -1 and 1 <= len(text) - last_sep - 1 <= 2:
+        whole = re.sub(r"[,.]", "", text[:last_sep])
+        return float(f"{whole}.{text[last_sep + 1:]}")
+    return float(re.sub(r"[,.]", "", text))
+
+
+def extract_prices(text: str) -> list[PriceMention]:
+    """Extract every price mention from one snippet, in order of appearance."""
+    mentions: list[PriceMention] = []
+    matches = list(_PRICE_RE.finditer(text))
+    skip_until = -1
+    last_price_end = -1
+
+    for i, m in enumerate(matches):
+        if m.start() < skip_until:
+            continue
+        if m.group("sym"):
+            currency = _SYMBOLS.get(m.group("sym"), m.group("sym"))
+            value = parse_amount(m.group("num"))
+        else:
+            code = m.group("code")
+            currency = code if code in _CODES else _SYMBOLS[code]
+            value = parse_amount(m.group("num2"))
+
+        before = text[max(0, m.start() - 24):m.start()]
+        after = text[m.end():m.end() + 24]
+
+        unit = _UNIT_RE.match(after)
+        if unit:
+            name = unit.group("unit") or "each"
+            mentions.append(PriceMention(value, currency, kind="unit", unit=name.lower()))
+            continue
+        if _DISCOUNT_BEFORE_RE.search(before) or _DISCOUNT_AFTER_RE.match(after):
+            mentions.append(PriceMention(value, currency, kind="discount"))
+            continue
+        if _WAS_RE.search(before):
+            mentions.append(PriceMention(value, currency, kind="was"))
+            # "$298 (was $399)": a reference price right after a price belongs to it.
+            prev = mentions[-2] if len(mentions) > 1 else None
+            if (
+                prev is not None and prev.kind == "price" and prev.was is None
+                and prev.currency == currency and m.start() - last_price_end <= 16
+            ):
+                prev.was = value
+            continue
+
+        # Ranges: "$49 - $79" (two priced ends) or "$49-79" (bare tail).
+        nxt = matches[i + 1] if i + 1 < len(matches) else None
+        if nxt is not None and _RANGE_JOIN_RE.match(text[m.end():nxt.start()]):
+            high_text = nxt.group("num") or nxt.group("num2")
+            mentions.append(PriceMention(value, currency, kind="range", high=parse_amount(high_text)))
+            skip_until = nxt.end()
+            continue
+        tail = _RANGE_TAIL_RE.match(text, m.end())
+        if tail and (nxt is None or tail.end() <= nxt.start()):
+            high = parse_amount(tail.group("num"))
+            if high > value:
+                mentions.append(PriceMention(value, currency, kind="range", high=high))
+                continue
+
+        mention = PriceMention(value, currency)
+        if mentions and mentions[-1].kind == "was" and mentions[-1].currency == currency:
+            mention.was = mentions[-1].value
+        mentions.append(mention)
+        last_price_end = m.end()
+
+    return mentions
+
+
+def extract_prices_batch(texts: list[str]) -> list[list[PriceMention]]:
+    """Extract prices from many snippets in one call."""
+    return [extract_prices(text) for text in texts]
+
+
+def product_prices(mentions: list[PriceMention]) -> list[float]:
+    """Values that describe what the product costs (ranges count both ends)."""
+    values: list[float] = []
+    for m in mentions:
+        if m.kind == "price":
+            values.append(m.value)
+        elif m.kind == "range":
+            values.extend((m.value, m.high))
+    return values
+
+
+def retailer_name(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host or "unknown"
+
+
+def _stats(values: list[float]) -> dict:
+    return {
+        "min": round(min(values), 2),
+        "median": round(median(values), 2),
+        "max": round(max(values), 2),
+        "count": len(values),
+    }
+
+
+def summarize_prices(results: list[dict]) -> dict | None:
+    """Compute per-retailer and overall price statistics for a result list.
+
+    Returns a compact, JSON-serializable artifact, or None if no product
+    price was found. Only the dominant currency is counted so a stray
+    ``£`` snippet can't skew a USD comparison.
+    """
+    mentions_per_result = extract_prices_batch([r.get("content", "") for r in results])
+    currencies = Counter(
+        m.currency
+        for mentions in mentions_per_result
+        for m in mentions
+        if m.kind in ("price", "range")
+    )
+    if not currencies:
+        return None
+    currency = currencies.most_common(1)[0][0]
+
+    by_retailer: dict[str, dict] = {}
+    for result, mentions in zip(results, mentions_per_result):
+        own = [m for m in mentions if m.currency == currency]
+        values = product_prices(own)
+        if not values:
+            continue
+        name = retailer_name(result.get("url", ""))
+        entry = by_retailer.setdefault(name, {"values": [], "was": None, "url": result.get("url", "")})
+        entry["values"].extend(values)
+        was = [m.was for m in own if m.was is not None]
+        if was:
+            entry["was"] = max(was + ([entry["was"]] if entry["was"] else []))
+
+    retailers = [
+        {"retailer": name, **_stats(entry["values"]), "was": entry["was"], "url": entry["url"]}
+        for name, entry in by_retailer.items()
+    ]
+    retailers.sort(key=lambda r: r["min"])
+    all_values = [v for entry in by_retailer.values() for v in entry["values"]]
+    return {"currency": currency, "overall": _stats(all_values), "retailers": retailers}
+
+
+def currency_symbol(currency: str) -> str:
+    """The shortest symbol for a currency code (``USD`` → ``$``), or ``""``."""
+    return {v: k for k, v in reversed(_SYMBOLS.items())}.get(currency, "")
+
+
+def format_price_summary(summary: dict) -> str:
+    """Render a summary artifact as a few compact lines for the model."""
+    symbol = currency_symbol(summary["currency"])
+    overall = summary["overall"]
+    lines = [
+        f"Price summary ({summary['currency']}): "
+        f"min {symbol}{overall['min']:.2f}, median {symbol}{overall['median']:.2f}, "
+        f"max {symbol}{overall['max']:.2f} across {len(summary['retailers'])} retailer(s)"
+    ]
+    for r in summary["retailers"]:
+        line = f"  - {r['retailer']}: {symbol}{r['min']:.2f}"
+        if r["max"] != r["min"]:
+            line += f"–{symbol}{r['max']:.2f}"
+        if r["was"]:
+            line += f" (was {symbol}{r['was']:.2f})"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,509 @@
+"""Record/replay stand-ins for the OpenAI model and the Tavily APIs.
+
+Lets the whole agent run offline, so the graph, checkpointer and SSE
+path can be profiled without paying for (or waiting on) the network.
+Three modes, picked with ``REPLAY_MODE``:
+
+  - ``record``: call the real model/APIs and save every interaction to
+    the cassette at ``REPLAY_CASSETTE`` when the process exits
+  - ``replay``: answer from the cassette; a request that was never
+    recorded raises :class:`CassetteMiss`
+  - ``synthetic``: no cassette — generate plausible, deterministic tool
+    calls, answers and search results from the request itself, so any
+    number of distinct sessions can be driven (see ``synthetic_prompts``)
+
+Artificial latency makes replays look like the real services:
+``REPLAY_MODEL_LATENCY_MS`` (time to first token), ``REPLAY_TOKEN_LATENCY_MS``
+(per streamed chunk) and ``REPLAY_SEARCH_LATENCY_MS`` (per search/extract).
+
+A cassette is one JSON object per line, gzip-compressed when the path
+ends in ``.gz``. Requests are keyed by a hash of what was sent with
+run-specific ids left out. A request recorded several times replays
+its responses in order and then cycles.
+"""
+
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables.config import var_child_runnable_config
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+MODES = ("record", "replay", "synthetic")
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode for a request the cassette doesn't hold."""
+
+
+def _hash(payload) -> str:
+    data = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode()).hexdigest()[:24]
+
+
+class Cassette:
+    """Recorded responses keyed by request hash."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._entries: dict[str, list] = {}
+        self._cursors: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _open(path: str, mode: str):
+        return gzip.open(path, mode + "t", encoding="utf-8") if path.endswith(".gz") else open(path, mode, encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        cassette = cls(path)
+        if os.path.exists(path):
+            with cls._open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        cassette._entries.setdefault(entry["k"], []).append(entry["r"])
+        return cassette
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._entries.values())
+
+    def record(self, key: str, response) -> None:
+        with self._lock:
+            self._entries.setdefault(key, []).append(response)
+
+    def next(self, key: str):
+        """The next recorded response for ``key``, or None."""
+        with self._lock:
+            responses = self._entries.get(key)
+            if not responses:
+                return None
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            return responses[cursor % len(responses)]
+
+    def save(self, path: str | None = None) -> None:
+        path = path or self.path
+        if path is None:
+            return
+        with self._lock:
+            with self._open(path, "w") as f:
+                for key, responses in self._entries.items():
+                    for response in responses:
+                        f.write(json.dumps({"k": key, "r": response}, separators=(",", ":"), default=str) + "\n")
+
+
+# -- synthetic data ------------------------------------------------------------
+
+_BRANDS = (
+    "Sony", "Bose", "Apple", "Samsung", "LG", "Dell", "Lenovo", "Asus", "Dyson", "Philips",
+    "Logitech", "Anker", "JBL", "Garmin", "Canon", "Nikon", "Breville", "Ninja", "Roku", "Razer",
+)
+_PRODUCTS = (
+    "wireless headphones", "noise cancelling earbuds", "4K monitor", "laptop", "robot vacuum",
+    "smartwatch", "bluetooth speaker", "mechanical keyboard", "espresso machine", "air fryer",
+    "mirrorless camera", "gaming mouse", "tablet", "soundbar", "electric toothbrush",
+)
+_RETAILERS = (
+    ("amazon.com", "Amazon"), ("bestbuy.com", "Best Buy"), ("walmart.com", "Walmart"),
+    ("target.com", "Target"), ("newegg.com", "Newegg"), ("bhphotovideo.com", "B&H Photo"),
+    ("costco.com", "Costco"), ("ebay.com", "eBay"),
+)
+_PRODUCT_PHRASE = re.compile(r".*\b(?:for|about|on|of)\s+(?:the\s+|a\s+|an\s+)?(.+?)[?.!]*$", re.IGNORECASE)
+
+
+def synthetic_prompts(count: int) -> list[str]:
+    """``count`` distinct shopping requests for driving synthetic sessions."""
+    prompts = []
+    for i in range(count):
+        brand = _BRANDS[i % len(_BRANDS)]
+        product = _PRODUCTS[(i // len(_BRANDS)) % len(_PRODUCTS)]
+        model = i // (len(_BRANDS) * len(_PRODUCTS)) + 1
+        prompts.append(f"Find the best price for the {brand} {product} model {model}")
+    return prompts
+
+
+def _product_from(text: str) -> str:
+    match = _PRODUCT_PHRASE.search(text.strip())
+    return (match.group(1) if match else text).strip()[:80]
+
+
+def synthetic_search(query: str, max_results: int = 5) -> dict:
+    """Deterministic Tavily-shaped search results for ``query``."""
+    rng = random.Random(_hash(query))
+    base = rng.uniform(30, 1500)
+    retailers = rng.sample(_RETAILERS, k=min(max_results, len(_RETAILERS)))
+    slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")
+    results = []
+    for domain, name in retailers:
+        price = base * rng.uniform(0.9, 1.1)
+        was = price * rng.uniform(1.1, 1.3)
+        rating = rng.uniform(3.5, 4.9)
+        stock = rng.choice(("In stock, ships today.", "In stock for store pickup.", "Limited stock.", "Out of stock."))
+        results.append({
+            "url": f"https://www.{domain}/p/{slug}",
+            "title": f"{query} | {name}",
+            "content": (
+                f"{query} - ${price:,.2f} at {name} (was ${was:,.2f}). "
+                f"Rated {rating:.1f} out of 5 stars from {rng.randint(20, 4000):,} reviews. {stock}"
+            ),
+            "score": round(rng.uniform(0.5, 0.99), 3),
+        })
+    return {"query": query, "results": results, "response_time": 0.0}
+
+
+def synthetic_extract(urls: list[str]) -> dict:
+    """Deterministic Tavily-shaped extract results for ``urls``."""
+    return {
+        "results": [
+            {"url": url, "raw_content": synthetic_search(url, max_results=1)["results"][0]["content"]}
+            for url in urls
+        ],
+        "failed_results": [],
+    }
+
+
+def _first_price(messages: list[BaseMessage]) -> float:
+    for m in reversed(messages):
+        if isinstance(m, ToolMessage):
+            found = re.search(r"\$([\d,]+(?:\.\d{1,2})?)", str(m.content))
+            if found:
+                return float(found.group(1).replace(",", ""))
+    return 99.0
+
+
+def _synthetic_reply(messages: list[BaseMessage], tools: list[dict], tool_choice) -> dict:
+    """Pick the next turn of a plausible shopping conversation."""
+    names = [t["function"]["name"] for t in tools]
+    human = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+    product = _product_from(str(human.content)) if human else "the product"
+    call_id = "call_" + _hash([m.content for m in messages])[:16]
+    last = messages[-1] if messages else None
+
+    if tool_choice and len(names) == 1:
+        # Structured output: the only bound tool is the response schema.
+        price = _first_price(messages)
+        args = {
+            "product_name": product,
+            "price": price,
+            "currency": "USD",
+            "price_range": f"${price * 0.95:,.2f} - ${price * 1.05:,.2f}",
+            "recommendation_reason": f"Lowest current listing for {product}.",
+        }
+        return {"content": "", "tool_calls": [{"name": names[0], "args": args, "id": call_id}]}
+
+    if isinstance(last, HumanMessage) and "compare_prices" in names:
+        return {
+            "content": "",
+            "tool_calls": [{"name": "compare_prices", "args": {"product_name": product}, "id": call_id}],
+        }
+
+    if isinstance(last, ToolMessage):
+        price = _first_price(messages)
+        return {
+            "content": (
+                f"I compared current listings for {product}. The best price I found is "
+                f"${price:,.2f}, with most major retailers within a few percent of that. "
+                "Stock looks healthy, so there's no rush unless a sale ends soon."
+            ),
+            "tool_calls": [],
+        }
+
+    return {
+        "content": f"Summary: the user is shopping for {product} and wants the best current price.",
+        "tool_calls": [],
+    }
+
+
+# -- chat model ------------------------------------------------------------------
+
+def _message_key(message: BaseMessage) -> dict:
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+    entry = {"t": message.type, "c": content}
+    if isinstance(message, AIMessage) and message.tool_calls:
+        entry["tc"] = [[tc["name"], tc["args"]] for tc in message.tool_calls]
+    return entry
+
+
+def _to_payload(message: AIMessage) -> dict:
+    payload = {
+        "content": message.content,
+        "tool_calls": [{"name": tc["name"], "args": tc["args"], "id": tc["id"]} for tc in message.tool_calls],
+    }
+    if message.usage_metadata:
+        payload["usage"] = dict(message.usage_metadata)
+    return payload
+
+
+@contextmanager
+def _detached():
+    """Run the wrapped model outside the graph's run context.
+
+    Otherwise it inherits the graph's callbacks and its own token stream
+    reaches ``stream_mode="messages"`` alongside the replayed one.
+    """
+    token = var_child_runnable_config.set(None)
+    try:
+        yield
+    finally:
+        var_child_runnable_config.reset(token)
+
+
+_CHUNK = re.compile(r"\S+\s*|\s+")
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that records, replays or synthesizes responses.
+
+    Streams replayed text word by word so ``stream_mode="messages"``
+    sees the same token events a real model produces.
+    """
+
+    replay: Any
+    inner: Any = None
+    # Stands in for a faster (smaller) model: scales both latencies.
+    latency_scale: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return f"replay-{self.replay.mode}"
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        formatted = [convert_to_openai_tool(t) for t in tools]
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        return self.bind(tools=formatted, **kwargs)
+
+    def _key(self, messages, tools, tool_choice) -> str:
+        return "chat:" + _hash({
+            "m": [_message_key(m) for m in messages],
+            "tools": sorted(t["function"]["name"] for t in tools),
+            "choice": bool(tool_choice),
+        })
+
+    def _bound_inner(self, tools, tool_choice):
+        if not tools:
+            return self.inner
+        return self.inner.bind_tools(tools, tool_choice=tool_choice)
+
+    def _respond(self, messages, kwargs) -> dict:
+        tools, tool_choice = kwargs.get("tools") or [], kwargs.get("tool_choice")
+        if self.replay.mode == "synthetic":
+            return self.replay.count("hits", _synthetic_reply(messages, tools, tool_choice))
+        key = self._key(messages, tools, tool_choice)
+        if self.replay.mode == "record":
+            with _detached():
+                payload = _to_payload(self._bound_inner(tools, tool_choice).invoke(messages))
+            return self.replay.store(key, payload)
+        return self.replay.lookup(key)
+
+    async def _arespond(self, messages, kwargs) -> dict:
+        tools, tool_choice = kwargs.get("tools") or [], kwargs.get("tool_choice")
+        if self.replay.mode == "record":
+            key = self._key(messages, tools, tool_choice)
+            with _detached():
+                payload = _to_payload(await self._bound_inner(tools, tool_choice).ainvoke(messages))
+            return self.replay.store(key, payload)
+        return self._respond(messages, kwargs)
+
+    @staticmethod
+    def _message(payload: dict) -> AIMessage:
+        return AIMessage(
+            content=payload["content"],
+            tool_calls=payload["tool_calls"],
+            usage_metadata=payload.get("usage"),
+        )
+
+    @staticmethod
+    def _chunks(payload: dict) -> list[AIMessageChunk]:
+        chunks = [AIMessageChunk(content=piece) for piece in _CHUNK.findall(payload["content"])]
+        if payload["tool_calls"]:
+            chunks.append(AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc["id"], "index": i}
+                    for i, tc in enumerate(payload["tool_calls"])
+                ],
+            ))
+        if not chunks:
+            chunks.append(AIMessageChunk(content=""))
+        if payload.get("usage"):
+            chunks[-1].usage_metadata = payload["usage"]
+        return chunks
+
+    @property
+    def _first_token_latency(self) -> float:
+        return self.replay.model_latency * self.latency_scale
+
+    @property
+    def _token_latency(self) -> float:
+        return self.replay.token_latency * self.latency_scale
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        payload = self._respond(messages, kwargs)
+        time.sleep(self._first_token_latency + self._token_latency * len(self._chunks(payload)))
+        return ChatResult(generations=[ChatGeneration(message=self._message(payload))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        payload = await self._arespond(messages, kwargs)
+        await asyncio.sleep(self._first_token_latency + self._token_latency * len(self._chunks(payload)))
+        return ChatResult(generations=[ChatGeneration(message=self._message(payload))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        payload = self._respond(messages, kwargs)
+        time.sleep(self._first_token_latency)
+        for chunk in self._chunks(payload):
+            if self._token_latency:
+                time.sleep(self._token_latency)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        payload = await self._arespond(messages, kwargs)
+        await asyncio.sleep(self._first_token_latency)
+        for chunk in self._chunks(payload):
+            if self._token_latency:
+                await asyncio.sleep(self._token_latency)
+            yield ChatGenerationChunk(message=chunk)
+
+
+# -- search / extract ------------------------------------------------------------
+
+class ReplaySearch:
+    """Stands in for ``TavilySearch`` (``invoke``/``ainvoke`` with a query)."""
+
+    def __init__(self, replay: "Replay", name: str, max_results: int, inner=None):
+        self.replay = replay
+        self.name = name
+        self.max_results = max_results
+        self.inner = inner
+
+    def _key(self, query) -> str:
+        return f"search:{self.name}:" + _hash(query)
+
+    def _respond(self, query):
+        if self.replay.mode == "synthetic":
+            return self.replay.count("hits", synthetic_search(query, self.max_results))
+        return self.replay.lookup(self._key(query))
+
+    def invoke(self, query):
+        if self.replay.mode == "record":
+            return self.replay.store(self._key(query), self.inner.invoke(query))
+        response = self._respond(query)
+        time.sleep(self.replay.search_latency)
+        return response
+
+    async def ainvoke(self, query):
+        if self.replay.mode == "record":
+            return self.replay.store(self._key(query), await self.inner.ainvoke(query))
+        response = self._respond(query)
+        await asyncio.sleep(self.replay.search_latency)
+        return response
+
+
+class ReplayExtract(ReplaySearch):
+    """Stands in for ``TavilyExtract`` (``invoke``/``ainvoke`` with ``{"urls": [...]}``)."""
+
+    def _respond(self, query):
+        if self.replay.mode == "synthetic":
+            return self.replay.count("hits", synthetic_extract(query["urls"]))
+        return self.replay.lookup(self._key(query))
+
+
+class Replay:
+    """One record/replay session: a mode, a cassette and latency settings."""
+
+    def __init__(
+        self,
+        mode: str,
+        cassette: Cassette | None = None,
+        model_latency: float = 0.0,
+        token_latency: float = 0.0,
+        search_latency: float = 0.0,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown replay mode {mode!r}; expected one of {MODES}")
+        if mode != "synthetic" and cassette is None:
+            raise ValueError(f"Replay mode {mode!r} needs a cassette")
+        self.mode = mode
+        self.cassette = cassette
+        self.model_latency = model_latency
+        self.token_latency = token_latency
+        self.search_latency = search_latency
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "recorded": 0}
+
+    def count(self, key: str, value=None):
+        with self._lock:
+            self._stats[key] += 1
+        return value
+
+    def lookup(self, key: str):
+        response = self.cassette.next(key)
+        if response is None:
+            self.count("misses")
+            raise CassetteMiss(f"No recorded response for {key} in {self.cassette.path}")
+        return self.count("hits", response)
+
+    def store(self, key: str, response):
+        self.cassette.record(key, response)
+        return self.count("recorded", response)
+
+    def chat_model(self, inner=None, latency_scale: float = 1.0) -> ReplayChatModel:
+        return ReplayChatModel(replay=self, inner=inner, latency_scale=latency_scale)
+
+    def search(self, name: str, max_results: int, inner=None) -> ReplaySearch:
+        return ReplaySearch(self, name, max_results, inner)
+
+    def extract(self, inner=None) -> ReplayExtract:
+        return ReplayExtract(self, "extract", 1, inner)
+
+    def save(self) -> None:
+        if self.mode == "record" and self.cassette is not None:
+            self.cassette.save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mode": self.mode, **self._stats}
+
+
+_replay: Replay | None = None
+_configured = False
+
+
+def get_replay() -> Replay | None:
+    """Return the process-wide replay session from env, or None when off."""
+    global _replay, _configured
+    if not _configured:
+        _configured = True
+        mode = os.getenv("REPLAY_MODE", "").lower()
+        if mode and mode != "off":
+            path = os.getenv("REPLAY_CASSETTE", "pricewise.cassette.jsonl.gz")
+            _replay = Replay(
+                mode,
+                cassette=None if mode == "synthetic" else Cassette.load(path),
+                model_latency=float(os.getenv("REPLAY_MODEL_LATENCY_MS", "0")) / 1000,
+                token_latency=float(os.getenv("REPLAY_TOKEN_LATENCY_MS", "0")) / 1000,
+                search_latency=float(os.getenv("REPLAY_SEARCH_LATENCY_MS", "0")) / 1000,
+            )
+            if mode == "record":
+                atexit.register(_replay.save)
+    return _replay
+
+
+def set_replay(replay: Replay | None) -> None:
+    """Install ``replay`` process-wide (benchmarks and tests)."""
+    global _replay, _configured
+    _replay = replay
+    _configured = True
@@ -0,0 +1,23 @@
+"""Graph state for the Pricewise agent.
+
+Extends the prebuilt ReAct agent state with the rolling conversation
+summary, so it is checkpointed with the thread and survives restarts.
+"""
+
+from typing import Annotated, NotRequired, Sequence, TypedDict
+
+from langchain_core.messages import BaseMessage
+from langgraph.graph.message import add_messages
+from langgraph.managed import RemainingSteps
+
+from pricewise.schemas import Receipt
+
+
+class PricewiseState(TypedDict):
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+    remaining_steps: NotRequired[RemainingSteps]
+    structured_response: NotRequired[Receipt]
+    # Rolling summary of messages[:summary_watermark]. Messages are only
+    # ever appended to a thread, so a count is a stable watermark.
+    summary: NotRequired[str]
+    summary_watermark: NotRequired[int]
@@ -0,0 +1,82 @@
+"""Fast local token estimation.
+
+A tokenizer round trip is far more precise than we need for budgeting
+context. English prose with the GPT-4o tokenizer averages roughly four
+characters per token, and numbers, URLs and punctuation are denser, so
+the estimate blends character and word counts.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of ``text`` without a tokenizer."""
+    if not text:
+        return 0
+    by_chars = len(text) / 4
+    by_words = len(text.split()) * 1.3
+    return int(max(by_chars, by_words)) + 1
+
+
+# Per-message framing (role, separators) the chat format adds on top of content.
+MESSAGE_OVERHEAD = 4
+
+
+def _message_text(message) -> str:
+    content = message.content
+    if not isinstance(content, str):
+        content = json.dumps(content, default=str)
+    for tc in getattr(message, "tool_calls", None) or []:
+        content += tc["name"] + json.dumps(tc["args"], default=str)
+    return content
+
+
+class MessageTokenCounter:
+    """Token counts per message, cached by message id.
+
+    Messages in graph state are immutable once they have an id, so a
+    count is computed once per message for the life of the process
+    rather than on every model call. Messages without an id are counted
+    but not cached.
+    """
+
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._counts: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, message) -> int:
+        message_id = getattr(message, "id", None)
+        if message_id is not None:
+            with self._lock:
+                cached = self._counts.get(message_id)
+                if cached is not None:
+                    self.hits += 1
+                    self._counts.move_to_end(message_id)
+                    return cached
+        tokens = estimate_tokens(_message_text(message)) + MESSAGE_OVERHEAD
+        if message_id is not None:
+            with self._lock:
+                self.misses += 1
+                self._counts[message_id] = tokens
+                if len(self._counts) > self.max_entries:
+                    self._counts.popitem(last=False)
+        return tokens
+
+    def count_all(self, messages) -> int:
+        return sum(self.count(m) for m in messages)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cached": len(self._counts), "hits": self.hits, "misses": self.misses}
+
+
+_counter = MessageTokenCounter()
+
+
+def get_message_token_counter() -> MessageTokenCounter:
+    return _counter
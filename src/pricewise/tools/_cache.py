@@ -0,0 +1,201 @@
+"""Tiered cache for Tavily search responses.
+
+Tier 1 is an in-process LRU with per-tool TTLs. Tier 2 is an optional
+SQLite file that survives restarts and is shared by every uvicorn worker
+pointing at the same path. Only successful responses are cached — errors
+and empty result sets always go back to Tavily.
+
+Responses are copied in and out: a hit hands every caller its own copy,
+so one that edits results in place (re-ranking, compaction) can't
+change what other sessions get.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+
+DEFAULT_TTL = 30 * 60
+
+# Prices and stock move quickly; reviews and coupons pages barely change
+# within a day.
+TOOL_TTLS: dict[str, float] = {
+    "search_product": 30 * 60,
+    "compare_prices": 10 * 60,
+    "check_availability": 5 * 60,
+    "find_coupons": 60 * 60,
+    "get_reviews": 24 * 60 * 60,
+    "delegate_research": 30 * 60,
+}
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCT = re.compile(r"[?!.,;:]+$")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share a key.
+
+    Lowercases, collapses whitespace, and strips trailing punctuation:
+    ``"  Sony WH-1000XM5  Price buy?"`` → ``"sony wh-1000xm5 price buy"``.
+    """
+    query = _WHITESPACE.sub(" ", query.strip().lower())
+    return _TRAILING_PUNCT.sub("", query)
+
+
+def make_request_key(query: str, params: dict | None = None) -> str:
+    """Identify an upstream request by its normalized query and search params."""
+    key = normalize_query(query)
+    if params:
+        key += ":" + json.dumps(params, sort_keys=True, default=str)
+    return key
+
+
+def make_cache_key(tool: str, query: str, params: dict | None = None) -> str:
+    """Build a stable cache key from the tool name, query, and search params."""
+    return f"{tool}:{make_request_key(query, params)}"
+
+
+def is_cacheable(response) -> bool:
+    """Only cache responses that actually carry results."""
+    if isinstance(response, dict):
+        return "error" not in response and bool(response.get("results"))
+    if isinstance(response, list):
+        return bool(response)
+    return False
+
+
+class SearchCache:
+    """In-process LRU with an optional SQLite tier behind it.
+
+    Args:
+        max_entries: Capacity of the in-memory LRU.
+        ttls: Per-tool TTL overrides in seconds (falls back to ``TOOL_TTLS``).
+        path: SQLite file for the persistent tier, or None to disable it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttls: dict[str, float] | None = None,
+        path: str | None = None,
+    ):
+        self.max_entries = max_entries
+        self.ttls = {**TOOL_TTLS, **(ttls or {})}
+        self.path = path
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "sets": 0,
+        }
+        self._db: sqlite3.Connection | None = None
+        if path:
+            self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def ttl_for(self, tool: str) -> float:
+        return self.ttls.get(tool, DEFAULT_TTL)
+
+    def get(self, key: str):
+        """Return the cached response for ``key``, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return deepcopy(value)
+                del self._entries[key]
+                self._stats["expirations"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = json.loads(row[0]), row[1]
+                    if expires_at > now:
+                        self._remember(key, value, expires_at)
+                        self._stats["hits"] += 1
+                        self._stats["disk_hits"] += 1
+                        return deepcopy(value)
+                    self._db.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._stats["expirations"] += 1
+
+            self._stats["misses"] += 1
+            return None
+
+    def contains(self, key: str) -> bool:
+        """Check for a live entry without touching LRU order or counters."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return True
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT 1 FROM search_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                return row is not None
+        return False
+
+    def set(self, tool: str, key: str, value) -> None:
+        """Store ``value`` under ``key`` with the TTL configured for ``tool``."""
+        expires_at = time.time() + self.ttl_for(tool)
+        with self._lock:
+            self._remember(key, deepcopy(value), expires_at)
+            self._stats["sets"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, default=str), expires_at),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, value, expires_at: float) -> None:
+        # Caller holds the lock.
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM search_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "persistent": self._db is not None,
+            }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -1,13 +1,250 @@
+import inspect
+import json
+import os
+import time
+from typing import Callable
+
 from langchain_tavily import TavilySearch
 
-_tavily = None
+from pricewise.replay import get_replay
+from pricewise.tools._cache import SearchCache, is_cacheable, make_cache_key, make_request_key
+from pricewise.tools._compact import CompactionStats, compact_results
+from pricewise.tools._http import PooledTavilySearchAPIWrapper
+from pricewise.tools._profiles import SEARCH_PROFILES, ProfileStats, SearchProfile, get_profile
+from pricewise.tools._rerank import RerankStats, rerank
+from pricewise.tools._singleflight import SingleFlight
+
+_tavilies: dict[str, TavilySearch] = {}
+_cache: SearchCache | None = None
+_flights = SingleFlight()
+_searches: dict[str, "CachedSearch"] = {}
+_compaction = CompactionStats()
+_reranks = RerankStats()
+_profile_stats = ProfileStats()
+# tool name -> builds the search query from the tool's arguments
+_search_queries: dict[str, "Callable[..., str]"] = {}
+
+# Token budget for each tool's formatted output. Override per tool with
+# TOKEN_BUDGET_<TOOL_NAME> (e.g. TOKEN_BUDGET_COMPARE_PRICES=800); 0 disables.
+TOOL_TOKEN_BUDGETS: dict[str, int] = {
+    "search_product": 400,
+    "compare_prices": 500,
+    "get_reviews": 500,
+    "find_coupons": 350,
+    "check_availability": 350,
+    "scrape_url": 800,
+}
+
+
+def get_rerank_candidates() -> int | None:
+    """Fetch-size override for local re-ranking (``RERANK_CANDIDATES``).
+
+    Unset uses each profile's ``candidates``; 0 turns re-ranking off, so
+    every profile fetches only its ``max_results``.
+    """
+    value = os.getenv("RERANK_CANDIDATES")
+    return int(value) if value else None
+
+
+def _fetch_count(profile: SearchProfile) -> int:
+    override = get_rerank_candidates()
+    if override is None:
+        return profile.fetch_count(rerank=True)
+    if override == 0:
+        return profile.fetch_count(rerank=False)
+    return max(profile.max_results, override)
+
+
+def _build_search(profile: SearchProfile, name: str = "default"):
+    replay = get_replay()
+    if replay is not None and replay.mode != "record":
+        return replay.search(name, _fetch_count(profile))
+    search = TavilySearch(
+        max_results=_fetch_count(profile),
+        topic=profile.topic,
+        search_depth=profile.search_depth,
+        include_domains=list(profile.include_domains) or None,
+        exclude_domains=list(profile.exclude_domains) or None,
+        time_range=profile.time_range,
+        include_raw_content=profile.include_raw_content,
+        api_wrapper=PooledTavilySearchAPIWrapper(),
+    )
+    return replay.search(name, _fetch_count(profile), inner=search) if replay else search
+
+
+def _get_raw_tavily(tool: str):
+    """Return the TavilySearch for ``tool``'s profile, building it once."""
+    name = tool if tool in SEARCH_PROFILES else "default"
+    if name not in _tavilies:
+        _tavilies[name] = _build_search(get_profile(tool), name)
+    return _tavilies[name]
+
+
+def get_search_cache() -> SearchCache:
+    """Return the process-wide search cache, creating it from env on first use.
+
+    ``SEARCH_CACHE_SIZE`` sets the in-memory LRU capacity and
+    ``SEARCH_CACHE_PATH`` enables the shared SQLite tier.
+    """
+    global _cache
+    if _cache is None:
+        _cache = SearchCache(
+            max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "1024")),
+            path=os.getenv("SEARCH_CACHE_PATH") or None,
+        )
+    return _cache
+
+
+def get_singleflight() -> SingleFlight:
+    """Return the process-wide coalescer for in-flight Tavily requests."""
+    return _flights
+
+
+class CachedSearch:
+    """Per-tool handle that answers from the search cache before calling Tavily.
+
+    Cache misses go through the single-flight coalescer, so concurrent
+    identical queries from different sessions share one upstream request.
+    Exposes the same ``invoke``/``ainvoke`` surface as ``TavilySearch`` so
+    tools (and the tests that mock them) don't care which one they hold.
+    """
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.profile = get_profile(tool)
+        self._params = self.profile.params()
+
+    def _record(self, response, seconds: float) -> None:
+        results = response.get("results", []) if isinstance(response, dict) else []
+        payload = len(json.dumps(response, default=str).encode())
+        _profile_stats.record(self.tool, payload, len(results), seconds)
+
+    def _fetch(self, query: str):
+        start = time.perf_counter()
+        response = _get_raw_tavily(self.tool).invoke(query)
+        self._record(response, time.perf_counter() - start)
+        return response
+
+    async def _afetch(self, query: str):
+        start = time.perf_counter()
+        response = await _get_raw_tavily(self.tool).ainvoke(query)
+        self._record(response, time.perf_counter() - start)
+        return response
+
+    def is_cached(self, query: str) -> bool:
+        return get_search_cache().contains(make_cache_key(self.tool, query, self._params))
+
+    async def afetch(self, query: str):
+        """Fetch ``query`` upstream without reading or filling the cache.
+
+        For speculative calls whose result must stay private until the
+        user approves it; hand it over with ``store`` once they do.
+        """
+        return await _flights.ado(make_request_key(query, self._params), lambda: self._afetch(query))
+
+    def store(self, query: str, response) -> None:
+        if is_cacheable(response):
+            get_search_cache().set(self.tool, make_cache_key(self.tool, query, self._params), response)
+
+    def invoke(self, query: str):
+        cache = get_search_cache()
+        key = make_cache_key(self.tool, query, self._params)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
+        response = _flights.do(make_request_key(query, self._params), lambda: self._fetch(query))
+        if is_cacheable(response):
+            cache.set(self.tool, key, response)
+        return response
 
-def get_tavily():
-    global _tavily
-    if _tavily is None:
-        _tavily = TavilySearch(max_results=5, topic="general")
-    return _tavily
+    async def ainvoke(self, query: str):
+        cache = get_search_cache()
+        key = make_cache_key(self.tool, query, self._params)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = await _flights.ado(make_request_key(query, self._params), lambda: self._afetch(query))
+        if is_cacheable(response):
+            cache.set(self.tool, key, response)
+        return response
+
+
+def search_query(tool: str):
+    """Register how ``tool`` turns its arguments into a search query.
+
+    Lets callers outside the tool (e.g. the approval policy) ask whether
+    a call would be answered from the cache without running it.
+    """
+    def register(build: Callable[..., str]) -> Callable[..., str]:
+        _search_queries[tool] = build
+        return build
+
+    return register
+
+
+def build_search_query(tool: str, args: dict) -> str | None:
+    """The search query ``tool`` would send for ``args``, or None if it isn't a search."""
+    build = _search_queries.get(tool)
+    if build is None:
+        return None
+    try:
+        return build(**args)
+    except TypeError:
+        return None
+
+
+def search_query_args(tool: str) -> frozenset[str]:
+    """Names of the arguments ``tool``'s search query is built from (empty if it isn't a search)."""
+    build = _search_queries.get(tool)
+    if build is None:
+        return frozenset()
+    return frozenset(inspect.signature(build).parameters)
+
+
+def is_search_cached(tool: str, args: dict) -> bool:
+    """True if calling ``tool`` with ``args`` would hit the search cache."""
+    query = build_search_query(tool, args)
+    return query is not None and get_tavily(tool).is_cached(query)
+
+
+def get_tavily(tool: str = "search"):
+    """Return the cached search handle for ``tool``."""
+    if tool not in _searches:
+        _searches[tool] = CachedSearch(tool)
+    return _searches[tool]
+
+
+def get_token_budget(tool: str) -> int | None:
+    """Token budget for ``tool``'s output, or None when compaction is off."""
+    budget = int(os.getenv(f"TOKEN_BUDGET_{tool.upper()}", TOOL_TOKEN_BUDGETS.get(tool, 0)))
+    return budget or None
+
+
+def get_compaction_stats() -> CompactionStats:
+    return _compaction
+
+
+def get_profile_stats() -> ProfileStats:
+    return _profile_stats
+
+
+def get_rerank_stats() -> RerankStats:
+    return _reranks
+
+
+def rank_results(results, max_items, tool, query):
+    """Pick the ``max_items`` results that best serve ``tool`` for ``query``.
+
+    Falls back to Tavily's order when re-ranking is off.
+    """
+    if get_rerank_candidates() == 0:
+        return results[:max_items]
+    ranked = rerank(results, query, tool, max_items)
+    top = {id(r) for r in results[:max_items]}
+    _reranks.record(len(results), sum(1 for r in ranked if id(r) not in top))
+    return ranked
 
 
 def parse_tavily_response(response):
@@ -22,11 +259,36 @@ def parse_tavily_response(response):
         return None, f"Unexpected response format: {type(response)}"
 
 
-def format_results(results, max_items, url_label="URL"):
-    """Format Tavily results into a numbered list."""
+def _numbered(results, url_label):
     formatted = []
-    for i, r in enumerate(results[:max_items], 1):
+    for i, r in enumerate(results, 1):
         url = r.get("url", "N/A")
         content = r.get("content", "No description")
         formatted.append(f"{i}. {content}\n   {url_label}: {url}")
     return "\n\n".join(formatted)
+
+
+def format_results(results, max_items, url_label="URL", tool=None, query=None):
+    """Format Tavily results into a numbered list.
+
+    Given a ``query``, the candidates are re-ranked for ``tool`` before
+    the top ``max_items`` are kept. When ``tool`` has a token budget, the
+    results are then compacted to fit it and the savings are recorded in
+    the compaction stats.
+    """
+    if tool and query is not None:
+        results = rank_results(results, max_items, tool, query)
+    else:
+        results = results[:max_items]
+    budget = get_token_budget(tool) if tool else None
+    if budget is None:
+        return _numbered(results, url_label)
+
+    full = _numbered(results, url_label)
+    kept = compact_results(results, budget)
+    if not kept:
+        # Everything looked like boilerplate; the raw text beats nothing.
+        return full
+    compacted = _numbered(kept, url_label)
+    _compaction.record(tool, full, compacted)
+    return compacted
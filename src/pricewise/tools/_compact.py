@@ -0,0 +1,127 @@
+"""Token-budgeted compaction of search results before they reach the model.
+
+Tool messages stay in the conversation and are resent on every later
+model call, so every boilerplate sentence costs tokens many times over.
+``compact_results`` fits a result list to a token budget by:
+
+  1. collapsing results that point at the same URL
+  2. dropping boilerplate sentences (cookie banners, "add to cart", ...)
+  3. dropping sentences already shown for an earlier result
+  4. filling the budget round-robin — every result's first sentence
+     before anyone's second — so trimming never silences a source
+"""
+
+import logging
+import re
+import threading
+from urllib.parse import urlsplit
+
+from pricewise.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_WHITESPACE = re.compile(r"\s+")
+_BOILERPLATE = re.compile(
+    r"cookie|skip to (?:main )?content|sign in|log in|create an account|add to (?:cart|basket|wish ?list)"
+    r"|all rights reserved|privacy policy|terms (?:of use|and conditions)|subscribe to|newsletter"
+    r"|enable javascript|javascript is disabled|share (?:on|this)|follow us|back to top"
+    r"|we earn a commission|affiliate links?|advertisement",
+    re.IGNORECASE,
+)
+
+
+def _normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    host = parts.netloc.lower().removeprefix("www.")
+    return f"{host}{parts.path.rstrip('/')}"
+
+
+def _sentence_key(sentence: str) -> str:
+    return _WHITESPACE.sub(" ", sentence.lower()).strip(" .!?")
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+
+
+class CompactionStats:
+    """Running per-tool totals of what compaction saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools: dict[str, dict] = {}
+
+    def record(self, tool: str, before: str, after: str) -> dict:
+        call = {
+            "bytes_before": len(before.encode()),
+            "bytes_after": len(after.encode()),
+            "tokens_before": estimate_tokens(before),
+            "tokens_after": estimate_tokens(after),
+        }
+        with self._lock:
+            totals = self._tools.setdefault(tool, {"calls": 0, "bytes_saved": 0, "tokens_saved": 0})
+            totals["calls"] += 1
+            totals["bytes_saved"] += call["bytes_before"] - call["bytes_after"]
+            totals["tokens_saved"] += call["tokens_before"] - call["tokens_after"]
+        logger.debug(
+            "compacted %s: %d→%d bytes, %d→%d tokens", tool,
+            call["bytes_before"], call["bytes_after"], call["tokens_before"], call["tokens_after"],
+        )
+        return call
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {tool: dict(totals) for tool, totals in self._tools.items()}
+
+
+def compact_results(results: list[dict], token_budget: int) -> list[dict]:
+    """Return copies of ``results`` whose combined content fits ``token_budget``.
+
+    Results whose every sentence was boilerplate or a duplicate are dropped.
+    """
+    merged: dict[str, dict] = {}
+    for r in results:
+        url = r.get("url", "N/A")
+        key = _normalize_url(url)
+        if key in merged:
+            merged[key]["sentences"].extend(split_sentences(r.get("content", "")))
+        else:
+            merged[key] = {"url": url, "sentences": split_sentences(r.get("content", ""))}
+
+    seen: set[str] = set()
+    candidates = []
+    for entry in merged.values():
+        kept = []
+        for sentence in entry["sentences"]:
+            key = _sentence_key(sentence)
+            if not key or key in seen or _BOILERPLATE.search(sentence):
+                continue
+            seen.add(key)
+            kept.append(sentence)
+        if kept:
+            candidates.append({"url": entry["url"], "sentences": kept, "chosen": []})
+
+    remaining = token_budget
+    depth = 0
+    while remaining > 0 and any(depth < len(c["sentences"]) for c in candidates):
+        for c in candidates:
+            if depth >= len(c["sentences"]):
+                continue
+            sentence = c["sentences"][depth]
+            cost = estimate_tokens(sentence)
+            if cost > remaining:
+                # Cut the overflowing sentence rather than leave budget unused.
+                if remaining >= 8:
+                    c["chosen"].append(sentence[: remaining * 4].rstrip() + "…")
+                remaining = 0
+                break
+            c["chosen"].append(sentence)
+            remaining -= cost
+        depth += 1
+
+    return [
+        {"url": c["url"], "content": " ".join(c["chosen"])}
+        for c in candidates
+        if c["chosen"]
+    ]
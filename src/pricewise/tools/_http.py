@@ -0,0 +1,160 @@
+"""Shared keep-alive connection pools for the Tavily API.
+
+The stock langchain-tavily wrappers open a fresh ``requests`` connection or
+``aiohttp.ClientSession`` per call, paying a TCP + TLS handshake on every
+search. These subclasses route both the sync and async paths through one
+process-wide pool instead. Limits come from the environment:
+
+  - ``TAVILY_POOL_SIZE``: total open connections (default 100)
+  - ``TAVILY_POOL_PER_HOST``: connections per host (default 32)
+  - ``TAVILY_KEEPALIVE``: idle keep-alive in seconds (default 30)
+  - ``TAVILY_TIMEOUT``: per-request timeout in seconds (default 30)
+"""
+
+import asyncio
+import math
+import os
+import threading
+import weakref
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_tavily._utilities import (
+    TAVILY_API_URL,
+    TavilyExtractAPIWrapper,
+    TavilySearchAPIWrapper,
+)
+
+_sync_session: requests.Session | None = None
+_sync_lock = threading.Lock()
+# One session per event loop: aiohttp sessions are bound to the loop that
+# created them, and replacing one on a loop switch would leak its sockets.
+_async_sessions: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _pool_limits() -> dict:
+    return {
+        "size": int(os.getenv("TAVILY_POOL_SIZE", "100")),
+        "per_host": int(os.getenv("TAVILY_POOL_PER_HOST", "32")),
+        "keepalive": float(os.getenv("TAVILY_KEEPALIVE", "30")),
+        "timeout": float(os.getenv("TAVILY_TIMEOUT", "30")),
+    }
+
+
+def get_sync_session() -> requests.Session:
+    """Return the process-wide ``requests`` session (thread-safe pool)."""
+    global _sync_session
+    with _sync_lock:
+        if _sync_session is None:
+            limits = _pool_limits()
+            # Enough per-host pools to hold the whole budget at per_host each.
+            hosts = max(1, math.ceil(limits["size"] / limits["per_host"]))
+            adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=limits["per_host"])
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sync_session = session
+        return _sync_session
+
+
+def get_async_session() -> aiohttp.ClientSession:
+    """Return the shared ``aiohttp`` session for the running event loop.
+
+    aiohttp sessions are bound to the loop that created them, so each loop
+    (e.g. one per test case) gets its own, kept until the pools are closed.
+    """
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        limits = _pool_limits()
+        connector = aiohttp.TCPConnector(
+            limit=limits["size"],
+            limit_per_host=limits["per_host"],
+            keepalive_timeout=limits["keepalive"],
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=limits["timeout"]),
+        )
+        _async_sessions[loop] = session
+    return session
+
+
+async def close_http_pools() -> None:
+    """Close both pools. Called from the API lifespan on shutdown.
+
+    Sessions of other loops that are still running are closed on their
+    own loop; those of closed loops can't be awaited any more and are
+    just forgotten.
+    """
+    global _sync_session
+    current = asyncio.get_running_loop()
+    sessions = list(_async_sessions.items())
+    _async_sessions.clear()
+    for loop, session in sessions:
+        if session.closed or loop.is_closed():
+            continue
+        if loop is current:
+            await session.close()
+        elif loop.is_running():
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+    with _sync_lock:
+        if _sync_session is not None:
+            _sync_session.close()
+            _sync_session = None
+
+
+def _headers(api_key) -> dict:
+    return {
+        "Authorization": f"Bearer {api_key.get_secret_value()}",
+        "Content-Type": "application/json",
+        "X-Client-Source": "langchain-tavily",
+    }
+
+
+def _post(wrapper, path: str, params: dict) -> dict:
+    params = {k: v for k, v in params.items() if v is not None}
+    base_url = wrapper.api_base_url or TAVILY_API_URL
+    response = get_sync_session().post(
+        f"{base_url}/{path}",
+        json=params,
+        headers=_headers(wrapper.tavily_api_key),
+        timeout=_pool_limits()["timeout"],
+    )
+    if response.status_code != 200:
+        detail = response.json().get("detail", {})
+        error_message = detail.get("error") if isinstance(detail, dict) else "Unknown error"
+        raise ValueError(f"Error {response.status_code}: {error_message}")
+    return response.json()
+
+
+async def _apost(wrapper, path: str, params: dict) -> dict:
+    params = {k: v for k, v in params.items() if v is not None}
+    base_url = wrapper.api_base_url or TAVILY_API_URL
+    async with get_async_session().post(
+        f"{base_url}/{path}", json=params, headers=_headers(wrapper.tavily_api_key)
+    ) as res:
+        if res.status != 200:
+            raise Exception(f"Error {res.status}: {res.reason}")
+        return await res.json(content_type=None)
+
+
+class PooledTavilySearchAPIWrapper(TavilySearchAPIWrapper):
+    """``TavilySearchAPIWrapper`` that reuses the shared connection pools."""
+
+    def raw_results(self, query: str, **kwargs) -> dict:
+        return _post(self, "search", {"query": query, **kwargs})
+
+    async def raw_results_async(self, query: str, **kwargs) -> dict:
+        return await _apost(self, "search", {"query": query, **kwargs})
+
+
+class PooledTavilyExtractAPIWrapper(TavilyExtractAPIWrapper):
+    """``TavilyExtractAPIWrapper`` that reuses the shared connection pools."""
+
+    def raw_results(self, urls: list[str], **kwargs) -> dict:
+        return _post(self, "extract", {"urls": urls, **kwargs})
+
+    async def raw_results_async(self, urls: list[str], **kwargs) -> dict:
+        return await _apost(self, "extract", {"urls": urls, **kwargs})
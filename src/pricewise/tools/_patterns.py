@@ -0,0 +1,20 @@
+"""Regexes for the signals search snippets carry: prices, ratings, stock, coupon codes.
+
+Shared by the re-ranker (:mod:`pricewise.tools._rerank`), which rewards
+snippets that contain them, and by tool-output eviction
+(:mod:`pricewise.middleware.tool_eviction`), which keeps their matches.
+"""
+
+import re
+
+PRICE = re.compile(r"(?:US\$|C\$|A\$|[$€£¥₹])\s?\d|\d\s?(?:USD|EUR|GBP)\b")
+RATING = re.compile(
+    r"\b\d(?:\.\d)?\s?(?:/|out of)\s?(?:5|10)\b|\b\d(?:\.\d)?\s?stars?\b|\b\d{1,3}(?:,\d{3})*\s(?:reviews|ratings)\b",
+    re.IGNORECASE,
+)
+STOCK = re.compile(
+    r"\b(?:in stock|out of stock|sold out|available (?:now|for|at)|ships? (?:in|by|today|free)"
+    r"|(?:store )?pickup|backorder(?:ed)?|pre-?order|unavailable|limited stock|only \d+ left)\b",
+    re.IGNORECASE,
+)
+CODE = re.compile(r"\b(?:code|coupon|promo)\b[:\s]+[A-Z0-9]{4,}\b|\b\d{1,2}%\s?off\b", re.IGNORECASE)
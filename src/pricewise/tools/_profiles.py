@@ -0,0 +1,86 @@
+"""Per-tool Tavily search profiles.
+
+TavilySearch fixes ``max_results``, ``include_raw_content`` and friends at
+construction time, so one shared instance meant every tool paid for (and
+parsed) the same five full results. Each tool now names a profile, and
+``_client`` builds one TavilySearch per profile on first use.
+
+``max_results`` is what the tool shows the model by default; when local
+re-ranking is on, ``candidates`` results are fetched instead so the
+ranker has something to choose from.
+"""
+
+import threading
+from dataclasses import asdict, dataclass
+
+# Sites that rank well for product queries but never carry a price,
+# stock status or coupon the tools can use.
+_SOCIAL = ("youtube.com", "pinterest.com", "facebook.com", "instagram.com", "tiktok.com")
+
+
+@dataclass(frozen=True)
+class SearchProfile:
+    max_results: int = 5
+    candidates: int = 10
+    search_depth: str = "basic"
+    topic: str = "general"
+    include_domains: tuple[str, ...] = ()
+    exclude_domains: tuple[str, ...] = ()
+    time_range: str | None = None
+    include_raw_content: bool = False
+
+    def fetch_count(self, rerank: bool) -> int:
+        return max(self.max_results, self.candidates) if rerank else self.max_results
+
+    def params(self) -> dict:
+        """Request-shaping fields, for cache and coalescing keys."""
+        return {k: v for k, v in asdict(self).items() if v not in (None, ())}
+
+
+DEFAULT_PROFILE = SearchProfile()
+
+SEARCH_PROFILES: dict[str, SearchProfile] = {
+    "search_product": SearchProfile(max_results=3, candidates=6),
+    "compare_prices": SearchProfile(max_results=5, candidates=10, exclude_domains=_SOCIAL),
+    "get_reviews": SearchProfile(max_results=3, candidates=8, exclude_domains=("pinterest.com",)),
+    "find_coupons": SearchProfile(max_results=5, candidates=8, time_range="month", exclude_domains=_SOCIAL),
+    "check_availability": SearchProfile(max_results=5, candidates=8, time_range="week", exclude_domains=_SOCIAL),
+    "delegate_research": SearchProfile(max_results=5, candidates=5, exclude_domains=_SOCIAL),
+}
+
+
+def get_profile(tool: str) -> SearchProfile:
+    return SEARCH_PROFILES.get(tool, DEFAULT_PROFILE)
+
+
+class ProfileStats:
+    """Upstream payload size and latency per search profile."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: dict[str, dict] = {}
+
+    def record(self, profile: str, payload_bytes: int, results: int, seconds: float) -> None:
+        with self._lock:
+            entry = self._profiles.setdefault(
+                profile, {"requests": 0, "bytes": 0, "results": 0, "latency_ms": 0.0, "max_latency_ms": 0.0}
+            )
+            entry["requests"] += 1
+            entry["bytes"] += payload_bytes
+            entry["results"] += results
+            entry["latency_ms"] += seconds * 1000
+            entry["max_latency_ms"] = max(entry["max_latency_ms"], seconds * 1000)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "requests": e["requests"],
+                    "avg_bytes": round(e["bytes"] / e["requests"]),
+                    "avg_results": round(e["results"] / e["requests"], 2),
+                    "avg_latency_ms": round(e["latency_ms"] / e["requests"], 1),
+                    "max_latency_ms": round(e["max_latency_ms"], 1),
+                }
+                for name, e in self._profiles.items()
+            }
+
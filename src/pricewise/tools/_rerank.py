@@ -0,0 +1,129 @@
+"""Local BM25 re-ranking of over-fetched search results.
+
+Tavily's order is tuned for general relevance, not for what each tool
+needs: the snippet with an actual price or star rating is often in
+position 4 or 5 and falls off ``results[:max_items]``, which costs a
+follow-up tool call. ``rerank`` scores the whole candidate set with
+BM25 over the user's query plus a per-tool vocabulary, adds a bonus for
+snippets that contain the signal the tool is after (a price, a rating,
+a stock phrase), and returns the top-k.
+
+Tavily's own order is kept as a small prior, so results with equal
+scores stay in the order Tavily returned them.
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+
+from pricewise.tools._patterns import CODE, PRICE, RATING, STOCK
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+@dataclass(frozen=True)
+class Vocabulary:
+    """What a tool's ideal snippet looks like.
+
+    ``terms`` are scored with BM25 at ``term_weight`` relative to query
+    terms; each ``features`` regex that matches adds its weight once.
+    """
+
+    terms: tuple[str, ...] = ()
+    term_weight: float = 0.5
+    features: tuple[tuple[re.Pattern, float], ...] = field(default_factory=tuple)
+
+
+TOOL_VOCABULARIES: dict[str, Vocabulary] = {
+    "compare_prices": Vocabulary(
+        terms=("price", "sale", "deal", "now", "was", "buy", "cheapest", "lowest"),
+        features=((PRICE, 2.0),),
+    ),
+    "get_reviews": Vocabulary(
+        terms=("review", "rating", "rated", "stars", "pros", "cons", "verdict", "tested"),
+        features=((RATING, 2.0),),
+    ),
+    "check_availability": Vocabulary(
+        terms=("stock", "available", "availability", "ships", "shipping", "pickup", "delivery", "sold"),
+        features=((STOCK, 2.0),),
+    ),
+    "find_coupons": Vocabulary(
+        terms=("coupon", "code", "promo", "discount", "off", "deal", "save"),
+        features=((CODE, 2.0),),
+    ),
+    "search_product": Vocabulary(
+        terms=("specs", "price", "features", "review"),
+        term_weight=0.25,
+        features=((PRICE, 0.5),),
+    ),
+}
+
+
+class BM25:
+    """Okapi BM25 over a small, in-memory document set."""
+
+    def __init__(self, docs: list[list[str]], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.tfs = [Counter(doc) for doc in docs]
+        self.lengths = [len(doc) for doc in docs]
+        self.avg_length = (sum(self.lengths) / len(docs)) if docs else 0.0
+        df = Counter(term for tf in self.tfs for term in tf)
+        n = len(docs)
+        self.idf = {term: math.log((n - d + 0.5) / (d + 0.5) + 1.0) for term, d in df.items()}
+
+    def score(self, index: int, terms) -> float:
+        tf = self.tfs[index]
+        norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / (self.avg_length or 1.0))
+        total = 0.0
+        for term in terms:
+            freq = tf.get(term)
+            if freq:
+                total += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+        return total
+
+
+def rerank(results: list[dict], query: str, tool: str, k: int) -> list[dict]:
+    """Return the ``k`` best results for ``tool``, best first."""
+    if not results:
+        return []
+    vocab = TOOL_VOCABULARIES.get(tool, Vocabulary())
+    texts = [r.get("content", "") or "" for r in results]
+    bm25 = BM25([tokenize(text) for text in texts])
+    query_terms = set(tokenize(query))
+    vocab_terms = set(vocab.terms) - query_terms
+
+    scored = []
+    for i, text in enumerate(texts):
+        score = bm25.score(i, query_terms) + vocab.term_weight * bm25.score(i, vocab_terms)
+        score += sum(weight for pattern, weight in vocab.features if pattern.search(text))
+        # Tavily's order as a tie-breaking prior: worth far less than one matching term.
+        score -= 0.01 * i
+        scored.append((score, i))
+
+    scored.sort(key=lambda s: (-s[0], s[1]))
+    return [results[i] for _, i in scored[:k]]
+
+
+class RerankStats:
+    """How often re-ranking pulled a result up from beyond the top-k."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "candidates": 0, "promoted": 0}
+
+    def record(self, candidates: int, promoted: int) -> None:
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["candidates"] += candidates
+            self._stats["promoted"] += promoted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
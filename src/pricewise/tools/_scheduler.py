@@ -0,0 +1,262 @@
+"""Process-wide bounded scheduler for delegate_research sub-researches.
+
+Replaces the per-call ``ThreadPoolExecutor`` so N concurrent sessions can't
+start 5N threads. Two limits apply to every sub-research:
+
+  - a global cap shared by the whole process (``RESEARCH_MAX_CONCURRENCY``)
+  - a per-session cap so one big request can't starve others
+    (``RESEARCH_MAX_PER_SESSION``)
+
+Each sub-research gets a deadline (``RESEARCH_ITEM_TIMEOUT`` seconds,
+measured from when it starts running, so time queued behind other
+sessions in the executor doesn't count). Items that miss it are reported
+through ``on_timeout`` so the caller can return partial results. On the
+sync path an item that can't even get a session slot within that long
+after the call is dropped without running (counted as ``dropped``), so
+a call stays bounded when hung items hold every slot.
+
+On the async path late items are cancelled. A worker thread can't be
+interrupted, so on the sync path it runs on in the executor and its
+late result is thrown away, but it hands its session slot back at once
+so hung threads don't hold up the rest of the call. Those threads are
+counted as ``abandoned`` (``abandoned_active`` while they still run).
+
+The async path (API server) and the sync path (CLI, direct invocation)
+keep separate slot pools: asyncio primitives are bound to one event loop
+and the sync path is bounded by its shared executor.
+"""
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class ResearchScheduler:
+    """Run sub-researches under a global and a per-session concurrency limit."""
+
+    def __init__(
+        self,
+        global_limit: int = 16,
+        per_session_limit: int = 4,
+        item_timeout: float = 20.0,
+    ):
+        self.global_limit = global_limit
+        self.per_session_limit = per_session_limit
+        self.item_timeout = item_timeout
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._session_sems: dict[str, tuple[threading.BoundedSemaphore, int]] = {}
+        self._loop_limits: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._stats = {
+            "started": 0, "completed": 0, "timed_out": 0, "active": 0,
+            "abandoned": 0, "abandoned_active": 0, "dropped": 0,
+        }
+
+    # -- bookkeeping ---------------------------------------------------------
+
+    def _count(self, key: str, delta: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += delta
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "global_limit": self.global_limit,
+                "per_session_limit": self.per_session_limit,
+            }
+
+    # -- sync path -------------------------------------------------------------
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.global_limit, thread_name_prefix="research"
+                )
+            return self._executor
+
+    def _acquire_session(self, session_id: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem, users = self._session_sems.get(session_id, (None, 0))
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.per_session_limit)
+            self._session_sems[session_id] = (sem, users + 1)
+        return sem
+
+    def _release_session(self, session_id: str) -> None:
+        with self._lock:
+            sem, users = self._session_sems[session_id]
+            if users <= 1:
+                del self._session_sems[session_id]
+            else:
+                self._session_sems[session_id] = (sem, users - 1)
+
+    def run(self, session_id: str, items: list, fn, on_done, on_timeout) -> list:
+        """Run ``fn(item)`` for every item on the shared executor.
+
+        ``on_done(result)`` fires from the worker thread as soon as each item
+        finishes, so callers can stream progress. Returns results in input order.
+        """
+        executor = self._get_executor()
+        sem = self._acquire_session(session_id)
+        results: list = [None] * len(items)
+        reported: set[int] = set()
+        abandoned: set[int] = set()
+        finished: set[int] = set()
+        started: dict[int, float] = {}
+        report_lock = threading.Lock()
+
+        def timed(index: int, item):
+            # The run deadline starts here, not when the item was submitted.
+            with report_lock:
+                started[index] = time.monotonic()
+            return fn(item)
+
+        def report(index: int, result, timed_out: bool = False) -> None:
+            with report_lock:
+                if index in reported:
+                    return
+                reported.add(index)
+                results[index] = result
+            self._count("timed_out" if timed_out else "completed")
+            on_done(result)
+
+        def finish(index: int, future) -> None:
+            self._count("active", -1)
+            with report_lock:
+                late = index in abandoned
+                if not late:
+                    finished.add(index)
+            if late:
+                # Its slot was handed back when it was abandoned.
+                self._count("abandoned_active", -1)
+                return
+            sem.release()
+            if not future.cancelled() and future.exception() is None:
+                report(index, future.result())
+
+        try:
+            waiting = list(range(len(items)))
+            slot_deadline = time.monotonic() + self.item_timeout
+            indexes = {}
+            pending = set()
+            while waiting or pending:
+                now = time.monotonic()
+                if waiting and now >= slot_deadline:
+                    # Stuck behind hung items for a whole timeout: never run.
+                    for index in waiting:
+                        self._count("dropped")
+                        report(index, on_timeout(items[index]), timed_out=True)
+                    waiting = []
+                # Submit as slots free up, without blocking the deadline checks.
+                while waiting and sem.acquire(blocking=False):
+                    index = waiting.pop(0)
+                    self._count("started")
+                    self._count("active")
+                    future = executor.submit(timed, index, items[index])
+                    indexes[future] = index
+                    pending.add(future)
+                    future.add_done_callback(lambda f, i=index: finish(i, f))
+                if not pending:
+                    if waiting:
+                        # Every slot is held by another run of this session.
+                        if sem.acquire(timeout=max(0.0, slot_deadline - now)):
+                            sem.release()
+                    continue
+
+                with report_lock:
+                    deadlines = {f: started[indexes[f]] + self.item_timeout for f in pending if indexes[f] in started}
+                # An item that starts while we wait is due at most item_timeout from now.
+                timeout = self.item_timeout
+                if deadlines:
+                    timeout = min(timeout, min(deadlines.values()) - now)
+                if waiting:
+                    # Slots freed by other runs of the session don't wake the wait.
+                    timeout = min(timeout, slot_deadline - now, 0.05)
+                done, pending = wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                expired = {f for f in pending if f in deadlines and deadlines[f] <= now and not f.done()}
+                for future in expired:
+                    # The thread runs on; finish() throws its late result away.
+                    index = indexes[future]
+                    with report_lock:
+                        if index in finished:
+                            continue  # finished just now; finish() reported it
+                        abandoned.add(index)
+                    sem.release()  # don't let dead threads block the rest
+                    self._count("abandoned")
+                    self._count("abandoned_active")
+                    report(index, on_timeout(items[index]), timed_out=True)
+                pending -= expired
+                for future in done:
+                    # Raises unexpected errors from fn, like the old as_completed loop.
+                    report(indexes[future], future.result())
+        finally:
+            self._release_session(session_id)
+
+        return results
+
+    # -- async path ------------------------------------------------------------
+
+    def _async_limits(self, session_id: str) -> tuple[asyncio.Semaphore, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        limits = self._loop_limits.get(loop)
+        if limits is None:
+            limits = (asyncio.Semaphore(self.global_limit), {})
+            self._loop_limits[loop] = limits
+        global_sem, session_sems = limits
+        if session_id not in session_sems:
+            session_sems[session_id] = [asyncio.Semaphore(self.per_session_limit), 0]
+        session_sems[session_id][1] += 1
+        return global_sem, session_sems[session_id][0]
+
+    def _release_async(self, session_id: str) -> None:
+        _, session_sems = self._loop_limits[asyncio.get_running_loop()]
+        session_sems[session_id][1] -= 1
+        if session_sems[session_id][1] == 0:
+            del session_sems[session_id]
+
+    async def arun(self, session_id: str, items: list, afn, on_done, on_timeout) -> list:
+        """Async counterpart of :meth:`run`; cancels items that miss the deadline."""
+        global_sem, session_sem = self._async_limits(session_id)
+
+        async def one(item):
+            # Take the session slot first so a waiting session never
+            # holds a global slot it can't use yet.
+            async with session_sem, global_sem:
+                self._count("started")
+                self._count("active")
+                try:
+                    result = await asyncio.wait_for(afn(item), self.item_timeout)
+                    self._count("completed")
+                except TimeoutError:
+                    self._count("timed_out")
+                    result = on_timeout(item)
+                finally:
+                    self._count("active", -1)
+            on_done(result)
+            return result
+
+        try:
+            return await asyncio.gather(*(one(item) for item in items))
+        finally:
+            self._release_async(session_id)
+
+
+_scheduler: ResearchScheduler | None = None
+
+
+def get_research_scheduler() -> ResearchScheduler:
+    """Return the process-wide scheduler, configured from env on first use."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ResearchScheduler(
+            global_limit=int(os.getenv("RESEARCH_MAX_CONCURRENCY", "16")),
+            per_session_limit=int(os.getenv("RESEARCH_MAX_PER_SESSION", "4")),
+            item_timeout=float(os.getenv("RESEARCH_ITEM_TIMEOUT", "20")),
+        )
+    return _scheduler
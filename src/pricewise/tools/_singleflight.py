@@ -0,0 +1,94 @@
+"""Single-flight coalescing of identical in-flight upstream calls.
+
+When several sessions fire the same search at once, the first caller
+(the leader) makes the upstream request and everyone else waits on its
+result. The in-flight table holds ``concurrent.futures.Future`` objects so
+sync callers in worker threads and async callers on the event loop can
+share one flight in either direction.
+
+Every caller gets its own deep copy of the result, so one session
+mutating its response can't change what the others see. The leader
+keeps the untouched original in the future for late joiners to copy.
+"""
+
+import asyncio
+import copy
+import threading
+from concurrent.futures import CancelledError, Future
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        self._stats = {"calls": 0, "upstream_calls": 0, "saved_calls": 0}
+
+    def _join(self, key: str) -> tuple[Future, bool]:
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self._stats["saved_calls"] += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            self._stats["upstream_calls"] += 1
+            return future, True
+
+    def _leave(self, key: str) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def do(self, key: str, fn):
+        """Run ``fn()`` once for all concurrent sync callers sharing ``key``."""
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return copy.deepcopy(future.result())
+                except CancelledError:
+                    # The leader was cancelled; take over the flight.
+                    continue
+            try:
+                result = fn()
+            except BaseException as exc:
+                future.set_exception(exc)
+                raise
+            else:
+                future.set_result(result)
+                return copy.deepcopy(result)
+            finally:
+                self._leave(key)
+
+    async def ado(self, key: str, afn):
+        """Await ``afn()`` once for all concurrent callers sharing ``key``."""
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    # Shield so a cancelled waiter doesn't cancel the shared future.
+                    return copy.deepcopy(await asyncio.shield(asyncio.wrap_future(future)))
+                except asyncio.CancelledError:
+                    if not future.cancelled():
+                        raise
+                    continue
+            try:
+                result = await afn()
+            except asyncio.CancelledError:
+                # Let waiters retry instead of inheriting our cancellation.
+                future.cancel()
+                raise
+            except BaseException as exc:
+                future.set_exception(exc)
+                raise
+            else:
+                future.set_result(result)
+                return copy.deepcopy(result)
+            finally:
+                self._leave(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._inflight)}
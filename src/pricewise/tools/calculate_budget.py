@@ -39,3 +39,10 @@ def calculate_budget(items: list, tax_rate: float = 0.0, budget_limit: float | N
             result += f"\n\n  OVER BUDGET by ${abs(remaining):.2f}"
 
     return result
+
+
+async def _acalculate_budget(items: list, tax_rate: float = 0.0, budget_limit: float | None = None) -> str:
+    return calculate_budget.func(items, tax_rate, budget_limit)
+
+
+calculate_budget.coroutine = _acalculate_budget
@@ -1,6 +1,21 @@
 from langchain_core.tools import tool
 from pricewise.schemas import AvailabilityQuery
-from pricewise.tools._client import get_tavily, parse_tavily_response, format_results
+from pricewise.tools._client import get_tavily, parse_tavily_response, format_results, search_query
+
+
+@search_query("check_availability")
+def _query(product_name: str, max_sources: int = 5) -> str:
+    return f"{product_name} in stock available buy now"
+
+
+def _format(response, product_name: str, max_sources: int) -> str:
+    results, error = parse_tavily_response(response)
+    if error:
+        return error
+    if not results:
+        return f"No availability information found for '{product_name}'."
+
+    return format_results(results, max_sources, url_label="Retailer", tool="check_availability", query=product_name)
 
 
 @tool(args_schema=AvailabilityQuery)
@@ -10,12 +25,13 @@ def check_availability(product_name: str, max_sources: int = 5) -> str:
     Use this when the user wants to know if a product is in stock,
     where it can be purchased, or its availability across different stores.
     """
-    response = get_tavily().invoke(f"{product_name} in stock available buy now")
+    response = get_tavily("check_availability").invoke(_query(product_name))
+    return _format(response, product_name, max_sources)
+
+
+async def _acheck_availability(product_name: str, max_sources: int = 5) -> str:
+    response = await get_tavily("check_availability").ainvoke(_query(product_name))
+    return _format(response, product_name, max_sources)
 
-    results, error = parse_tavily_response(response)
-    if error:
-        return error
-    if not results:
-        return f"No availability information found for '{product_name}'."
 
-    return format_results(results, max_sources, url_label="Retailer")
+check_availability.coroutine = _acheck_availability
@@ -1,18 +1,47 @@
 from langchain_core.tools import tool
+from pricewise.prices import format_price_summary, summarize_prices
 from pricewise.schemas import PriceComparisonQuery
-from pricewise.tools._client import get_tavily, parse_tavily_response, format_results
+from pricewise.tools._client import get_tavily, parse_tavily_response, format_results, rank_results, search_query
 
 
-@tool(args_schema=PriceComparisonQuery)
-def compare_prices(product_name: str, max_sources: int = 5) -> str:
-    """Compare prices for a product across multiple online retailers."""
-    response = get_tavily().invoke(f"{product_name} price buy")
+@search_query("compare_prices")
+def _query(product_name: str, max_sources: int = 5) -> str:
+    return f"{product_name} price buy"
+
+
+def _format(response, product_name: str, max_sources: int) -> tuple[str, dict | None]:
+    """Return the tool message plus a structured price artifact.
 
+    The model gets computed min/median/max per retailer up front, so it
+    doesn't have to dig prices out of the raw snippets itself.
+    """
     results, error = parse_tavily_response(response)
     if error:
-        return error
+        return error, None
 
     if not results:
-        return "No price information found."
+        return "No price information found.", None
+
+    results = rank_results(results, max_sources, "compare_prices", product_name)
+    sources = format_results(results, max_sources, tool="compare_prices")
+    summary = summarize_prices(results)
+    if summary is None:
+        return sources, None
+
+    content = f"{format_price_summary(summary)}\n\nSources:\n{sources}"
+    return content, {"tool": "compare_prices", "product": product_name, **summary}
+
+
+@tool(args_schema=PriceComparisonQuery, response_format="content_and_artifact")
+def compare_prices(product_name: str, max_sources: int = 5) -> tuple[str, dict | None]:
+    """Compare prices for a product across multiple online retailers."""
+    response = get_tavily("compare_prices").invoke(_query(product_name))
+    return _format(response, product_name, max_sources)
+
+
+async def _acompare_prices(product_name: str, max_sources: int = 5) -> tuple[str, dict | None]:
+    response = await get_tavily("compare_prices").ainvoke(_query(product_name))
+    return _format(response, product_name, max_sources)
+
 
-    return format_results(results, max_sources)
+compare_prices.coroutine = _acompare_prices
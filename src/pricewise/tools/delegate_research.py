@@ -1,18 +1,22 @@
-import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 
 from langchain_core.tools import tool
+from langgraph.config import get_stream_writer
+from pricewise.prices import summarize_prices
 from pricewise.schemas import DelegationQuery, ProductResearchItem
 from pricewise.tools._client import get_tavily, parse_tavily_response
+from pricewise.tools._scheduler import get_research_scheduler
+from pricewise.tools.wishlist import session_id_var
 
 
-def _research_one(item: ProductResearchItem) -> dict:
-    """Research a single product via Tavily (sync, runs in thread)."""
+def _build_query(item: ProductResearchItem) -> str:
     query = item.product_name
     if item.budget:
         query += f" under ${item.budget}"
+    return query
+
 
-    response = get_tavily().invoke(query)
+def _to_result(item: ProductResearchItem, response) -> dict:
     results, error = parse_tavily_response(response)
 
     if error or not results:
@@ -25,48 +29,122 @@ def _research_one(item: ProductResearchItem) -> dict:
         "content": top.get("content", ""),
         "url": top.get("url", ""),
         "budget": item.budget,
+        # Price stats over every result, not just the first $ in the top one.
+        "prices": summarize_prices(results),
     }
 
 
-@tool(args_schema=DelegationQuery)
-def delegate_research(products: list, total_budget: float | None = None) -> str:
-    """Research multiple products in parallel and synthesize results.
+def _research_one(item: ProductResearchItem) -> dict:
+    """Research a single product via Tavily (sync, runs in thread)."""
+    response = get_tavily("delegate_research").invoke(_build_query(item))
+    return _to_result(item, response)
 
-    Use this when the user asks about multiple product categories in one query
-    (e.g. "I need a laptop, monitor, and keyboard for under $2000").
-    Each product is researched independently and results are combined.
+
+async def _aresearch_one(item: ProductResearchItem) -> dict:
+    """Research a single product via Tavily on the event loop."""
+    response = await get_tavily("delegate_research").ainvoke(_build_query(item))
+    return _to_result(item, response)
+
+
+def _timed_out(item: ProductResearchItem) -> dict:
+    timeout = get_research_scheduler().item_timeout
+    return {
+        "product": item.product_name,
+        "success": False,
+        "timed_out": True,
+        "error": f"Timed out after {timeout:g}s",
+    }
+
+
+def _estimate_price(res: dict) -> float | None:
+    """Median product price across all retailers found for this item."""
+    prices = res.get("prices")
+    return prices["overall"]["median"] if prices else None
+
+
+def _progress_reporter(total: int):
+    """Build an ``on_done`` callback that streams each finished product.
+
+    Results are pushed through LangGraph's custom stream writer, which the
+    API turns into ``research_result`` SSE events. Outside a graph run
+    (tests, direct invocation) there is no writer and progress is dropped.
     """
-    items = [
+    try:
+        writer = get_stream_writer()
+    except (RuntimeError, KeyError):
+        writer = None
+    lock = threading.Lock()
+    completed = 0
+
+    def on_done(res: dict) -> None:
+        nonlocal completed
+        if writer is None:
+            return
+        with lock:
+            completed += 1
+            position = completed
+        writer({
+            "event": "research_result",
+            "product": res["product"],
+            "success": res["success"],
+            "timed_out": res.get("timed_out", False),
+            "url": res.get("url"),
+            "price": _estimate_price(res),
+            "error": res.get("error"),
+            "completed": position,
+            "total": total,
+        })
+
+    return on_done
+
+
+def _to_items(products: list) -> list[ProductResearchItem]:
+    return [
         p if isinstance(p, ProductResearchItem) else ProductResearchItem(**p)
         for p in products
     ]
 
-    # Fan out via thread pool (Tavily client is sync)
-    with ThreadPoolExecutor(max_workers=min(len(items), 5)) as pool:
-        futures = {pool.submit(_research_one, item): item for item in items}
-        results = []
-        for future in as_completed(futures):
-            results.append(future.result())
 
-    # Format output
+def _format(
+    items: list[ProductResearchItem], results: list[dict], total_budget: float | None
+) -> tuple[str, dict]:
     lines = [f"Multi-Product Research ({len(items)} items):\n"]
     total_cost = 0.0
+    products = []
 
     for res in results:
         lines.append(f"--- {res['product']} ---")
+        price = None
         if res["success"]:
             lines.append(f"  {res['content']}")
             lines.append(f"  Source: {res['url']}")
-            price_match = re.search(r"\$(\d+(?:,\d{3})*(?:\.\d{2})?)", res["content"])
-            if price_match:
-                price = float(price_match.group(1).replace(",", ""))
+            price = _estimate_price(res)
+            if price is not None:
                 total_cost += price
-                lines.append(f"  Estimated price: ${price:.2f}")
+                overall = res["prices"]["overall"]
+                line = f"  Estimated price: ${price:.2f}"
+                if overall["count"] > 1:
+                    line += f" (range ${overall['min']:.2f}–${overall['max']:.2f}, {overall['count']} prices)"
+                lines.append(line)
             if res.get("budget"):
                 lines.append(f"  Budget: ${res['budget']:.2f}")
+        elif res.get("timed_out"):
+            lines.append(f"  No result yet ({res['error']}) — partial results only")
         else:
             lines.append(f"  Could not find results: {res['error']}")
         lines.append("")
+        products.append({
+            "product": res["product"],
+            "success": res["success"],
+            "timed_out": res.get("timed_out", False),
+            "price": price,
+            "url": res.get("url"),
+            "prices": res.get("prices"),
+        })
+
+    timed_out = sum(1 for res in results if res.get("timed_out"))
+    if timed_out:
+        lines.append(f"Partial results: {timed_out} of {len(items)} products timed out.")
 
     if total_budget and total_cost > 0:
         lines.append(f"Estimated total: ${total_cost:.2f} / ${total_budget:.2f} budget")
@@ -76,4 +154,46 @@ def delegate_research(products: list, total_budget: float | None = None) -> str:
         else:
             lines.append(f"Over budget by ${-diff:.2f}")
 
-    return "\n".join(lines)
+    artifact = {
+        "tool": "delegate_research",
+        "products": products,
+        "estimated_total": round(total_cost, 2) if total_cost else None,
+        "total_budget": total_budget,
+    }
+    return "\n".join(lines), artifact
+
+
+@tool(args_schema=DelegationQuery, response_format="content_and_artifact")
+def delegate_research(products: list, total_budget: float | None = None) -> tuple[str, dict]:
+    """Research multiple products in parallel and synthesize results.
+
+    Use this when the user asks about multiple product categories in one query
+    (e.g. "I need a laptop, monitor, and keyboard for under $2000").
+    Each product is researched independently and results are combined.
+    """
+    items = _to_items(products)
+
+    # Fan out on the process-wide scheduler (sync path: CLI and direct invocation)
+    results = get_research_scheduler().run(
+        session_id_var.get(), items, _research_one,
+        on_done=_progress_reporter(len(items)),
+        on_timeout=_timed_out,
+    )
+
+    return _format(items, results, total_budget)
+
+
+async def _adelegate_research(products: list, total_budget: float | None = None) -> tuple[str, dict]:
+    items = _to_items(products)
+
+    # Fan out as tasks on the event loop — no threads held during the round trips
+    results = await get_research_scheduler().arun(
+        session_id_var.get(), items, _aresearch_one,
+        on_done=_progress_reporter(len(items)),
+        on_timeout=_timed_out,
+    )
+
+    return _format(items, results, total_budget)
+
+
+delegate_research.coroutine = _adelegate_research
@@ -1,6 +1,21 @@
 from langchain_core.tools import tool
 from pricewise.schemas import CouponQuery
-from pricewise.tools._client import get_tavily, parse_tavily_response, format_results
+from pricewise.tools._client import get_tavily, parse_tavily_response, format_results, search_query
+
+
+@search_query("find_coupons")
+def _query(product_or_retailer: str, max_results: int = 5) -> str:
+    return f"{product_or_retailer} coupon discount code promo deal"
+
+
+def _format(response, product_or_retailer: str, max_results: int) -> str:
+    results, error = parse_tavily_response(response)
+    if error:
+        return error
+    if not results:
+        return f"No active coupons or deals found for '{product_or_retailer}'."
+
+    return format_results(results, max_results, url_label="Source", tool="find_coupons", query=product_or_retailer)
 
 
 @tool(args_schema=CouponQuery)
@@ -10,12 +25,13 @@ def find_coupons(product_or_retailer: str, max_results: int = 5) -> str:
     Use this when the user wants to find promotional codes, special offers,
     or current deals for a specific product or from a specific retailer.
     """
-    response = get_tavily().invoke(f"{product_or_retailer} coupon discount code promo deal")
+    response = get_tavily("find_coupons").invoke(_query(product_or_retailer))
+    return _format(response, product_or_retailer, max_results)
+
+
+async def _afind_coupons(product_or_retailer: str, max_results: int = 5) -> str:
+    response = await get_tavily("find_coupons").ainvoke(_query(product_or_retailer))
+    return _format(response, product_or_retailer, max_results)
 
-    results, error = parse_tavily_response(response)
-    if error:
-        return error
-    if not results:
-        return f"No active coupons or deals found for '{product_or_retailer}'."
 
-    return format_results(results, max_results, url_label="Source")
+find_coupons.coroutine = _afind_coupons
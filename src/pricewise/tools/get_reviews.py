@@ -1,13 +1,14 @@
 from langchain_core.tools import tool
 from pricewise.schemas import ReviewQuery
-from pricewise.tools._client import get_tavily, parse_tavily_response, format_results
+from pricewise.tools._client import get_tavily, parse_tavily_response, format_results, search_query
 
 
-@tool(args_schema=ReviewQuery)
-def get_reviews(product_name: str, max_reviews: int = 3) -> str:
-    """Fetch product reviews and ratings from the web."""
-    response = get_tavily().invoke(f"{product_name} review rating")
+@search_query("get_reviews")
+def _query(product_name: str, max_reviews: int = 3) -> str:
+    return f"{product_name} review rating"
+
 
+def _format(response, product_name: str, max_reviews: int) -> str:
     results, error = parse_tavily_response(response)
     if error:
         return error
@@ -15,4 +16,19 @@ def get_reviews(product_name: str, max_reviews: int = 3) -> str:
     if not results:
         return "No reviews found for this product."
 
-    return format_results(results, max_reviews, url_label="Source")
+    return format_results(results, max_reviews, url_label="Source", tool="get_reviews", query=product_name)
+
+
+@tool(args_schema=ReviewQuery)
+def get_reviews(product_name: str, max_reviews: int = 3) -> str:
+    """Fetch product reviews and ratings from the web."""
+    response = get_tavily("get_reviews").invoke(_query(product_name))
+    return _format(response, product_name, max_reviews)
+
+
+async def _aget_reviews(product_name: str, max_reviews: int = 3) -> str:
+    response = await get_tavily("get_reviews").ainvoke(_query(product_name))
+    return _format(response, product_name, max_reviews)
+
+
+get_reviews.coroutine = _aget_reviews
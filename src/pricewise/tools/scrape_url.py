@@ -8,13 +8,24 @@ from langchain_core.tools import tool
 from langchain_tavily import TavilyExtract
 from pydantic import BaseModel, Field
 
-_extractor: TavilyExtract | None = None
+from pricewise.replay import get_replay
+from pricewise.tools._client import get_compaction_stats, get_token_budget
+from pricewise.tools._compact import compact_results
+from pricewise.tools._http import PooledTavilyExtractAPIWrapper
 
+_extractor = None
 
-def _get_extractor() -> TavilyExtract:
+
+def _get_extractor():
     global _extractor
     if _extractor is None:
-        _extractor = TavilyExtract()
+        replay = get_replay()
+        if replay is not None and replay.mode != "record":
+            _extractor = replay.extract()
+        else:
+            _extractor = TavilyExtract(apiwrapper=PooledTavilyExtractAPIWrapper())
+            if replay is not None:
+                _extractor = replay.extract(inner=_extractor)
     return _extractor
 
 
@@ -24,6 +35,27 @@ class ScrapeUrlInput(BaseModel):
     url: str = Field(description="The product URL to extract information from")
 
 
+def _format(url: str, result) -> str:
+    if isinstance(result, dict) and "results" in result:
+        pages = [
+            {"url": r.get("url", url), "content": r.get("raw_content", r.get("content", ""))}
+            for r in result["results"]
+        ]
+        pages = [p for p in pages if p["content"]]
+
+        if pages:
+            full = "\n---\n".join(p["content"][:3000] for p in pages)
+            budget = get_token_budget("scrape_url")
+            kept = compact_results(pages, budget) if budget else []
+            if not kept:
+                return f"Content from {url}:\n\n{full}"
+            compacted = "\n---\n".join(p["content"] for p in kept)
+            get_compaction_stats().record("scrape_url", full, compacted)
+            return f"Content from {url}:\n\n{compacted}"
+
+    return f"Could not extract useful content from {url}."
+
+
 @tool(args_schema=ScrapeUrlInput)
 def scrape_url(url: str) -> str:
     """Extract product information from a specific URL.
@@ -34,17 +66,18 @@ def scrape_url(url: str) -> str:
     try:
         extractor = _get_extractor()
         result = extractor.invoke({"urls": [url]})
+        return _format(url, result)
+    except Exception as e:
+        return f"Error extracting content from {url}: {e}"
 
-        if isinstance(result, dict) and "results" in result:
-            contents = []
-            for r in result["results"]:
-                raw = r.get("raw_content", r.get("content", ""))
-                if raw:
-                    contents.append(raw[:3000])
-
-            if contents:
-                return f"Content from {url}:\n\n" + "\n---\n".join(contents)
 
-        return f"Could not extract useful content from {url}."
+async def _ascrape_url(url: str) -> str:
+    try:
+        extractor = _get_extractor()
+        result = await extractor.ainvoke({"urls": [url]})
+        return _format(url, result)
     except Exception as e:
         return f"Error extracting content from {url}: {e}"
+
+
+scrape_url.coroutine = _ascrape_url
@@ -1,13 +1,14 @@
 from langchain_core.tools import tool
 from pricewise.schemas import ProductQuery
-from pricewise.tools._client import get_tavily, parse_tavily_response, format_results
+from pricewise.tools._client import get_tavily, parse_tavily_response, format_results, search_query
 
 
-@tool(args_schema=ProductQuery)
-def search_product(query: str, max_results: int = 3) -> str:
-    """Search for a product online using Tavily and return formatted results."""
-    response = get_tavily().invoke(query)
+@search_query("search_product")
+def _query(query: str, max_results: int = 3) -> str:
+    return query
+
 
+def _format(response, query: str, max_results: int) -> str:
     results, error = parse_tavily_response(response)
     if error:
         return error
@@ -15,4 +16,19 @@ def search_product(query: str, max_results: int = 3) -> str:
     if not results:
         return "No products found for this query."
 
-    return format_results(results, max_results)
+    return format_results(results, max_results, tool="search_product", query=query)
+
+
+@tool(args_schema=ProductQuery)
+def search_product(query: str, max_results: int = 3) -> str:
+    """Search for a product online using Tavily and return formatted results."""
+    response = get_tavily("search_product").invoke(_query(query))
+    return _format(response, query, max_results)
+
+
+async def _asearch_product(query: str, max_results: int = 3) -> str:
+    response = await get_tavily("search_product").ainvoke(_query(query))
+    return _format(response, query, max_results)
+
+
+search_product.coroutine = _asearch_product
@@ -64,3 +64,22 @@ def get_wishlist() -> str:
         lines.append(line)
 
     return "Wishlist:\n" + "\n".join(lines)
+
+
+# Local-state tools: run inline on the event loop instead of hopping to the
+# default executor. The session ContextVar is visible either way.
+async def _aadd_to_wishlist(
+    product_name: str,
+    price: float | None = None,
+    url: str | None = None,
+    notes: str | None = None,
+) -> str:
+    return add_to_wishlist.func(product_name, price, url, notes)
+
+
+async def _aget_wishlist() -> str:
+    return get_wishlist.func()
+
+
+add_to_wishlist.coroutine = _aadd_to_wishlist
+get_wishlist.coroutine = _aget_wishlist
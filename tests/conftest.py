@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import pytest
+
+from pricewise.middleware import prefetch, selective_interrupt
+from pricewise.tools import _client
+from pricewise.tools._cache import SearchCache
+from pricewise.tools._singleflight import SingleFlight
+
+
+class FakeTavily:
+    """Local stand-in for TavilySearch that records every upstream call."""
+
+    def __init__(self, results=None, delay: float = 0.0):
+        self.results = results or [
+            {"url": "https://example.com/item", "content": "Example product - $99 at Example"},
+        ]
+        self.delay = delay
+        self.calls = []
+
+    def invoke(self, query):
+        self.calls.append(query)
+        if self.delay:
+            time.sleep(self.delay)
+        return {"query": query, "results": list(self.results)}
+
+    async def ainvoke(self, query):
+        self.calls.append(query)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return {"query": query, "results": list(self.results)}
+
+
+@pytest.fixture(autouse=True)
+def approval_policy(monkeypatch):
+    """A fresh auto-approval policy per test, so remembered approvals don't leak."""
+    monkeypatch.setattr(selective_interrupt, "_policy", None)
+    monkeypatch.setattr(prefetch, "_prefetcher", None)
+
+
+@pytest.fixture
+def fake_tavily(monkeypatch):
+    """Route every cached search handle to a FakeTavily with a fresh cache."""
+    fake = FakeTavily()
+    monkeypatch.setattr(_client, "_tavilies", {})
+    monkeypatch.setattr(_client, "_build_search", lambda profile, name="default": fake)
+    monkeypatch.setattr(_client, "_cache", SearchCache(max_entries=16))
+    monkeypatch.setattr(_client, "_flights", SingleFlight())
+    return fake
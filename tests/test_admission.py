@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from pricewise.api.admission import AdmissionController, QueueFull
+from pricewise.api.routes import _client_key
+
+
+def test_admits_up_to_the_limit_then_queues():
+    admission = AdmissionController(min_limit=1, max_limit=2)
+    first, second, third = (admission.enqueue(k) for k in ("a", "b", "c"))
+    assert first.admitted and second.admitted
+    assert not third.admitted
+    assert admission.position(third) == 1
+
+    admission.release(first)
+    assert third.admitted
+    assert admission.stats()["active"] == 2
+
+
+def test_queue_is_round_robin_across_clients():
+    admission = AdmissionController(min_limit=1, max_limit=1)
+    running = admission.enqueue("busy")
+    busy = [admission.enqueue("busy") for _ in range(3)]
+    quiet = admission.enqueue("quiet")
+    assert admission.position(quiet) == 2
+    assert [admission.position(t) for t in busy] == [1, 3, 4]
+
+    order = []
+    ticket = running
+    for _ in range(4):
+        admission.release(ticket)
+        ticket = next(t for t in busy + [quiet] if t.admitted and not t.released)
+        order.append(ticket.key)
+    assert order == ["busy", "quiet", "busy", "busy"]
+
+
+def test_full_queue_rejects_with_retry_after():
+    admission = AdmissionController(min_limit=1, max_limit=1, max_queue=1)
+    admission.enqueue("a")
+    admission.enqueue("b")
+    with pytest.raises(QueueFull) as exc:
+        admission.enqueue("c")
+    assert 1 <= exc.value.retry_after <= 60
+    assert admission.stats()["rejected"] == 1
+
+
+def test_one_client_cannot_fill_the_queue():
+    admission = AdmissionController(min_limit=1, max_limit=1, max_queued_per_client=2)
+    admission.enqueue("a")
+    admission.enqueue("bot")
+    admission.enqueue("bot")
+    with pytest.raises(QueueFull):
+        admission.enqueue("bot")
+    assert not admission.enqueue("human").admitted
+
+
+def test_cancelled_queued_run_leaves_the_queue():
+    admission = AdmissionController(min_limit=1, max_limit=1)
+    running = admission.enqueue("a")
+    queued = admission.enqueue("b")
+    admission.release(queued)
+    assert admission.stats()["queue_depth"] == 0
+    admission.release(running)
+    assert admission.stats()["active"] == 0
+
+
+def test_limit_backs_off_on_rate_limits_and_slow_starts_then_recovers():
+    admission = AdmissionController(min_limit=2, max_limit=10, target_latency=1.0)
+    admission.release(admission.enqueue("a"), latency=0.2, rate_limited=True)
+    assert admission.stats()["limit"] == 7
+    admission.release(admission.enqueue("a"), latency=3.0)
+    assert admission.stats()["limit"] == 4
+    for _ in range(20):
+        admission.release(admission.enqueue("a"), latency=0.2)
+    assert admission.stats()["limit"] > 4
+    for _ in range(20):
+        admission.release(admission.enqueue("a"), latency=0.2, rate_limited=True)
+    assert admission.stats()["limit"] == 2
+    assert admission.stats()["rate_limited"] == 21
+
+
+@pytest.mark.asyncio
+async def test_wait_reports_positions():
+    admission = AdmissionController(min_limit=1, max_limit=1)
+    running = admission.enqueue("a")
+    ahead = admission.enqueue("b")
+    ticket = admission.enqueue("c")
+    positions = []
+    waiter = asyncio.create_task(admission.wait(ticket, lambda pos, depth: positions.append(pos)))
+    await asyncio.sleep(0)
+    admission.release(running)
+    await asyncio.sleep(0)
+    admission.release(ahead)
+    await waiter
+    assert positions == [2, 1]
+    assert ticket.admitted
+
+
+def _request(host, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (host, 1234)})
+
+
+@pytest.mark.parametrize("trusted, host, forwarded, expected", [
+    ("", "203.0.113.9", "1.2.3.4", "203.0.113.9"),
+    ("10.0.0.1", "203.0.113.9", "1.2.3.4", "203.0.113.9"),
+    ("10.0.0.1", "10.0.0.1", "1.2.3.4", "1.2.3.4"),
+    ("10.0.0.1,10.0.0.2", "10.0.0.1", "6.6.6.6, 1.2.3.4, 10.0.0.2", "1.2.3.4"),
+    ("*", "10.0.0.1", "1.2.3.4", "1.2.3.4"),
+])
+def test_client_key_only_believes_trusted_proxies(monkeypatch, trusted, host, forwarded, expected):
+    monkeypatch.setenv("TRUSTED_PROXIES", trusted)
+    assert _client_key(_request(host, forwarded), "session") == expected
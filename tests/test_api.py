@@ -3,7 +3,14 @@ import pytest_asyncio
 import os
 from unittest.mock import patch
 from httpx import AsyncClient, ASGITransport
+from langgraph.checkpoint.memory import InMemorySaver
+from pricewise.agent import build_agent
 from pricewise.api.app import create_app, lifespan
+from pricewise.middleware.prefetch import get_prefetcher
+from pricewise.middleware.selective_interrupt import get_approval_policy
+from pricewise.replay import Replay, set_replay
+from pricewise.tools._client import is_search_cached
+from pricewise.tools.compare_prices import compare_prices
 
 
 @pytest_asyncio.fixture
@@ -82,3 +89,209 @@ async def test_approve_endpoint_exists(client):
     # Should return SSE stream (even if agent has nothing to resume)
     assert response.status_code == 200
     assert "text/event-stream" in response.headers["content-type"]
+
+
+@pytest.mark.asyncio
+async def test_metrics_exposes_search_cache(client):
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    stats = response.json()["search_cache"]
+    assert {"hits", "misses", "evictions"} <= set(stats)
+
+
+@pytest.mark.asyncio
+async def test_trust_tool(client):
+    session_id = (await client.post("/chat/sessions")).json()["session_id"]
+    response = await client.post(f"/chat/sessions/{session_id}/trust", json={"tool": "scrape_url"})
+    assert response.status_code == 200
+    assert response.json() == {"trusted_tools": ["scrape_url"]}
+
+    response = await client.post(f"/chat/sessions/{session_id}/trust", json={"tool": "calculate_budget"})
+    assert response.status_code == 400
+
+    stats = (await client.get("/metrics")).json()["approvals"]
+    assert {"interrupts", "auto_approved", "round_trips_avoided"} <= set(stats)
+
+
+@pytest.mark.asyncio
+async def test_message_and_approve_cycle_reads_no_checkpoints(client, fake_tavily):
+    replay = Replay("synthetic")
+    set_replay(replay)
+    try:
+        app = client._transport.app
+        app.state.agent = build_agent(checkpointer=InMemorySaver(), model=replay.chat_model())
+        reads = []
+        aget_state = app.state.agent.aget_state
+
+        async def counted(config, **kwargs):
+            reads.append(config["configurable"]["thread_id"])
+            return await aget_state(config, **kwargs)
+
+        app.state.agent.aget_state = counted
+        session_id = (await client.post("/chat/sessions")).json()["session_id"]
+
+        response = await client.post(
+            f"/chat/sessions/{session_id}/messages",
+            json={"content": "Find the best price for the Sony headphones model 1"},
+        )
+        assert "event: approval_required" in response.text
+        assert reads == []
+
+        response = await client.post(f"/chat/sessions/{session_id}/approve", json={"approved": True})
+        assert "event: receipt" in response.text
+        assert reads == []
+
+        stats = (await client.get("/metrics")).json()["snapshots"]
+        assert stats["checkpoint_reads"] == 0
+        assert stats["hits"] == 1
+    finally:
+        set_replay(None)
+
+
+@pytest.mark.asyncio
+async def test_approve_without_snapshot_reads_checkpoint_once(client):
+    session_id = (await client.post("/chat/sessions")).json()["session_id"]
+    app = client._transport.app
+    await client.post(f"/chat/sessions/{session_id}/approve", json={"approved": True})
+    assert app.state.snapshots.stats()["checkpoint_reads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_events_after_last_event_id(client):
+    session_id = (await client.post("/chat/sessions")).json()["session_id"]
+    response = await client.post(f"/chat/sessions/{session_id}/messages", json={"content": "Hello"})
+    frames = response.text.split("\n\n")[:-1]
+    assert frames[0].startswith("id: 1\n")
+
+    response = await client.get(f"/chat/sessions/{session_id}/events", headers={"Last-Event-ID": "1"})
+    assert response.status_code == 200
+    assert response.text.split("\n\n")[:-1] == frames[1:]
+
+
+@pytest.mark.asyncio
+async def test_reconnect_unknown_session(client):
+    response = await client.get("/chat/sessions/nonexistent/events")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_detached_run_can_be_polled_and_attached(client):
+    session_id = (await client.post("/chat/sessions")).json()["session_id"]
+    response = await client.post(f"/chat/sessions/{session_id}/messages?detach=true", json={"content": "Hello"})
+    assert response.status_code == 202
+    run_id = response.json()["run_id"]
+
+    response = await client.get(f"/chat/runs/{run_id}/events")
+    assert response.headers["X-Run-Id"] == run_id
+    assert "event: done" in response.text
+
+    status = (await client.get(f"/chat/runs/{run_id}")).json()
+    assert status["status"] in ("completed", "failed")
+    assert status["session_id"] == session_id
+
+    assert (await client.post(f"/chat/runs/{run_id}/cancel")).json()["status"] == status["status"]
+    assert (await client.get("/chat/runs/nonexistent")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_full_admission_queue_returns_429(client):
+    admission = client._transport.app.state.runs.admission
+    admission.limit, admission.max_queue = 1, 0
+    held = admission.enqueue("another-client")
+
+    session_id = (await client.post("/chat/sessions")).json()["session_id"]
+    response = await client.post(f"/chat/sessions/{session_id}/messages", json={"content": "Hello"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    admission.release(held)
+    stats = (await client.get("/metrics")).json()["admission"]
+    assert stats["rejected"] == 1
+    assert {"queue_depth", "wait_ms", "limit"} <= set(stats)
+
+
+@pytest.mark.asyncio
+async def test_unknown_session_reads_checkpoint_once(client):
+    for _ in range(3):
+        response = await client.post("/chat/sessions/nonexistent/messages", json={"content": "Hi"})
+        assert response.status_code == 404
+    metrics = (await client.get("/metrics")).json()
+    assert metrics["snapshots"]["checkpoint_reads"] == 1
+    assert metrics["sessions"]["negative_hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_denial_after_query_was_cached_keeps_results_from_the_model(client, fake_tavily):
+    replay = Replay("synthetic")
+    set_replay(replay)
+    try:
+        app = client._transport.app
+        app.state.agent = build_agent(checkpointer=InMemorySaver(), model=replay.chat_model())
+        session_id = (await client.post("/chat/sessions")).json()["session_id"]
+        response = await client.post(
+            f"/chat/sessions/{session_id}/messages",
+            json={"content": "Find the best price for the Sony headphones model 1"},
+        )
+        assert "event: approval_required" in response.text
+        assert get_prefetcher().stats()["slots"] == 1
+
+        # Another session's approved search fills the shared cache meanwhile.
+        await compare_prices.ainvoke({"product_name": "Sony headphones model 1", "max_sources": 5})
+        assert is_search_cached("compare_prices", {"product_name": "Sony headphones model 1"})
+
+        response = await client.post(f"/chat/sessions/{session_id}/approve", json={"approved": False})
+        assert "User denied execution of tool 'compare_prices'" in response.text
+        assert "Price summary" not in response.text
+        assert get_prefetcher().stats()["slots"] == 0
+        assert get_approval_policy().stats()["auto_approved"]["cache_hit"] == 0
+    finally:
+        set_replay(None)
+
+
+@pytest.mark.asyncio
+async def test_overlapping_runs_on_a_session_conflict(client):
+    session_id = (await client.post("/chat/sessions")).json()["session_id"]
+    first = await client.post(f"/chat/sessions/{session_id}/messages?detach=true", json={"content": "Hello"})
+    assert first.status_code == 202
+
+    for path, body in (("messages", {"content": "Hello again"}), ("approve", {"approved": True})):
+        response = await client.post(f"/chat/sessions/{session_id}/{path}", json=body)
+        assert response.status_code == 409
+        assert response.json()["detail"]["run_id"] == first.json()["run_id"]
+
+    await client._transport.app.state.runs.get(first.json()["run_id"]).task
+    response = await client.post(f"/chat/sessions/{session_id}/messages", json={"content": "Hello again"})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_checkpointer_error_is_503_not_404(client):
+    app = client._transport.app
+
+    async def unavailable(config, **kwargs):
+        raise ConnectionError("database is restarting")
+
+    app.state.agent.aget_state = unavailable
+    response = await client.post("/chat/sessions/old-thread/messages", json={"content": "Hi"})
+    assert response.status_code == 503
+    assert app.state.sessions.stats()["unknown"] == 0
+
+
+@pytest.mark.asyncio
+async def test_shared_session_backend_turns_snapshots_off(tmp_path):
+    with patch.dict(os.environ, {
+        "OPENAI_API_KEY": "sk-test",
+        "TAVILY_API_KEY": "tvly-test",
+        "USE_MEMORY_SAVER": "true",
+        "SESSION_BACKEND": "sqlite",
+        "SESSION_DB_PATH": str(tmp_path / "sessions.db"),
+    }):
+        app = create_app()
+        async with lifespan(app):
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                session_id = (await client.post("/chat/sessions")).json()["session_id"]
+                await client.post(f"/chat/sessions/{session_id}/messages", json={"content": "Hello"})
+                await client.post(f"/chat/sessions/{session_id}/approve", json={"approved": True})
+                stats = app.state.snapshots.stats()
+                assert stats["threads"] == 0
+                assert stats["checkpoint_reads"] == 1
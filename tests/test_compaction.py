@@ -0,0 +1,51 @@
+from pricewise.tokens import estimate_tokens
+from pricewise.tools import _client
+from pricewise.tools._compact import compact_results
+
+
+def test_estimate_tokens_is_roughly_four_chars_per_token():
+    assert estimate_tokens("") == 0
+    assert 15 <= estimate_tokens("The quick brown fox jumps over the lazy dog and keeps running.") <= 20
+
+
+def test_compaction_drops_boilerplate_duplicates_and_repeat_urls():
+    results = [
+        {"url": "https://www.amazon.com/sony/", "content": "Sony WH-1000XM5 for $298. We use cookies to improve your experience."},
+        {"url": "https://amazon.com/sony", "content": "Ships free with Prime."},
+        {"url": "https://bestbuy.com/sony", "content": "Sony WH-1000XM5 for $298. Open-box from $249."},
+    ]
+    compacted = compact_results(results, token_budget=200)
+
+    assert [r["url"] for r in compacted] == ["https://www.amazon.com/sony/", "https://bestbuy.com/sony"]
+    assert compacted[0]["content"] == "Sony WH-1000XM5 for $298. Ships free with Prime."
+    assert compacted[1]["content"] == "Open-box from $249."
+
+
+def test_compaction_respects_budget_round_robin():
+    long = " ".join(f"Sentence number {i} about the product." for i in range(40))
+    results = [{"url": f"https://r{i}.com", "content": long.replace("product", f"product {i}")} for i in range(3)]
+
+    compacted = compact_results(results, token_budget=60)
+
+    total = sum(estimate_tokens(r["content"]) for r in compacted)
+    assert total <= 63
+    assert len(compacted) == 3  # every source keeps its first sentence
+
+
+def test_format_results_records_savings(monkeypatch):
+    monkeypatch.setattr(_client, "_compaction", _client.CompactionStats())
+    results = [{"url": f"https://r{i}.com", "content": "Great deal on headphones. " * 50} for i in range(5)]
+
+    text = _client.format_results(results, 5, tool="get_reviews")
+
+    assert estimate_tokens(text) < 600
+    saved = _client.get_compaction_stats().stats()["get_reviews"]
+    assert saved["calls"] == 1
+    assert saved["tokens_saved"] > 0
+
+
+def test_token_budget_env_override(monkeypatch):
+    monkeypatch.setenv("TOKEN_BUDGET_GET_REVIEWS", "0")
+    assert _client.get_token_budget("get_reviews") is None
+    monkeypatch.setenv("TOKEN_BUDGET_GET_REVIEWS", "900")
+    assert _client.get_token_budget("get_reviews") == 900
@@ -1,4 +1,5 @@
-from unittest.mock import patch, MagicMock
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
 from pricewise.tools.compare_prices import compare_prices
 
 
@@ -27,3 +28,39 @@ def test_compare_prices_handles_error():
     with patch("pricewise.tools.compare_prices.get_tavily", return_value=mock_instance):
         result = compare_prices.invoke({"product_name": "test"})
         assert "error" in result.lower()
+
+
+@pytest.mark.asyncio
+async def test_compare_prices_async_uses_ainvoke():
+    mock_instance = MagicMock()
+    mock_instance.ainvoke = AsyncMock(return_value={
+        "results": [{"url": "https://amazon.com/sony", "content": "Sony WH-1000XM5 - $298 at Amazon"}],
+    })
+
+    with patch("pricewise.tools.compare_prices.get_tavily", return_value=mock_instance):
+        result = await compare_prices.ainvoke({"product_name": "Sony WH-1000XM5"})
+        assert "Amazon" in result
+        mock_instance.ainvoke.assert_awaited_once()
+        mock_instance.invoke.assert_not_called()
+
+
+def test_compare_prices_returns_price_artifact_for_tool_calls():
+    mock_instance = MagicMock()
+    mock_instance.invoke.return_value = {
+        "results": [
+            {"url": "https://amazon.com/sony", "content": "Sony WH-1000XM5 - $298 at Amazon"},
+            {"url": "https://bestbuy.com/sony", "content": "Sony WH-1000XM5 - $329 at Best Buy"},
+        ],
+    }
+
+    with patch("pricewise.tools.compare_prices.get_tavily", return_value=mock_instance):
+        message = compare_prices.invoke({
+            "type": "tool_call",
+            "id": "call_1",
+            "name": "compare_prices",
+            "args": {"product_name": "Sony WH-1000XM5"},
+        })
+
+    assert "min $298.00, median $313.50, max $329.00" in message.content
+    assert message.artifact["overall"]["count"] == 2
+    assert [r["retailer"] for r in message.artifact["retailers"]] == ["amazon.com", "bestbuy.com"]
@@ -0,0 +1,88 @@
+import pytest
+from unittest.mock import AsyncMock
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from pricewise.middleware.context_budget import ContextBudget, account
+from pricewise.middleware.summarization import create_summarization_hook, get_prompt_token_stats
+from pricewise.tokens import MessageTokenCounter
+
+
+def _tool_turn(i, size):
+    call_id = f"call_{i}"
+    return [
+        HumanMessage(content=f"scrape page {i}", id=f"h{i}"),
+        AIMessage(content="", tool_calls=[{"name": "scrape_url", "args": {"url": f"https://x/{i}"}, "id": call_id}], id=f"a{i}"),
+        ToolMessage(content="word " * size, tool_call_id=call_id, name="scrape_url", id=f"t{i}"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_many_short_messages_fit_the_budget():
+    model = AsyncMock()
+    hook = create_summarization_hook(model, budget=ContextBudget.from_total(6000))
+
+    messages = []
+    for i in range(6):
+        messages += [HumanMessage(content=f"msg{i}"), AIMessage(content=f"reply{i}")]
+    result = await hook({"messages": messages})
+
+    assert result["llm_input_messages"] == messages
+    model.ainvoke.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_two_large_tool_outputs_trigger_summarization():
+    model = AsyncMock()
+    model.ainvoke.return_value = AIMessage(content="Scraped two pages.")
+    hook = create_summarization_hook(model, budget=ContextBudget.from_total(6000), evict_tools=False)
+
+    messages = [*_tool_turn(0, 2000), *_tool_turn(1, 2000)]
+    result = await hook({"messages": messages})
+
+    llm_messages = result["llm_input_messages"]
+    assert isinstance(llm_messages[0], SystemMessage)
+    # The latest request, call and result stay together, verbatim.
+    assert llm_messages[1:] == messages[3:]
+    assert result["summary_watermark"] == 3
+    assert any("under 675 words" in m.content for m in model.ainvoke.call_args.args[0])
+
+
+def test_window_never_starts_on_a_tool_message():
+    # Room for one tool output but not two: the older result would be
+    # orphaned from its call, so the window skips past it.
+    budget = ContextBudget(recent=1000, tools=100, summary=100)
+    messages = [*_tool_turn(0, 50), *_tool_turn(1, 50)]
+    start = budget.window_start(messages, 0, MessageTokenCounter())
+    assert start == 3
+    assert not isinstance(messages[start], ToolMessage)
+
+
+def test_counts_are_cached_by_message_id():
+    counter = MessageTokenCounter()
+    messages = _tool_turn(0, 100)
+    first = counter.count_all(messages)
+    assert counter.count_all(messages) == first
+    assert counter.stats() == {"cached": 3, "hits": 3, "misses": 3}
+
+    counter.count(HumanMessage(content="no id"))
+    assert counter.stats()["cached"] == 3
+
+
+def test_cache_is_bounded():
+    counter = MessageTokenCounter(max_entries=2)
+    counter.count_all(_tool_turn(0, 10))
+    assert counter.stats()["cached"] == 2
+
+
+@pytest.mark.asyncio
+async def test_prompt_tokens_are_accounted_per_bucket():
+    messages = _tool_turn(0, 100)
+    usage = account([SystemMessage(content="Summary of earlier conversation: x"), *messages], MessageTokenCounter())
+    assert usage["tools"] > usage["recent"] > 0
+    assert usage["summary"] > 0
+    assert usage["total"] == usage["summary"] + usage["recent"] + usage["tools"]
+
+    before = get_prompt_token_stats().stats()["calls"]
+    hook = create_summarization_hook(AsyncMock(), budget=ContextBudget.from_total(6000))
+    await hook({"messages": messages})
+    assert get_prompt_token_stats().stats()["calls"] == before + 1
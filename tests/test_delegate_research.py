@@ -1,3 +1,6 @@
+import sys
+
+import pytest
 from unittest.mock import MagicMock, patch
 from pricewise.tools.delegate_research import delegate_research, _research_one
 from pricewise.schemas import ProductResearchItem
@@ -78,3 +81,27 @@ def test_research_one_no_results():
     with patch("pricewise.tools.delegate_research.get_tavily", return_value=mock_instance):
         result = _research_one(ProductResearchItem(product_name="nothing"))
         assert result["success"] is False
+
+
+@pytest.mark.asyncio
+async def test_delegate_research_async_path(fake_tavily):
+    result = await delegate_research.ainvoke({
+        "products": [{"product_name": "laptop"}, {"product_name": "monitor"}],
+    })
+    assert "2 items" in result
+    assert sorted(fake_tavily.calls) == ["laptop", "monitor"]
+
+
+@pytest.mark.asyncio
+async def test_delegate_research_reports_timeouts_as_partial(fake_tavily, monkeypatch):
+    from pricewise.tools._scheduler import ResearchScheduler
+
+    scheduler = ResearchScheduler(global_limit=4, per_session_limit=2, item_timeout=0.05)
+    module = sys.modules["pricewise.tools.delegate_research"]
+    monkeypatch.setattr(module, "get_research_scheduler", lambda: scheduler)
+    fake_tavily.delay = 0.2
+
+    result = await delegate_research.ainvoke({"products": [{"product_name": "slow thing"}]})
+
+    assert "Partial results: 1 of 1" in result
+    assert scheduler.stats()["timed_out"] == 1
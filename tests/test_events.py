@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from pricewise.api.events import EventBuffers, SessionEvents, frame_id
+from pricewise.api.runs import RunManager
+from pricewise.api.streaming import SSEEncoder, format_sse_event
+
+
+def _run(events, names, delay=0.0):
+    encoder = SSEEncoder(window_ms=0, max_bytes=0, next_id=events.next_id)
+
+    async def frames():
+        for name in names:
+            if delay:
+                await asyncio.sleep(delay)
+            yield encoder.event(name, {})
+
+    return RunManager().start("s", events, frames()).task
+
+
+async def _collect(stream):
+    return [frame async for frame in stream]
+
+
+@pytest.mark.asyncio
+async def test_follow_streams_a_run_with_ids():
+    events = SessionEvents()
+    _run(events, ["tool_call", "receipt", "done"], delay=0.001)
+    frames = await _collect(events.follow(0))
+    assert [frame_id(f) for f in frames] == [1, 2, 3]
+    assert frames[-1] == format_sse_event("done", {}, event_id=3)
+
+
+@pytest.mark.asyncio
+async def test_run_continues_after_the_client_leaves():
+    events = SessionEvents()
+    task = _run(events, ["token", "tool_call", "done"], delay=0.001)
+    follower = events.follow(0)
+    assert frame_id(await anext(follower)) == 1
+    await follower.aclose()  # client disconnected
+
+    await task
+    assert [frame_id(f) for f in events.since(1)] == [2, 3]
+    assert not events.active
+
+
+@pytest.mark.asyncio
+async def test_resume_replays_missed_frames_then_attaches():
+    events = SessionEvents()
+    _run(events, ["token", "token", "token", "done"], delay=0.005)
+    await asyncio.sleep(0.012)
+    frames = await _collect(events.resume(1))
+    assert [frame_id(f) for f in frames] == [2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_resume_resets_when_frames_were_dropped():
+    events = SessionEvents(max_events=2)
+    await _run(events, ["token", "token", "token", "done"])
+    frames = await _collect(events.resume(0))
+    assert frames == [format_sse_event("reset", {"last_event_id": 4})]
+    assert await _collect(events.resume(3)) == [format_sse_event("done", {}, event_id=4)]
+
+
+def test_buffers_are_bounded():
+    buffers = EventBuffers(max_sessions=2)
+    for session in ("a", "b", "c"):
+        buffers.get(session, create=True)
+    assert buffers.get("a") is None
+    assert buffers.stats()["sessions"] == 2
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import threading
+
+import pytest
+from unittest.mock import patch
+
+from pricewise.tools import _http
+
+
+@pytest.mark.asyncio
+async def test_async_session_is_shared_with_configured_limits():
+    with patch.dict(os.environ, {"TAVILY_POOL_SIZE": "7", "TAVILY_POOL_PER_HOST": "3"}):
+        await _http.close_http_pools()
+        first = _http.get_async_session()
+        second = _http.get_async_session()
+        assert first is second
+        assert first.connector.limit == 7
+        assert first.connector.limit_per_host == 3
+        await _http.close_http_pools()
+        assert first.closed
+
+
+def test_sync_session_is_shared():
+    assert _http.get_sync_session() is _http.get_sync_session()
+
+
+def test_sync_pool_count_follows_the_total_size():
+    with patch.dict(os.environ, {"TAVILY_POOL_SIZE": "64", "TAVILY_POOL_PER_HOST": "8"}):
+        _http._sync_session = None
+        adapter = _http.get_sync_session().get_adapter("https://api.tavily.com")
+        assert (adapter._pool_connections, adapter._pool_maxsize) == (8, 8)
+    _http._sync_session = None
+
+
+@pytest.mark.asyncio
+async def test_each_loop_keeps_its_session_until_closed():
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever)
+    thread.start()
+    try:
+        async def open_session():
+            return _http.get_async_session()
+
+        other = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(open_session(), other_loop))
+        mine = _http.get_async_session()
+        assert mine is not other and not other.closed
+
+        await _http.close_http_pools()
+        assert mine.closed and other.closed
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join()
+        other_loop.close()
@@ -0,0 +1,112 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from pricewise.llm_cache import LLMResponseCache, is_tool_calling_turn, make_llm_cache_key, normalize_prompt
+from pricewise.replay import Replay
+from pricewise.schemas import Receipt
+
+
+class CountingReplay(Replay):
+    def __init__(self):
+        super().__init__("synthetic")
+        self.calls = 0
+
+    def count(self, key, value=None):
+        if key == "hits":
+            self.calls += 1
+        return super().count(key, value)
+
+
+def _model(cache):
+    replay = CountingReplay()
+    model = replay.chat_model()
+    model.cache = cache
+    return model, replay
+
+
+def _conversation(suffix=""):
+    return [
+        HumanMessage(content=f"Find the best price for the Sony headphones{suffix}", id="h-1"),
+        AIMessage(content="", tool_calls=[{"name": "compare_prices", "args": {"product_name": "Sony"}, "id": "call_a"}], id="a-1"),
+        ToolMessage(content="Sony $328 at Best Buy", tool_call_id="call_a", name="compare_prices", id="t-1"),
+        AIMessage(content="Best Buy has it for $328.", id="a-2"),
+    ]
+
+
+def _renamed(messages):
+    """Same conversation as another session would hold it: new ids, different spacing."""
+    out = []
+    for i, m in enumerate(messages):
+        m = m.model_copy(update={"id": f"other-{i}"})
+        if isinstance(m, AIMessage) and m.tool_calls:
+            m = m.model_copy(update={"tool_calls": [{**m.tool_calls[0], "id": "call_b"}]})
+        if isinstance(m, ToolMessage):
+            m = m.model_copy(update={"tool_call_id": "call_b", "content": "Sony  $328 at Best Buy\n"})
+        out.append(m)
+    return out
+
+
+@pytest.mark.asyncio
+async def test_structured_output_is_served_from_cache_across_sessions():
+    cache = LLMResponseCache()
+    model, replay = _model(cache)
+    structured = model.with_structured_output(Receipt)
+
+    first = await structured.ainvoke(_conversation())
+    second = await structured.ainvoke(_renamed(_conversation()))
+
+    assert second == first
+    assert replay.calls == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["hit_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_different_prompts_miss():
+    cache = LLMResponseCache()
+    model, replay = _model(cache)
+
+    await model.ainvoke([SystemMessage(content="Summarize."), HumanMessage(content="User: hi")])
+    await model.ainvoke([SystemMessage(content="Summarize."), HumanMessage(content="User: hello")])
+
+    assert replay.calls == 2
+    assert cache.stats()["misses"] == 2 and cache.stats()["hits"] == 0
+
+
+@pytest.mark.asyncio
+async def test_tool_calling_turns_are_not_cached():
+    cache = LLMResponseCache()
+    model, replay = _model(cache)
+    reasoning = model.bind_tools([Receipt])
+
+    await reasoning.ainvoke(_conversation()[:1])
+    await reasoning.ainvoke(_conversation()[:1])
+
+    assert replay.calls == 2
+    assert cache.stats()["skipped"] == 2
+    assert cache.stats()["sets"] == 0
+
+
+@pytest.mark.asyncio
+async def test_persistent_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "llm.db")
+    model, replay = _model(LLMResponseCache(path=path))
+    summary = [SystemMessage(content="Summarize."), HumanMessage(content="User: hi")]
+    first = await model.ainvoke(summary)
+
+    restarted = LLMResponseCache(path=path)
+    model, replay = _model(restarted)
+    second = await model.ainvoke(summary)
+
+    assert second.content == first.content
+    assert replay.calls == 0
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_normalization_and_tool_turn_detection():
+    prompt = '[{"kwargs": {"content": "hi"}}]'
+    assert make_llm_cache_key(prompt, "gpt-4o-mini") != make_llm_cache_key(prompt, "gpt-4o")
+    assert normalize_prompt('[{"kwargs": {"content": "a  b\\n", "id": "x"}}]') == '[{"kwargs":{"content":"a b"}}]'
+    assert is_tool_calling_turn("[('stop', None), ('tools', [])]")
+    assert is_tool_calling_turn("[('tool_choice', 'auto'), ('tools', [])]")
+    assert not is_tool_calling_turn("[('tool_choice', 'any'), ('tools', [])]")
+    assert not is_tool_calling_turn("[('stop', None)]")
@@ -1,6 +1,8 @@
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
 from pricewise.middleware.summarization import create_summarization_hook
 
 
@@ -44,3 +46,191 @@ async def test_summarization_over_threshold():
     assert "Summary" in llm_messages[0].content
     assert len(llm_messages) == 3  # summary + last 2
     mock_model.ainvoke.assert_called_once()
+
+
+def _turns(n):
+    messages = []
+    for i in range(n):
+        messages += [HumanMessage(content=f"msg{i}"), AIMessage(content=f"reply{i}")]
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_summary_is_stored_with_watermark():
+    mock_model = AsyncMock()
+    mock_model.ainvoke.return_value = AIMessage(content="S1")
+    hook = create_summarization_hook(mock_model, max_messages=5)
+
+    messages = _turns(4)  # 8 messages
+    result = await hook({"messages": messages})
+
+    assert result["summary"] == "S1"
+    assert result["summary_watermark"] == 6
+    assert result["llm_input_messages"][1:] == messages[6:]
+
+
+@pytest.mark.asyncio
+async def test_only_new_messages_are_summarized():
+    mock_model = AsyncMock()
+    mock_model.ainvoke.return_value = AIMessage(content="S2")
+    hook = create_summarization_hook(mock_model, max_messages=5)
+
+    messages = _turns(5)  # 10 messages, summary already covers the first 6
+    result = await hook({"messages": messages, "summary": "S1", "summary_watermark": 6})
+
+    prompt = mock_model.ainvoke.call_args.args[0]
+    assert "S1" in prompt[1].content
+    assert "msg3" in prompt[1].content and "msg2" not in prompt[1].content
+    assert result["summary"] == "S2"
+    assert result["summary_watermark"] == 8
+
+
+@pytest.mark.asyncio
+async def test_stored_summary_is_reused_without_a_model_call():
+    mock_model = AsyncMock()
+    hook = create_summarization_hook(mock_model, max_messages=5)
+
+    messages = _turns(4)
+    result = await hook({"messages": messages, "summary": "S1", "summary_watermark": 6})
+
+    mock_model.ainvoke.assert_not_called()
+    assert "summary" not in result
+    assert "S1" in result["llm_input_messages"][0].content
+
+
+@pytest.mark.asyncio
+async def test_rolling_summary_survives_in_checkpointed_state(monkeypatch):
+    from langgraph.checkpoint.memory import InMemorySaver
+    from langgraph.types import Command
+    from pricewise.agent import build_agent
+    from pricewise.replay import Replay, set_replay
+    from pricewise.tools import _client
+
+    replay = Replay("synthetic")
+    set_replay(replay)
+    monkeypatch.setattr(_client, "_tavilies", {})
+    monkeypatch.setenv("CONTEXT_BUDGET_TOKENS", "400")
+    try:
+        agent = build_agent(checkpointer=InMemorySaver(), model=replay.chat_model())
+        config = {"configurable": {"thread_id": "rolling"}}
+        for i in range(3):
+            await agent.ainvoke({"messages": [("user", f"Find the price for option {i}")]}, config)
+            await agent.ainvoke(Command(resume=True), config)
+    finally:
+        set_replay(None)
+
+    state = await agent.aget_state(config)
+    assert state.values["summary"].startswith("Summary")
+    assert 0 < state.values["summary_watermark"] < len(state.values["messages"])
+
+
+class _SlowModel:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return AIMessage(content=f"background summary {self.calls}")
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    from pricewise.middleware import summarization
+
+    w = summarization.SummaryWorker(max_concurrent=2, max_pending=4)
+    monkeypatch.setattr(summarization, "_worker", w)
+    yield w
+    w.cancel_all()
+
+
+@pytest.mark.asyncio
+async def test_background_mode_falls_back_without_blocking(worker):
+    model = _SlowModel(delay=1.0)
+    hook = create_summarization_hook(model, max_messages=5, background=True)
+    config = {"configurable": {"thread_id": "t1"}}
+
+    messages = _turns(4)
+    result = await asyncio.wait_for(hook({"messages": messages}, config), timeout=0.2)
+
+    assert "summary" not in result
+    assert "abridged" in result["llm_input_messages"][0].content
+    assert "msg0" in result["llm_input_messages"][0].content
+    assert result["llm_input_messages"][1:] == messages[6:]
+    assert worker.pending("t1") == 6
+
+
+@pytest.mark.asyncio
+async def test_background_summary_is_adopted_on_next_call(worker):
+    model = _SlowModel(delay=0.01)
+    hook = create_summarization_hook(model, max_messages=5, background=True)
+    config = {"configurable": {"thread_id": "t2"}}
+
+    messages = _turns(4)
+    await hook({"messages": messages}, config)
+    await asyncio.sleep(0.05)
+    result = await hook({"messages": messages}, config)
+
+    assert result["summary"] == "background summary 1"
+    assert result["summary_watermark"] == 6
+    assert "background summary 1" in result["llm_input_messages"][0].content
+    assert model.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_precompute_hook_starts_next_turn_summary(worker):
+    from pricewise.middleware.summarization import create_summary_precompute_hook
+
+    model = _SlowModel(delay=0.01)
+    precompute = create_summary_precompute_hook(model, max_messages=5)
+    hook = create_summarization_hook(model, max_messages=5, background=True)
+    config = {"configurable": {"thread_id": "t3"}}
+
+    finished_turns = _turns(4)  # last message is the final answer
+    await precompute({"messages": finished_turns}, config)
+    await asyncio.sleep(0.05)
+
+    next_turn = [*finished_turns, HumanMessage(content="msg4")]
+    result = await hook({"messages": next_turn}, config)
+    assert result["summary_watermark"] == 7
+    assert len(result["llm_input_messages"]) == 3  # summary, last answer, new question
+
+
+@pytest.mark.asyncio
+async def test_precompute_hook_uses_the_approval_wait(worker):
+    from pricewise.middleware.summarization import create_summary_precompute_hook
+
+    model = _SlowModel(delay=0.01)
+    precompute = create_summary_precompute_hook(model, max_messages=5, approval_tools={"compare_prices"})
+    hook = create_summarization_hook(model, max_messages=5, background=True)
+    config = {"configurable": {"thread_id": "t4"}}
+
+    def paused_on(tool):
+        call = AIMessage(content="", tool_calls=[{"name": tool, "args": {}, "id": "c1"}])
+        return [*_turns(4), HumanMessage(content="msg4"), call]
+
+    await precompute({"messages": paused_on("calculate_budget")}, config)
+    assert worker.pending("t4") is None  # runs at once, no wait to use
+
+    paused = paused_on("compare_prices")
+    await precompute({"messages": paused}, config)
+    await asyncio.sleep(0.05)
+
+    resumed = [*paused, ToolMessage(content="$299", tool_call_id="c1", name="compare_prices")]
+    result = await hook({"messages": resumed}, config)
+    assert result["summary"] == "background summary 1"
+    assert result["summary_watermark"] == 8
+    assert model.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_worker_is_bounded_and_cancellable_per_thread(worker):
+    model = _SlowModel(delay=1.0)
+    messages = _turns(4)
+    scheduled = [worker.schedule(f"t{i}", model, "", 0, messages, 6) for i in range(6)]
+
+    assert scheduled == [True] * 4 + [False] * 2
+    assert worker.cancel("t0") is True
+    assert worker.pending("t0") is None
+    assert worker.stats()["running_or_queued"] == 3
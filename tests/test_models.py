@@ -0,0 +1,99 @@
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+
+from pricewise import models
+from pricewise.agent import build_agent
+from pricewise.models import ModelStats, ModelTiers, TierMetricsCallback, create_tier_model, get_model_tiers
+from pricewise.replay import Replay, ReplayChatModel, set_replay
+from pricewise.tools import _client
+from pricewise.tools._cache import SearchCache
+from tests.test_replay import _conversation
+
+
+@pytest.fixture
+def fresh_tiers(monkeypatch):
+    """Tiers built from scratch on a synthetic replay session."""
+    monkeypatch.setattr(models, "_tiers", None)
+    monkeypatch.setattr(models, "_model_stats", {tier: ModelStats() for tier in models.TIERS})
+    monkeypatch.setattr(_client, "_tavilies", {})
+    monkeypatch.setattr(_client, "_cache", SearchCache(max_entries=16))
+    set_replay(Replay("synthetic"))
+    yield
+    set_replay(None)
+
+
+def test_tiers_are_created_once_from_env(fresh_tiers, monkeypatch):
+    monkeypatch.setenv("REPLAY_SMALL_MODEL_LATENCY_SCALE", "0.25")
+
+    tiers = get_model_tiers()
+    assert get_model_tiers() is tiers
+    assert isinstance(tiers.reasoning, ReplayChatModel)
+    assert tiers.reasoning.latency_scale == 1.0
+    assert tiers.summarization.latency_scale == 0.25
+    assert "nostream" in tiers.structured.tags
+    assert not tiers.reasoning.tags
+
+
+def test_tier_on_the_reasoning_model_keeps_full_latency(fresh_tiers, monkeypatch):
+    monkeypatch.setenv("MODEL_STRUCTURED", "gpt-4o")
+    assert create_tier_model("structured").latency_scale == 1.0
+
+
+@pytest.mark.asyncio
+async def test_callback_records_latency_and_tokens():
+    stats = ModelStats()
+    model = Replay("synthetic", model_latency=0.01).chat_model()
+    model.callbacks = [TierMetricsCallback(stats)]
+
+    await model.ainvoke("Summarize the Sony headphones conversation")
+
+    recorded = stats.stats()
+    assert recorded["calls"] == 1
+    assert recorded["prompt_tokens"] > 0 and recorded["completion_tokens"] > 0
+    assert recorded["latency_ms"]["p50"] >= 10
+
+
+@pytest.mark.asyncio
+async def test_receipt_is_generated_by_the_structured_tier(fresh_tiers, monkeypatch):
+    monkeypatch.setenv("RECEIPT_MODE", "llm")
+    tiers = get_model_tiers()
+    agent = build_agent(checkpointer=InMemorySaver(), tiers=tiers)
+
+    first, second = await _conversation(agent, "tiers", "Find the best price for the Sony headphones model 2")
+
+    assert dict(second)["receipt"]["product_name"] == "Sony headphones model 2"
+    # Receipt JSON never streams as a tool call.
+    assert all(payload["name"] != "Receipt" for name, payload in first + second if name == "tool_call")
+    stats = models.get_model_stats()
+    assert stats["structured"]["calls"] == 1
+    assert stats["reasoning"]["calls"] == 2
+    assert stats["structured"]["model"] == "gpt-4o-mini"
+
+
+def test_single_model_runs_every_job():
+    model = Replay("synthetic").chat_model()
+    tiers = ModelTiers.single(model)
+    assert tiers.reasoning is model
+    assert tiers.summarization.bound is tiers.structured.bound is model
+    assert "nostream" in tiers.summarization.config["tags"]
+
+
+@pytest.mark.asyncio
+async def test_single_model_keeps_summaries_and_receipt_out_of_the_stream(fresh_tiers, monkeypatch):
+    monkeypatch.setenv("CONTEXT_BUDGET_TOKENS", "300")
+    monkeypatch.setenv("RECEIPT_MODE", "llm")
+    replay = Replay("synthetic")
+    set_replay(replay)
+    agent = build_agent(checkpointer=InMemorySaver(), model=replay.chat_model())
+
+    events = []
+    for n in (1, 2, 3):
+        first, second = await _conversation(agent, "single", f"Find the best price for the Sony headphones model {n}")
+        events += first + second
+
+    state = await agent.aget_state({"configurable": {"thread_id": "single"}})
+    assert state.values.get("summary")
+    assert "receipt" in [name for name, _ in events]
+    streamed = "".join(payload["content"] for name, payload in events if name == "token")
+    assert "Summary:" not in streamed
+    assert "product_name" not in streamed
@@ -0,0 +1,92 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from pricewise.middleware.prefetch import SpeculativePrefetcher, get_prefetcher
+from pricewise.middleware.selective_interrupt import ToolCall, with_approval
+from pricewise.tools._client import is_search_cached
+from pricewise.tools.compare_prices import compare_prices
+
+ARGS = {"product_name": "Sony WH-1000XM5", "max_sources": 5}
+
+
+def _call(tool="compare_prices", args=ARGS, thread="t1"):
+    return ToolCall(tool, dict(args), thread, thread)
+
+
+@pytest.mark.asyncio
+async def test_prefetch_stays_out_of_cache_until_claimed(fake_tavily):
+    prefetcher = SpeculativePrefetcher()
+    assert prefetcher.start(_call())
+    await asyncio.sleep(0)
+    assert fake_tavily.calls == ["Sony WH-1000XM5 price buy"]
+    assert not is_search_cached("compare_prices", ARGS)
+
+    assert await prefetcher.claim(_call())
+    assert is_search_cached("compare_prices", ARGS)
+    stats = prefetcher.stats()
+    assert stats["started"] == stats["used"] == 1
+    assert stats["slots"] == 0
+
+
+@pytest.mark.asyncio
+async def test_approved_tool_uses_prefetched_result(fake_tavily):
+    get_prefetcher().start(_call(thread="default"))
+    wrapped = with_approval(compare_prices)
+    with patch("pricewise.middleware.selective_interrupt.interrupt", return_value=True):
+        result = await wrapped.ainvoke(ARGS)
+    assert "$99" in result
+    assert len(fake_tavily.calls) == 1
+    assert get_prefetcher().stats()["used"] == 1
+
+
+@pytest.mark.asyncio
+async def test_denied_tool_discards_prefetch(fake_tavily):
+    fake_tavily.delay = 0.05
+    get_prefetcher().start(_call(thread="default"))
+    wrapped = with_approval(compare_prices)
+    with patch("pricewise.middleware.selective_interrupt.interrupt", return_value=False):
+        result = await wrapped.ainvoke(ARGS)
+    assert "denied" in result
+    await asyncio.sleep(0.1)
+    assert not is_search_cached("compare_prices", ARGS)
+    assert get_prefetcher().stats()["denied"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_slot_is_dropped(fake_tavily):
+    prefetcher = SpeculativePrefetcher(ttl=0.01)
+    prefetcher.start(_call())
+    await asyncio.sleep(0.02)
+    assert not await prefetcher.claim(_call())
+    assert prefetcher.stats()["expired"] == 1
+    assert not is_search_cached("compare_prices", ARGS)
+
+
+@pytest.mark.asyncio
+async def test_slots_are_bounded(fake_tavily):
+    prefetcher = SpeculativePrefetcher(max_slots=2)
+    for thread in ("t1", "t2", "t3"):
+        prefetcher.start(_call(thread=thread))
+    stats = prefetcher.stats()
+    assert stats["slots"] == 2
+    assert stats["evicted"] == 1
+    assert not await prefetcher.claim(_call(thread="t1"))
+
+
+@pytest.mark.asyncio
+async def test_discard_thread(fake_tavily):
+    prefetcher = SpeculativePrefetcher()
+    prefetcher.start(_call(thread="t1"))
+    prefetcher.start(_call(thread="t2"))
+    prefetcher.discard_thread("t1")
+    assert not await prefetcher.claim(_call(thread="t1"))
+    assert await prefetcher.claim(_call(thread="t2"))
+
+
+@pytest.mark.asyncio
+async def test_only_search_tools_are_prefetched(fake_tavily):
+    prefetcher = SpeculativePrefetcher()
+    assert not prefetcher.start(_call("scrape_url", {"url": "https://example.com"}))
+    assert prefetcher.stats()["started"] == 0
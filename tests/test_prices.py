@@ -0,0 +1,76 @@
+import pytest
+
+from pricewise.prices import extract_prices, parse_amount, summarize_prices
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("1,299.99", 1299.99),
+    ("1.299,99", 1299.99),
+    ("1,299", 1299.0),
+    ("49.5", 49.5),
+    ("1 299,00", 1299.0),
+])
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+def test_extract_was_now_pair():
+    mentions = extract_prices("Was $399.99, now $279.99 at Best Buy")
+    assert [m.kind for m in mentions] == ["was", "price"]
+    assert mentions[1].value == 279.99
+    assert mentions[1].was == 399.99
+
+
+@pytest.mark.parametrize("text", ["Prices $49 - $79", "Headphones $49–79", "from $49 to $79"])
+def test_extract_ranges(text):
+    (mention,) = extract_prices(text)
+    assert (mention.kind, mention.value, mention.high) == ("range", 49.0, 79.0)
+
+
+def test_per_unit_and_discounts_are_classified():
+    mentions = extract_prices("Beans $2.99/oz, save $5 on orders over $35")
+    assert [(m.kind, m.unit) for m in mentions] == [("unit", "oz"), ("discount", None), ("discount", None)]
+
+
+def test_currency_codes_and_symbols():
+    assert extract_prices("1.299,99 € at Fnac")[0].currency == "EUR"
+    assert extract_prices("£249 at Currys")[0].currency == "GBP"
+    assert extract_prices("299 USD shipped")[0].value == 299.0
+
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("1 299,00 € chez Fnac", [(1299.0, "EUR")]),
+    ("$1 299.99 at B&H", [(1299.99, "USD")]),
+    # Without cents the space may as well split two numbers: no guess at all.
+    ("1 299 € chez Fnac", []),
+    ("$49 100 reviews", [(49.0, "USD")]),
+    ("USD 299 shipped", [(299.0, "USD")]),
+    ("EUR 1.299,00 at MediaMarkt", [(1299.0, "EUR")]),
+])
+def test_space_separators_and_leading_codes(text, expected):
+    assert [(m.value, m.currency) for m in extract_prices(text)] == expected
+
+
+def test_each_and_save_up_to_are_not_product_prices():
+    mentions = extract_prices("Batteries $0.99 each. Save up to $100 on bundles")
+    assert [(m.kind, m.unit) for m in mentions] == [("unit", "each"), ("discount", None)]
+
+
+def test_summarize_prices_per_retailer():
+    results = [
+        {"url": "https://www.amazon.com/a", "content": "Sony WH-1000XM5 - $298 (was $399)"},
+        {"url": "https://amazon.com/b", "content": "Renewed $248"},
+        {"url": "https://bestbuy.com/c", "content": "$329.99 at Best Buy, $10 off with code"},
+        {"url": "https://currys.co.uk/d", "content": "£279"},
+    ]
+    summary = summarize_prices(results)
+
+    assert summary["currency"] == "USD"
+    assert summary["overall"] == {"min": 248.0, "median": 298.0, "max": 329.99, "count": 3}
+    amazon = summary["retailers"][0]
+    assert (amazon["retailer"], amazon["min"], amazon["max"], amazon["was"]) == ("amazon.com", 248.0, 298.0, 399.0)
+
+
+def test_summarize_prices_without_prices():
+    assert summarize_prices([{"url": "https://x.com", "content": "No prices here"}]) is None
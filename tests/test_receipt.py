@@ -0,0 +1,132 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from pricewise.middleware.receipt import average_rating, build_receipt, create_receipt_hook
+from pricewise.prices import summarize_prices
+from pricewise.schemas import Receipt
+
+
+def _prices(product, results):
+    return {"tool": "compare_prices", "product": product, **summarize_prices(results)}
+
+
+SONY = _prices("Sony WH-1000XM5", [
+    {"url": "https://www.bestbuy.com/xm5", "content": "Sony WH-1000XM5 now $328.00, was $399.99"},
+    {"url": "https://www.amazon.com/xm5", "content": "WH-1000XM5 $329.99 with free shipping"},
+    {"url": "https://www.walmart.com/xm5", "content": "Sony XM5 $348.00"},
+])
+BOSE = _prices("Bose QC Ultra", [
+    {"url": "https://www.amazon.com/qc", "content": "Bose QC Ultra $379.00"},
+    {"url": "https://www.target.com/qc", "content": "QuietComfort Ultra $429.00"},
+])
+
+
+def _call(tool, args, call_id):
+    return AIMessage(content="", tool_calls=[{"name": tool, "args": args, "id": call_id}])
+
+
+def _turn(*steps, answer):
+    messages = [HumanMessage(content="earlier"), AIMessage(content="earlier answer"), HumanMessage(content="question")]
+    for i, (tool, args, content, artifact) in enumerate(steps):
+        messages.append(_call(tool, args, f"c{i}"))
+        messages.append(ToolMessage(content=content, artifact=artifact, tool_call_id=f"c{i}", name=tool))
+    messages.append(AIMessage(content=answer))
+    return messages
+
+
+def test_single_product_receipt_from_price_artifact():
+    messages = _turn(
+        ("compare_prices", {"product_name": "Sony WH-1000XM5"}, "prices", SONY),
+        ("get_reviews", {"product_name": "Sony WH-1000XM5"}, "Rated 4.6 out of 5. Our verdict: 9/10.", None),
+        answer="Best Buy has the Sony WH-1000XM5 for $328.00.",
+    )
+    receipt = build_receipt(messages)
+
+    assert receipt.product_name == "Sony WH-1000XM5"
+    assert receipt.price == 328.0
+    assert receipt.currency == "USD"
+    assert receipt.price_range == "$328.00 - $348.00"
+    assert receipt.average_rating == 4.5
+    assert "bestbuy.com" in receipt.recommendation_reason
+    assert receipt.comparison_products is None
+
+
+def test_quoted_price_outside_the_range_falls_back_to_lowest():
+    messages = _turn(
+        ("compare_prices", {"product_name": "Sony WH-1000XM5"}, "prices", SONY),
+        answer="It lists at $399.99 but you can get it for less.",
+    )
+    assert build_receipt(messages).price == 328.0
+
+
+def test_reason_names_the_cheapest_retailer_whatever_the_order():
+    summary = {
+        "tool": "compare_prices", "product": "Sony WH-1000XM5", "currency": "USD",
+        "overall": {"min": 299.0, "max": 349.0, "median": 329.0, "count": 3},
+        "retailers": [
+            {"retailer": "amazon.com", "min": 329.0, "max": 349.0, "median": 339.0, "count": 2},
+            {"retailer": "bestbuy.com", "min": 299.0, "max": 299.0, "median": 299.0, "count": 1},
+        ],
+    }
+    cheapest = _turn(("compare_prices", {"product_name": "Sony WH-1000XM5"}, "prices", summary),
+                     answer="It's $299.00 right now.")
+    assert build_receipt(cheapest).recommendation_reason == (
+        "Lowest current price at bestbuy.com among 2 retailer(s)."
+    )
+
+    quoted = _turn(("compare_prices", {"product_name": "Sony WH-1000XM5"}, "prices", summary),
+                   answer="Amazon has it for $329.00.")
+    reason = build_receipt(quoted).recommendation_reason
+    assert reason.startswith("Listed at $329.00 by amazon.com")
+    assert "lowest is $299.00 at bestbuy.com" in reason
+
+
+def test_comparison_recommends_the_product_named_first():
+    messages = _turn(
+        ("compare_prices", {"product_name": "Sony WH-1000XM5"}, "prices", SONY),
+        ("compare_prices", {"product_name": "Bose QC Ultra"}, "prices", BOSE),
+        answer="Go with the Bose QC Ultra at $379.00 over the Sony WH-1000XM5.",
+    )
+    receipt = build_receipt(messages)
+
+    assert receipt.product_name == "Bose QC Ultra"
+    assert receipt.price == 379.0
+    assert [p.product_name for p in receipt.comparison_products] == ["Sony WH-1000XM5"]
+    assert "Sony WH-1000XM5 at $328.00" in receipt.comparison_summary
+
+
+def test_only_the_current_turn_counts():
+    messages = _turn(("compare_prices", {"product_name": "Sony WH-1000XM5"}, "prices", SONY), answer="Done.")
+    messages += [HumanMessage(content="thanks!"), AIMessage(content="You're welcome.")]
+    assert build_receipt(messages) is None
+
+
+def test_average_rating_normalizes_scales():
+    assert average_rating("4.5 stars, 8/10, rated 4 out of 5") == 4.2
+    assert average_rating("no ratings here") is None
+
+
+@pytest.mark.asyncio
+async def test_hook_builds_locally_without_a_model_call():
+    model = MagicMock()
+    hook = create_receipt_hook(model)
+    messages = _turn(("compare_prices", {"product_name": "Sony WH-1000XM5"}, "prices", SONY), answer="$328.00")
+
+    result = await hook({"messages": messages})
+
+    assert result["structured_response"].price == 328.0
+    model.with_structured_output.return_value.with_config.return_value.ainvoke.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_hook_falls_back_to_the_model_without_artifacts():
+    fallback = Receipt(product_name="Kindle", price=99.0)
+    model = MagicMock()
+    model.with_structured_output.return_value.with_config.return_value.ainvoke = AsyncMock(return_value=fallback)
+    hook = create_receipt_hook(model)
+
+    result = await hook({"messages": [HumanMessage(content="which kindle?"), AIMessage(content="The basic one.")]})
+
+    assert result["structured_response"] is fallback
+    assert await hook({"messages": [HumanMessage(content="x"), _call("get_reviews", {}, "c1")]}) == {}
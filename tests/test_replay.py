@@ -0,0 +1,103 @@
+import json
+
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.types import Command
+
+from pricewise import replay as replay_mod
+from pricewise.agent import build_agent
+from pricewise.api.routes import _stream_agent
+from pricewise.replay import Cassette, CassetteMiss, Replay, set_replay, synthetic_prompts
+from pricewise.tools import _client
+from pricewise.tools._cache import SearchCache
+from pricewise.tools._singleflight import SingleFlight
+from tests.conftest import FakeTavily
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Fresh search state; the installed replay session is reset afterwards."""
+    # One event per token, so recorded and replayed streams compare exactly.
+    monkeypatch.setenv("SSE_COALESCE_MS", "0")
+    monkeypatch.setenv("SSE_COALESCE_BYTES", "0")
+    monkeypatch.setattr(_client, "_tavilies", {})
+    monkeypatch.setattr(_client, "_cache", SearchCache(max_entries=16))
+    monkeypatch.setattr(_client, "_flights", SingleFlight())
+    yield
+    set_replay(None)
+
+
+def _events(chunks):
+    events = []
+    # A chunk may carry several frames (held tokens flushed before an event).
+    for frame in "".join(chunks).split("\n\n")[:-1]:
+        name, data = frame.split("\n")[:2]
+        payload = json.loads(data.removeprefix("data: "))
+        payload.pop("interrupt_ids", None)  # derived from the thread id
+        events.append((name.removeprefix("event: "), payload))
+    return events
+
+
+async def _conversation(agent, thread_id, prompt):
+    config = {"configurable": {"thread_id": thread_id}}
+    first = _events([e async for e in _stream_agent(agent, config, {"messages": [("user", prompt)]})])
+    second = _events([e async for e in _stream_agent(agent, config, Command(resume=True))])
+    return first, second
+
+
+@pytest.mark.asyncio
+async def test_synthetic_mode_drives_full_approval_flow(offline):
+    replay = Replay("synthetic")
+    set_replay(replay)
+    agent = build_agent(checkpointer=InMemorySaver(), model=replay.chat_model())
+
+    first, second = await _conversation(agent, "t1", "Find the best price for the Sony headphones model 1")
+
+    names = [name for name, _ in first]
+    assert "approval_required" in names
+    assert first[names.index("approval_required")][1]["tool_calls"][0]["name"] == "compare_prices"
+    names = [name for name, _ in second]
+    assert "tool_result" in names and "token" in names
+    receipt = dict(second)["receipt"]
+    assert receipt["product_name"] == "Sony headphones model 1"
+    assert receipt["price"] > 0
+
+
+@pytest.mark.asyncio
+async def test_recorded_session_replays_identically(offline, monkeypatch, tmp_path):
+    path = str(tmp_path / "session.jsonl.gz")
+    upstream = Replay("synthetic").chat_model()  # stands in for the real model
+    fake = FakeTavily(results=[{"url": "https://amazon.com/x", "content": "Dyson V15 - $649 at Amazon"}])
+
+    monkeypatch.setenv("TAVILY_API_KEY", "tvly-test")
+    recorder = Replay("record", cassette=Cassette(path))
+    set_replay(recorder)
+    monkeypatch.setattr(_client, "TavilySearch", lambda **kwargs: fake)
+    agent = build_agent(checkpointer=InMemorySaver(), model=recorder.chat_model(inner=upstream))
+    recorded = await _conversation(agent, "t1", "Compare prices for the Dyson V15")
+    recorder.save()
+    assert len(fake.calls) == 1
+
+    player = Replay("replay", cassette=Cassette.load(path))
+    set_replay(player)
+    monkeypatch.setattr(_client, "_tavilies", {})
+    monkeypatch.setattr(_client, "_cache", SearchCache(max_entries=16))
+    agent = build_agent(checkpointer=InMemorySaver(), model=player.chat_model())
+    replayed = await _conversation(agent, "t2", "Compare prices for the Dyson V15")
+
+    assert replayed == recorded
+    assert len(fake.calls) == 1
+    assert player.stats()["misses"] == 0
+
+
+def test_replay_miss_raises():
+    player = Replay("replay", cassette=Cassette())
+    with pytest.raises(CassetteMiss):
+        player.search("compare_prices", 5).invoke("never recorded")
+
+
+def test_synthetic_data_is_distinct_and_deterministic():
+    prompts = synthetic_prompts(5000)
+    assert len(set(prompts)) == 5000
+    assert replay_mod.synthetic_search("laptop") == replay_mod.synthetic_search("laptop")
+    assert replay_mod.synthetic_search("laptop") != replay_mod.synthetic_search("monitor")
@@ -0,0 +1,52 @@
+from pricewise.tools import _client
+from pricewise.tools._rerank import rerank
+
+
+def _results(*contents):
+    return [{"url": f"https://r{i}.com", "content": c} for i, c in enumerate(contents)]
+
+
+def test_compare_prices_promotes_snippet_with_a_price():
+    results = _results(
+        "Sony WH-1000XM5 overview and history of the brand.",
+        "Sony WH-1000XM5 unboxing video.",
+        "Best headphones of the year roundup.",
+        "Sony WH-1000XM5 now $298 at Amazon, was $399.",
+    )
+    top = rerank(results, "Sony WH-1000XM5", "compare_prices", k=2)
+    assert top[0]["url"] == "https://r3.com"
+
+
+def test_get_reviews_prefers_ratings_and_check_availability_prefers_stock():
+    results = _results(
+        "Dyson V15 product page.",
+        "Dyson V15 rated 4.6 out of 5 stars from 2,310 reviews.",
+        "Dyson V15 in stock, ships today with free delivery.",
+    )
+    assert rerank(results, "Dyson V15", "get_reviews", k=1)[0]["url"] == "https://r1.com"
+    assert rerank(results, "Dyson V15", "check_availability", k=1)[0]["url"] == "https://r2.com"
+
+
+def test_ties_keep_tavily_order():
+    results = _results("alpha", "beta", "gamma")
+    assert [r["url"] for r in rerank(results, "unrelated", "unknown_tool", k=3)] == [
+        "https://r0.com", "https://r1.com", "https://r2.com",
+    ]
+
+
+def test_format_results_reranks_when_given_a_query(monkeypatch):
+    monkeypatch.setattr(_client, "_reranks", _client.RerankStats())
+    results = _results(
+        "Pixel 8 launch event recap.",
+        "Pixel 8 camera sample gallery.",
+        "Pixel 8 in stock at Best Buy, store pickup available now.",
+    )
+    text = _client.format_results(results, 1, tool="check_availability", query="Pixel 8")
+    assert "in stock at Best Buy" in text
+    assert _client.get_rerank_stats().stats() == {"calls": 1, "candidates": 3, "promoted": 1}
+
+
+def test_rerank_disabled_keeps_order(monkeypatch):
+    monkeypatch.setenv("RERANK_CANDIDATES", "0")
+    results = _results("first", "second $10")
+    assert _client.rank_results(results, 1, "compare_prices", "x") == results[:1]
@@ -0,0 +1,220 @@
+import asyncio
+
+import httpx
+import pytest
+
+from pricewise.api.admission import AdmissionController, is_rate_limit
+from pricewise.api.events import SessionEvents, frame_id
+from pricewise.api.routes import _stream_agent
+from pricewise.api.runs import RunInProgress, RunManager, RunOutcome
+from pricewise.api.streaming import SSEEncoder
+
+
+def _frames(events, names, delay=0.0, gate: asyncio.Event | None = None):
+    encoder = SSEEncoder(window_ms=0, max_bytes=0, next_id=events.next_id)
+
+    async def frames():
+        for name in names:
+            if gate is not None:
+                await gate.wait()
+            if delay:
+                await asyncio.sleep(delay)
+            yield encoder.event(name, {})
+
+    return frames()
+
+
+def _names(frames):
+    return [f.split("\n")[1].removeprefix("event: ") for f in frames]
+
+
+@pytest.mark.asyncio
+async def test_run_completes_and_reports_status():
+    manager = RunManager()
+    events = SessionEvents()
+    run = manager.start("s", events, _frames(events, ["token", "done"]))
+    assert run.status == "queued"
+    await run.task
+    assert run.status == "completed"
+    assert run.to_dict()["last_event_id"] == 2
+    assert manager.stats()["completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_several_clients_attach_to_one_run():
+    manager = RunManager()
+    events = SessionEvents()
+    run = manager.start("s", events, _frames(events, ["token", "tool_call", "done"], delay=0.001))
+
+    async def attach():
+        return [f async for f in events.follow(run.first_event_id, run)]
+
+    first, second = await asyncio.gather(attach(), attach())
+    assert first == second
+    assert _names(first) == ["token", "tool_call", "done"]
+
+
+@pytest.mark.asyncio
+async def test_follow_one_run_skips_other_runs_of_the_session():
+    manager = RunManager()
+    events = SessionEvents()
+    first = manager.start("s", events, _frames(events, ["token", "done"], delay=0.002))
+    await first.task
+    second = manager.start("s", events, _frames(events, ["receipt", "done"], delay=0.002))
+    frames = [f async for f in events.follow(first.first_event_id, second)]
+    assert _names(frames) == ["receipt", "done"]
+
+
+@pytest.mark.asyncio
+async def test_cancel_tells_attached_clients():
+    manager = RunManager()
+    events = SessionEvents()
+    gate = asyncio.Event()
+    run = manager.start("s", events, _frames(events, ["token", "done"], gate=gate))
+    await asyncio.sleep(0)
+    assert run.status == "running"
+
+    follower = asyncio.create_task(_collect_run(events, run))
+    await asyncio.sleep(0)
+    manager.cancel(run.id)
+    frames = await follower
+    assert run.status == "cancelled"
+    assert _names(frames) == ["cancelled", "done"]
+    assert not events.active
+
+
+@pytest.mark.asyncio
+async def test_cancel_all_waits_for_runs_to_wind_down():
+    manager = RunManager()
+    closed = []
+
+    async def frames():
+        try:
+            await asyncio.Event().wait()
+            yield ""
+        finally:
+            await asyncio.sleep(0.01)  # e.g. a last checkpoint write
+            closed.append(True)
+
+    runs = [manager.start(s, SessionEvents(), frames()) for s in ("a", "b")]
+    await asyncio.sleep(0)
+    await manager.cancel_all()
+    assert [run.status for run in runs] == ["cancelled", "cancelled"]
+    assert closed == [True, True]
+
+
+async def _collect_run(events, run):
+    return [f async for f in events.follow(run.first_event_id, run)]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_queues_runs():
+    manager = RunManager(AdmissionController(min_limit=1, max_limit=1))
+    events = SessionEvents()
+    gate = asyncio.Event()
+    first = manager.start("a", events, _frames(events, ["done"], gate=gate))
+    second = manager.start("b", events, _frames(events, ["done"]))
+    await asyncio.sleep(0.01)
+    assert (first.status, second.status) == ("running", "queued")
+    assert manager.stats()["queued"] == 1
+
+    gate.set()
+    await asyncio.gather(first.task, second.task)
+    assert second.status == "completed"
+    frames = [f async for f in events.follow(second.first_event_id, second)]
+    assert _names(frames)[0] == "queued"
+    assert '"position": 1' in frames[0]
+
+
+@pytest.mark.asyncio
+async def test_idle_followers_get_keepalives():
+    manager = RunManager()
+    events = SessionEvents(heartbeat=0.01)
+    run = manager.start("s", events, _frames(events, ["done"], delay=0.035))
+    frames = [f async for f in events.follow(run.first_event_id, run)]
+    assert frames[0] == ": keepalive\n\n"
+    assert frame_id(frames[-1]) == 1
+
+
+def test_history_is_bounded():
+    manager = RunManager(max_history=1)
+
+    runs = []
+
+    async def main():
+        for _ in range(3):
+            events = SessionEvents()
+            runs.append(manager.start("s", events, _frames(events, ["done"])))
+            await runs[-1].task
+
+    asyncio.run(main())
+    assert manager.stats()["completed"] == 3
+    assert manager.get(runs[0].id) is None
+    assert manager.get(runs[-1].id) is runs[-1]
+
+
+class _FailingAgent:
+    def __init__(self, exc):
+        self.exc = exc
+
+    async def astream(self, *args, **kwargs):
+        raise self.exc
+        yield
+
+
+def _rate_limit_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return httpx.HTTPStatusError("Too Many Requests", request=request, response=httpx.Response(429, request=request))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("exc, rate_limited", [
+    (ValueError("No price for item 4291 on port 8429"), False),
+    (_rate_limit_error(), True),
+])
+async def test_only_rate_limit_errors_back_off_admission(exc, rate_limited):
+    manager = RunManager()
+    events = SessionEvents()
+    outcome = RunOutcome()
+    frames = _stream_agent(
+        _FailingAgent(exc), {"configurable": {"thread_id": "t"}}, None,
+        encoder=SSEEncoder(window_ms=0, max_bytes=0, next_id=events.next_id), outcome=outcome,
+    )
+
+    run = manager.start("s", events, frames, outcome=outcome)
+    await run.task
+    assert run.status == "failed"
+    assert run.outcome.rate_limited is rate_limited
+    assert manager.admission.stats()["rate_limited"] == int(rate_limited)
+
+
+def test_is_rate_limit_reads_the_status_code():
+    limited = _rate_limit_error()
+    assert is_rate_limit(limited)
+    assert not is_rate_limit(ValueError("Error 429: product 4291 not found"))
+    try:
+        try:
+            raise limited
+        except httpx.HTTPStatusError as exc:
+            raise RuntimeError("model call failed") from exc
+    except RuntimeError as wrapped:
+        assert is_rate_limit(wrapped)
+
+
+@pytest.mark.asyncio
+async def test_one_unfinished_run_per_session():
+    manager = RunManager()
+    events = SessionEvents()
+    gate = asyncio.Event()
+    first = manager.start("s", events, _frames(events, ["done"], gate=gate))
+    with pytest.raises(RunInProgress) as exc:
+        manager.start("s", events, _frames(events, ["done"]))
+    assert exc.value.run is first
+    other = manager.start("t", SessionEvents(), _frames(events, ["done"]))
+
+    gate.set()
+    await asyncio.gather(first.task, other.task)
+    again = manager.start("s", events, _frames(events, ["done"]))
+    await again.task
+    assert again.status == "completed"
+    assert manager.stats()["conflicts"] == 1
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from pricewise.tools._scheduler import ResearchScheduler
+
+
+def test_sync_run_respects_session_limit_and_streams():
+    scheduler = ResearchScheduler(global_limit=8, per_session_limit=2, item_timeout=5)
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    streamed = []
+
+    def work(item):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        return item * 10
+
+    results = scheduler.run("s1", [1, 2, 3, 4, 5], work, streamed.append, lambda item: None)
+
+    assert results == [10, 20, 30, 40, 50]
+    assert sorted(streamed) == results
+    assert peak <= 2
+
+
+def test_sync_run_times_out_slow_items():
+    scheduler = ResearchScheduler(global_limit=4, per_session_limit=4, item_timeout=0.05)
+
+    def work(item):
+        time.sleep(0.3 if item == "slow" else 0)
+        return item
+
+    results = scheduler.run("s1", ["fast", "slow"], work, lambda r: None, lambda item: f"timeout:{item}")
+
+    assert results == ["fast", "timeout:slow"]
+    assert scheduler.stats()["timed_out"] == 1
+
+
+def test_sync_deadline_starts_when_the_item_runs():
+    # One executor thread: the second item queues 0.08s behind the first and
+    # would miss its 0.1s deadline if the wait counted against it.
+    scheduler = ResearchScheduler(global_limit=1, per_session_limit=2, item_timeout=0.1)
+
+    def work(item):
+        time.sleep(0.08 if item == "first" else 0.04)
+        return item
+
+    results = scheduler.run("s1", ["first", "second"], work, lambda r: None, lambda item: f"timeout:{item}")
+
+    assert results == ["first", "second"]
+    assert scheduler.stats()["timed_out"] == 0
+
+
+def test_sync_abandoned_threads_are_counted_and_their_results_dropped():
+    scheduler = ResearchScheduler(global_limit=2, per_session_limit=2, item_timeout=0.05)
+    streamed = []
+
+    def work(item):
+        time.sleep(0.2)
+        return item
+
+    results = scheduler.run("s1", ["slow"], work, streamed.append, lambda item: f"timeout:{item}")
+
+    assert results == ["timeout:slow"]
+    stats = scheduler.stats()
+    assert (stats["abandoned"], stats["abandoned_active"]) == (1, 1)
+    time.sleep(0.25)
+    assert scheduler.stats()["abandoned_active"] == 0
+    assert streamed == ["timeout:slow"]
+
+
+@pytest.mark.asyncio
+async def test_async_run_enforces_global_limit_and_cancels():
+    scheduler = ResearchScheduler(global_limit=2, per_session_limit=2, item_timeout=0.1)
+    active = 0
+    peak = 0
+    cancelled = []
+
+    async def work(item):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            await asyncio.sleep(1 if item == "slow" else 0.01)
+            return item
+        except asyncio.CancelledError:
+            cancelled.append(item)
+            raise
+        finally:
+            active -= 1
+
+    first, second = await asyncio.gather(
+        scheduler.arun("a", ["x", "slow"], work, lambda r: None, lambda item: "partial"),
+        scheduler.arun("b", ["y", "z"], work, lambda r: None, lambda item: "partial"),
+    )
+
+    assert first == ["x", "partial"]
+    assert second == ["y", "z"]
+    assert cancelled == ["slow"]
+    assert peak <= 2
+
+
+def test_sync_deadline_holds_when_hung_items_fill_every_slot():
+    scheduler = ResearchScheduler(global_limit=8, per_session_limit=2, item_timeout=0.3)
+    release = threading.Event()
+
+    def work(item):
+        release.wait(2)
+        return item
+
+    started = time.monotonic()
+    try:
+        results = scheduler.run("s1", [1, 2, 3, 4], work, lambda r: None, lambda item: f"timeout:{item}")
+        elapsed = time.monotonic() - started
+    finally:
+        release.set()
+
+    assert elapsed < 0.6
+    assert results == ["timeout:1", "timeout:2", "timeout:3", "timeout:4"]
+    stats = scheduler.stats()
+    assert (stats["timed_out"], stats["abandoned"], stats["dropped"]) == (4, 2, 2)
@@ -0,0 +1,79 @@
+import time
+
+from pricewise.tools import _client
+from pricewise.tools._cache import SearchCache, make_cache_key, normalize_query
+from pricewise.tools.compare_prices import compare_prices
+from pricewise.tools.get_reviews import get_reviews
+
+
+def test_normalize_query():
+    assert normalize_query("  Sony WH-1000XM5   Price buy? ") == "sony wh-1000xm5 price buy"
+
+
+def test_repeated_tool_call_hits_cache(fake_tavily):
+    first = compare_prices.invoke({"product_name": "Sony WH-1000XM5"})
+    second = compare_prices.invoke({"product_name": "sony wh-1000xm5 "})
+
+    assert first == second
+    assert len(fake_tavily.calls) == 1
+    stats = _client.get_search_cache().stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_cache_is_per_tool(fake_tavily):
+    compare_prices.invoke({"product_name": "AirPods Pro"})
+    get_reviews.invoke({"product_name": "AirPods Pro"})
+    assert len(fake_tavily.calls) == 2
+
+
+def test_errors_are_not_cached(fake_tavily, monkeypatch):
+    monkeypatch.setattr(fake_tavily, "invoke", lambda q: fake_tavily.calls.append(q) or {"error": "boom"})
+    compare_prices.invoke({"product_name": "test"})
+    compare_prices.invoke({"product_name": "test"})
+    assert len(fake_tavily.calls) == 2
+
+
+def test_lru_eviction_and_ttl():
+    cache = SearchCache(max_entries=2, ttls={"compare_prices": 0.05})
+    response = {"results": [{"url": "u", "content": "c"}]}
+    for q in ("a", "b", "c"):
+        cache.set("get_reviews", make_cache_key("get_reviews", q), response)
+    assert cache.get(make_cache_key("get_reviews", "a")) is None
+    assert cache.stats()["evictions"] == 1
+
+    key = make_cache_key("compare_prices", "x")
+    cache.set("compare_prices", key, response)
+    time.sleep(0.06)
+    assert cache.get(key) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "search.db")
+    key = make_cache_key("get_reviews", "airpods review rating")
+    response = {"results": [{"url": "https://rtings.com", "content": "4.5/5"}]}
+
+    first = SearchCache(path=path)
+    first.set("get_reviews", key, response)
+    first.close()
+
+    second = SearchCache(path=path)
+    assert second.get(key) == response
+    assert second.stats()["disk_hits"] == 1
+
+
+def test_callers_get_their_own_copy(tmp_path):
+    cache = SearchCache(path=str(tmp_path / "cache.db"))
+    response = {"results": [{"url": "https://example.com", "content": "$99"}]}
+    cache.set("compare_prices", "k", response)
+    response["results"].clear()  # the caller keeps using its object
+
+    first = cache.get("k")
+    first["results"][0]["content"] = "edited in place"
+    first["results"].append({"url": "https://other.com"})
+    assert cache.get("k") == {"results": [{"url": "https://example.com", "content": "$99"}]}
+
+    restarted = SearchCache(path=str(tmp_path / "cache.db"))
+    restarted.get("k")["results"].clear()
+    assert restarted.get("k")["results"][0]["content"] == "$99"
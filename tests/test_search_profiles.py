@@ -0,0 +1,44 @@
+from pricewise.tools import _client
+from pricewise.tools._profiles import SEARCH_PROFILES, ProfileStats
+
+
+def test_profiles_push_request_shape_into_tavily(monkeypatch):
+    monkeypatch.setenv("TAVILY_API_KEY", "tvly-test")
+    monkeypatch.delenv("RERANK_CANDIDATES", raising=False)
+    coupons = _client._build_search(SEARCH_PROFILES["find_coupons"])
+    assert coupons.max_results == SEARCH_PROFILES["find_coupons"].candidates
+    assert coupons.time_range == "month"
+    assert "youtube.com" in coupons.exclude_domains
+    assert coupons.include_raw_content is False
+
+    monkeypatch.setenv("RERANK_CANDIDATES", "0")
+    product = _client._build_search(SEARCH_PROFILES["search_product"])
+    assert product.max_results == 3
+
+
+def test_profile_instances_are_built_once(monkeypatch):
+    built = []
+    monkeypatch.setattr(_client, "_tavilies", {})
+    monkeypatch.setattr(_client, "_build_search", lambda profile, name: built.append(profile) or object())
+    assert _client._get_raw_tavily("get_reviews") is _client._get_raw_tavily("get_reviews")
+    _client._get_raw_tavily("unknown_tool")
+    _client._get_raw_tavily("another_unknown_tool")
+    assert len(built) == 2
+
+
+def test_tools_with_different_profiles_do_not_share_requests(fake_tavily):
+    _client.get_tavily("find_coupons").invoke("sony headphones")
+    _client.get_tavily("check_availability").invoke("sony headphones")
+    assert len(fake_tavily.calls) == 2
+
+
+def test_payload_and_latency_recorded_per_profile(fake_tavily, monkeypatch):
+    monkeypatch.setattr(_client, "_profile_stats", ProfileStats())
+    _client.get_tavily("get_reviews").invoke("airpods review")
+    _client.get_tavily("get_reviews").invoke("airpods review")  # cache hit: no upstream request
+
+    stats = _client.get_profile_stats().stats()
+    assert stats["get_reviews"]["requests"] == 1
+    assert stats["get_reviews"]["avg_results"] == 1
+    assert stats["get_reviews"]["avg_bytes"] > 0
+    assert stats["get_reviews"]["avg_latency_ms"] >= 0
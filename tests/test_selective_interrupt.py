@@ -0,0 +1,203 @@
+import pytest
+from unittest.mock import patch
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.types import Command
+
+from pricewise.agent import build_agent
+from pricewise.middleware.selective_interrupt import (
+    ApprovalPolicy,
+    RepeatedCallRule,
+    SessionQuotaRule,
+    ToolCall,
+    TrustedToolRule,
+    get_approval_policy,
+    with_approval,
+)
+from pricewise.replay import Replay, set_replay
+from pricewise.tools.calculate_budget import calculate_budget
+from pricewise.tools.compare_prices import compare_prices
+
+
+def test_with_approval_leaves_original_untouched():
+    wrapped = with_approval(compare_prices)
+    assert wrapped.func is not compare_prices.func
+    assert wrapped.coroutine is not compare_prices.coroutine
+
+
+@pytest.mark.asyncio
+async def test_async_wrapper_denied_skips_tool(fake_tavily):
+    wrapped = with_approval(compare_prices)
+    with patch("pricewise.middleware.selective_interrupt.interrupt", return_value=False):
+        result = await wrapped.ainvoke({"product_name": "Sony WH-1000XM5"})
+    assert "denied" in result
+    assert fake_tavily.calls == []
+
+
+@pytest.mark.asyncio
+async def test_async_wrapper_approved_runs_native_coroutine(fake_tavily):
+    wrapped = with_approval(compare_prices)
+    with patch("pricewise.middleware.selective_interrupt.interrupt", return_value=True) as mock_interrupt:
+        result = await wrapped.ainvoke({"product_name": "Sony WH-1000XM5"})
+    mock_interrupt.assert_called_once_with({"tool": "compare_prices", "args": {"product_name": "Sony WH-1000XM5", "max_sources": 5}})
+    assert "$99" in result
+    assert fake_tavily.calls == ["Sony WH-1000XM5 price buy"]
+
+
+@pytest.mark.asyncio
+async def test_safe_tool_async_path():
+    result = await calculate_budget.ainvoke({"items": [{"name": "A", "price": 10.0}], "tax_rate": 0.1})
+    assert "Total: $11.00" in result
+
+
+@pytest.mark.asyncio
+async def test_cached_search_is_auto_approved(fake_tavily):
+    await compare_prices.ainvoke({"product_name": "Sony WH-1000XM5"})
+    wrapped = with_approval(compare_prices)
+    with patch("pricewise.middleware.selective_interrupt.interrupt") as mock_interrupt:
+        result = await wrapped.ainvoke({"product_name": "sony  wh-1000xm5"})
+    mock_interrupt.assert_not_called()
+    assert "$99" in result
+    assert get_approval_policy().stats()["auto_approved"]["cache_hit"] == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_call_is_auto_approved(fake_tavily):
+    policy = ApprovalPolicy([RepeatedCallRule()])
+    with patch("pricewise.middleware.selective_interrupt._policy", policy):
+        wrapped = with_approval(compare_prices)
+        with patch("pricewise.middleware.selective_interrupt.interrupt", return_value=True) as mock_interrupt:
+            await wrapped.ainvoke({"product_name": "Sony WH-1000XM5"})
+            await wrapped.ainvoke({"product_name": "Sony WH-1000XM5"})
+            await wrapped.ainvoke({"product_name": "Bose QC45"})
+    assert mock_interrupt.call_count == 2
+    stats = policy.stats()
+    assert stats["approved"] == 2
+    assert stats["auto_approved"] == {"repeated_call": 1}
+    assert stats["round_trips_avoided"] == 1
+
+
+def test_denied_call_is_not_remembered():
+    policy = ApprovalPolicy([RepeatedCallRule()])
+    call = ToolCall("scrape_url", {"url": "https://example.com"}, "t1", "t1")
+    policy.record_decision(call, False)
+    assert policy.auto_approve(call) is None
+    assert policy.stats()["denied"] == 1
+
+
+def test_approvals_are_per_thread():
+    policy = ApprovalPolicy([RepeatedCallRule()])
+    policy.record_decision(ToolCall("compare_prices", {"product_name": "A"}, "t1", "u"), True)
+    assert policy.auto_approve(ToolCall("compare_prices", {"product_name": "a"}, "t1", "u")) == "repeated_call"
+    assert policy.auto_approve(ToolCall("compare_prices", {"product_name": "A"}, "t2", "u")) is None
+
+
+def test_only_search_text_is_folded_in_call_keys():
+    policy = ApprovalPolicy([RepeatedCallRule()])
+    policy.record_decision(ToolCall("scrape_url", {"url": "https://example.com/Item?id=A"}, "t1", "t1"), True)
+    assert policy.auto_approve(ToolCall("scrape_url", {"url": "https://example.com/item?id=a"}, "t1", "t1")) is None
+    assert policy.auto_approve(ToolCall("scrape_url", {"url": "https://example.com/Item?id=A"}, "t1", "t1")) == "repeated_call"
+    assert (
+        ToolCall("compare_prices", {"product_name": "Sony  WH-1000XM5"}, "t1", "t1").key
+        == ToolCall("compare_prices", {"product_name": "sony wh-1000xm5"}, "t1", "t1").key
+    )
+
+
+def test_session_quota_covers_read_only_searches():
+    policy = ApprovalPolicy([SessionQuotaRule(2)])
+    calls = [ToolCall("get_reviews", {"product_name": str(i)}, "t1", "t1") for i in range(3)]
+    assert [policy.auto_approve(c) for c in calls] == ["session_quota", "session_quota", None]
+    assert policy.auto_approve(ToolCall("scrape_url", {"url": "x"}, "t2", "t2")) is None
+    assert policy.auto_approve(ToolCall("get_reviews", {"product_name": "x"}, "t2", "t2")) == "session_quota"
+
+
+def test_trusted_tool():
+    policy = ApprovalPolicy([TrustedToolRule()])
+    call = ToolCall("scrape_url", {"url": "https://example.com"}, "t1", "u1")
+    assert policy.auto_approve(call) is None
+    assert policy.trust("u1", "scrape_url") == {"scrape_url"}
+    assert policy.auto_approve(call) == "trusted_tool"
+    policy.trust("u1", "scrape_url", trusted=False)
+    assert policy.auto_approve(call) is None
+
+
+def test_thread_memory_is_bounded():
+    policy = ApprovalPolicy([RepeatedCallRule()], max_threads=2)
+    for thread in ("t1", "t2", "t3"):
+        policy.record_decision(ToolCall("get_reviews", {"product_name": "A"}, thread, thread), True)
+    assert policy.stats()["threads"] == 2
+    assert policy.auto_approve(ToolCall("get_reviews", {"product_name": "A"}, "t1", "t1")) is None
+
+
+def test_trusted_tools_are_bounded():
+    policy = ApprovalPolicy([TrustedToolRule()], max_threads=2)
+    for user in ("u1", "u2", "u3"):
+        policy.trust(user, "scrape_url")
+    assert policy.stats()["trusting_users"] == 2
+    assert policy.trusted_tools("u1") == set()
+    assert policy.trusted_tools("u3") == {"scrape_url"}
+
+
+def test_batched_approvals_count_as_round_trips_avoided():
+    policy = ApprovalPolicy()
+    policy.record_batch(3)
+    policy.record_batch(1)
+    assert policy.stats()["batched"] == 2
+    assert policy.stats()["round_trips_avoided"] == 2
+
+
+def test_policy_rules_from_env(monkeypatch):
+    monkeypatch.setenv("APPROVAL_AUTO_RULES", "repeated_call")
+    monkeypatch.setenv("APPROVAL_SEARCH_QUOTA", "3")
+    policy = get_approval_policy()
+    assert [rule.name for rule in policy.rules] == ["repeated_call", "session_quota"]
+
+
+def test_session_quota_can_be_listed_by_name(monkeypatch):
+    monkeypatch.setenv("APPROVAL_AUTO_RULES", "cache_hit,session_quota")
+    monkeypatch.setenv("APPROVAL_SEARCH_QUOTA", "2")
+    policy = get_approval_policy()
+    assert [rule.name for rule in policy.rules] == ["cache_hit", "session_quota"]
+    assert policy.rules[1].quota == 2
+
+
+def test_unknown_rule_names_are_rejected(monkeypatch):
+    monkeypatch.setenv("APPROVAL_AUTO_RULES", "cache_hit,cache_hits")
+    with pytest.raises(ValueError, match="cache_hits"):
+        get_approval_policy()
+
+
+async def _run(agent, input_value, config):
+    async for _ in agent.astream(input_value, config=config):
+        pass
+    return await agent.aget_state(config)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("change", ["cache_hit", "trusted_tool"])
+async def test_denial_stands_when_a_rule_matches_while_pending(fake_tavily, change):
+    replay = Replay("synthetic")
+    set_replay(replay)
+    try:
+        agent = build_agent(checkpointer=InMemorySaver(), model=replay.chat_model())
+        config = {"configurable": {"thread_id": "t1"}}
+        state = await _run(agent, {"messages": [("user", "Find the best price for the Sony headphones model 1")]}, config)
+        [pending] = state.interrupts
+        assert pending.value["tool"] == "compare_prices"
+
+        # While the user decides, the call becomes auto-approvable.
+        if change == "cache_hit":
+            await compare_prices.ainvoke(pending.value["args"])
+        else:
+            get_approval_policy().trust("t1", "compare_prices")
+        searches = len(fake_tavily.calls)
+
+        state = await _run(agent, Command(resume=False), config)
+        [result] = [m for m in state.values["messages"] if m.type == "tool"]
+        assert "denied" in result.content
+        assert "Price summary" not in result.content
+        assert len(fake_tavily.calls) == searches
+        stats = get_approval_policy().stats()
+        assert (stats["denied"], stats["pending"]) == (1, 0)
+    finally:
+        set_replay(None)
@@ -0,0 +1,135 @@
+import time
+
+import pytest
+
+from pricewise.api.sessions import MemoryBackend, SessionRegistry, SQLiteBackend
+
+
+class Checkpointer:
+    """Counts rehydration lookups; knows the threads in ``saved``."""
+
+    def __init__(self, saved=()):
+        self.saved = set(saved)
+        self.lookups = []
+
+    async def __call__(self, thread_id):
+        self.lookups.append(thread_id)
+        return {"thread_id": thread_id} if thread_id in self.saved else None
+
+
+@pytest.mark.asyncio
+async def test_created_session_is_found_without_the_checkpointer():
+    registry = SessionRegistry()
+    checkpointer = Checkpointer()
+    session = registry.create()
+    assert await registry.get(session["session_id"], checkpointer) == {"thread_id": session["session_id"]}
+    assert checkpointer.lookups == []
+    assert registry.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_ids_are_negatively_cached():
+    registry = SessionRegistry(negative_ttl=60)
+    checkpointer = Checkpointer()
+    for _ in range(3):
+        assert await registry.get("random-id", checkpointer) is None
+    assert checkpointer.lookups == ["random-id"]
+    stats = registry.stats()
+    assert stats["not_found"] == 1
+    assert stats["negative_hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_negative_cache_is_bounded():
+    registry = SessionRegistry(max_negative=2)
+    for i in range(5):
+        await registry.get(f"bot-{i}")
+    assert registry.stats()["unknown"] == 2
+
+
+@pytest.mark.asyncio
+async def test_forgotten_session_is_rehydrated_from_the_checkpointer():
+    registry = SessionRegistry(backend=MemoryBackend())
+    checkpointer = Checkpointer(saved={"old-thread"})
+    assert await registry.get("old-thread", checkpointer) == {"thread_id": "old-thread"}
+    assert await registry.get("old-thread", checkpointer) == {"thread_id": "old-thread"}
+    assert checkpointer.lookups == ["old-thread"]
+    assert registry.stats()["rehydrated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_local_cache_is_bounded_and_falls_back_to_the_backend():
+    registry = SessionRegistry(max_sessions=2)
+    ids = [registry.create()["session_id"] for _ in range(3)]
+    stats = registry.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert await registry.get(ids[0]) == {"thread_id": ids[0]}
+    assert registry.stats()["backend_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_expire():
+    registry = SessionRegistry(ttl=0.01)
+    session_id = registry.create()["session_id"]
+    time.sleep(0.02)
+    assert await registry.get(session_id, Checkpointer()) is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_shares_sessions_between_workers(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker_a = SessionRegistry(SQLiteBackend(path))
+    worker_b = SessionRegistry(SQLiteBackend(path))
+    checkpointer = Checkpointer()
+
+    session_id = worker_a.create()["session_id"]
+    assert await worker_b.get(session_id, checkpointer) == {"thread_id": session_id}
+    assert checkpointer.lookups == []
+    assert worker_b.stats()["backend_hits"] == 1
+    worker_a.close()
+    worker_b.close()
+
+
+@pytest.mark.asyncio
+async def test_local_hits_refresh_the_backend_expiry(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker_a = SessionRegistry(SQLiteBackend(path), ttl=0.2, refresh_interval=0.05)
+    worker_b = SessionRegistry(SQLiteBackend(path), ttl=0.2)
+    session_id = worker_a.create()["session_id"]
+
+    # Busy on worker A well past the ttl, answered from A's own cache.
+    for _ in range(6):
+        time.sleep(0.06)
+        assert await worker_a.get(session_id) is not None
+    assert worker_a.stats()["refreshes"] >= 3
+    assert await worker_b.get(session_id) == {"thread_id": session_id}
+    worker_a.close()
+    worker_b.close()
+
+
+@pytest.mark.asyncio
+async def test_refresh_restores_a_session_the_backend_dropped():
+    backend = MemoryBackend()
+    registry = SessionRegistry(backend, refresh_interval=0)
+    session_id = registry.create()["session_id"]
+    backend.delete(session_id)
+    await registry.get(session_id)
+    assert backend.get(session_id) == {"thread_id": session_id}
+
+
+@pytest.mark.asyncio
+async def test_rehydration_errors_are_not_negatively_cached():
+    registry = SessionRegistry()
+    calls = []
+
+    async def flaky(thread_id):
+        calls.append(thread_id)
+        if len(calls) == 1:
+            raise ConnectionError("checkpointer unavailable")
+        return {"thread_id": thread_id}
+
+    with pytest.raises(ConnectionError):
+        await registry.get("t1", flaky)
+    assert await registry.get("t1", flaky) == {"thread_id": "t1"}
+    assert registry.stats()["unknown"] == 0
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pricewise.tools import _client
+from pricewise.tools._singleflight import SingleFlight
+
+
+def test_concurrent_sync_queries_share_one_call(fake_tavily):
+    fake_tavily.delay = 0.1
+    search = _client.get_tavily("compare_prices")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda _: search.invoke("Sony WH-1000XM5 price buy"), range(8)))
+
+    assert len(fake_tavily.calls) == 1
+    assert all(r == responses[0] and r is not responses[0] for r in responses[1:])
+    assert _client.get_singleflight().stats()["saved_calls"] == 7
+
+
+@pytest.mark.asyncio
+async def test_concurrent_async_queries_share_one_call(fake_tavily):
+    fake_tavily.delay = 0.05
+    queries = ["AirPods Pro review rating", "airpods pro  review rating?"]
+    responses = await asyncio.gather(
+        *(_client.get_tavily("get_reviews").ainvoke(queries[i % 2]) for i in range(6))
+    )
+
+    assert len(fake_tavily.calls) == 1
+    assert all(r == responses[0] and r is not responses[0] for r in responses[1:])
+    assert _client.get_singleflight().stats()["saved_calls"] == 5
+
+
+def test_mutating_a_coalesced_response_is_invisible_to_other_callers(fake_tavily):
+    fake_tavily.delay = 0.1
+    search = _client.get_tavily("compare_prices")
+    barrier = threading.Barrier(4)
+
+    def call(_):
+        response = search.invoke("Sony WH-1000XM5 price buy")
+        original = response["results"][0]["content"]
+        response["results"][0]["content"] = "tampered"
+        barrier.wait()  # every caller has mutated its copy before anyone checks
+        return original, search.invoke("Sony WH-1000XM5 price buy")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        outcomes = list(pool.map(call, range(4)))
+
+    assert len(fake_tavily.calls) == 1
+    for original, again in outcomes:
+        assert original != "tampered"
+        assert again["results"][0]["content"] == original
+
+
+def test_leader_error_propagates_to_waiters():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait()
+        raise ValueError("upstream down")
+
+    errors = []
+
+    def call():
+        try:
+            flights.do("k", failing)
+        except ValueError as exc:
+            errors.append(exc)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    waiter = threading.Thread(target=call)
+    waiter.start()
+    while flights.stats()["saved_calls"] < 1:
+        pass
+    release.set()
+    leader.join()
+    waiter.join()
+
+    assert len(errors) == 2
+    assert flights.stats()["in_flight"] == 0
@@ -1,4 +1,11 @@
-from pricewise.api.streaming import format_sse_event
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from pricewise.api.routes import _stream_agent
+from pricewise.api.streaming import SSEEncoder, format_sse_event
 
 
 def test_format_token_event():
@@ -22,3 +29,124 @@ def test_format_error_event():
     result = format_sse_event("error", {"message": "Something went wrong"})
     assert "error" in result
     assert "Something went wrong" in result
+
+
+class _FakeState:
+    next = ()
+    tasks = ()
+    values = {}
+
+
+class _FakeAgent:
+    """Minimal stand-in for the compiled graph that replays stream chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def astream(self, input_value, config=None, stream_mode=None):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def aget_state(self, config):
+        return _FakeState()
+
+
+@pytest.mark.asyncio
+async def test_custom_stream_events_become_sse_events():
+    agent = _FakeAgent([
+        ("custom", {"event": "research_result", "product": "laptop", "completed": 1, "total": 2}),
+    ])
+    events = [e async for e in _stream_agent(agent, {"configurable": {"thread_id": "t"}}, None)]
+
+    assert events[0] == format_sse_event("research_result", {"product": "laptop", "completed": 1, "total": 2})
+    assert events[-1] == format_sse_event("done", {})
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_encoder_merges_tokens_within_window():
+    clock = _Clock()
+    encoder = SSEEncoder(window_ms=20, max_bytes=0, clock=clock)
+    assert encoder.token("Hel") == ""
+    clock.now = 0.01
+    assert encoder.token("lo") == ""
+    clock.now = 0.025
+    assert encoder.token(" world") == format_sse_event("token", {"content": "Hello world"})
+    assert encoder.flush() == ""
+
+
+def test_encoder_flushes_at_byte_limit():
+    encoder = SSEEncoder(window_ms=0, max_bytes=8)
+    assert encoder.token("abcd") == ""
+    assert encoder.token("efgh") == format_sse_event("token", {"content": "abcdefgh"})
+
+
+def test_control_events_flush_held_tokens_first():
+    encoder = SSEEncoder(window_ms=1000, max_bytes=0)
+    encoder.token("Checking ")
+    encoder.token("prices")
+    frame = encoder.event("approval_required", {"tool_calls": []})
+    assert frame == (
+        format_sse_event("token", {"content": "Checking prices"})
+        + format_sse_event("approval_required", {"tool_calls": []})
+    )
+
+
+def test_encoder_without_coalescing_sends_every_token():
+    encoder = SSEEncoder(window_ms=0, max_bytes=0)
+    assert encoder.token("a") == format_sse_event("token", {"content": "a"})
+
+
+@pytest.mark.asyncio
+async def test_stream_coalesces_token_chunks():
+    agent = _FakeAgent([("messages", (AIMessageChunk(content=c), {})) for c in ("Hel", "lo", "!")])
+    encoder = SSEEncoder(window_ms=1000, max_bytes=0)
+    events = [e async for e in _stream_agent(agent, {"configurable": {"thread_id": "t"}}, None, encoder=encoder)]
+
+    assert events == [format_sse_event("token", {"content": "Hello!"}) + format_sse_event("done", {})]
+
+
+class _StallingAgent(_FakeAgent):
+    """Pauses ``stall`` seconds before each chunk after the first."""
+
+    def __init__(self, chunks, stall):
+        super().__init__(chunks)
+        self.stall = stall
+
+    async def astream(self, input_value, config=None, stream_mode=None):
+        for i, chunk in enumerate(self.chunks):
+            if i:
+                await asyncio.sleep(self.stall)
+            yield chunk
+
+
+@pytest.mark.asyncio
+async def test_held_tokens_are_sent_when_the_model_stalls():
+    agent = _StallingAgent([("messages", (AIMessageChunk(content=c), {})) for c in ("Hel", "lo")], stall=0.3)
+    encoder = SSEEncoder(window_ms=20, max_bytes=0)
+    start = time.perf_counter()
+    received = []
+    async for event in _stream_agent(agent, {"configurable": {"thread_id": "t"}}, None, encoder=encoder):
+        received.append((time.perf_counter() - start, event))
+
+    assert received[0][1] == format_sse_event("token", {"content": "Hel"})
+    assert received[0][0] < 0.2  # not held until "lo" arrives at 0.3s
+    assert received[1][1] == format_sse_event("token", {"content": "lo"}) + format_sse_event("done", {})
+
+
+@pytest.mark.asyncio
+async def test_paced_stream_reraises_errors():
+    async def failing():
+        yield "messages", (AIMessageChunk(content="a"), {})
+        raise RuntimeError("provider down")
+
+    encoder = SSEEncoder(window_ms=20, max_bytes=0)
+    with pytest.raises(RuntimeError, match="provider down"):
+        async for _ in encoder.paced(failing()):
+            pass
@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import AsyncMock
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from pricewise.middleware.context_budget import ContextBudget
+from pricewise.middleware.summarization import create_summarization_hook
+from pricewise.middleware.tool_eviction import ToolEvictor, digest
+
+PAGE = (
+    "1. Sony WH-1000XM5 now $328.00 at Best Buy, was $399.99. Rated 4.7 out of 5 from 2,310 reviews. In stock.\n"
+    "   URL: https://www.bestbuy.com/site/sony-wh1000xm5\n\n"
+    "2. Amazon lists the WH-1000XM5 at $329.99 with code SAVE20NOW at checkout.\n"
+    "   URL: https://www.amazon.com/dp/B09XS7JWHH\n\n"
+) + "Filler copy about noise cancelling and comfort. " * 60
+
+
+def _turn(i, content=PAGE):
+    call_id = f"call_{i}"
+    return [
+        HumanMessage(content=f"price check {i}", id=f"h{i}"),
+        AIMessage(content="", tool_calls=[{"name": "compare_prices", "args": {"product_name": "xm5"}, "id": call_id}], id=f"a{i}"),
+        ToolMessage(content=content, tool_call_id=call_id, name="compare_prices", id=f"t{i}"),
+        AIMessage(content=f"Best price {i}: $328 at Best Buy.", id=f"r{i}"),
+    ]
+
+
+def test_digest_keeps_prices_ratings_codes_and_urls():
+    text = digest("compare_prices", PAGE)
+    assert text.startswith("[compare_prices output digested")
+    assert "$328.00" in text and "$329.99" in text
+    assert "4.7 out of 5" in text
+    assert "In stock" in text
+    assert "SAVE20NOW" in text
+    assert "https://www.amazon.com/dp/B09XS7JWHH" in text
+    assert "Filler" not in text
+    assert len(text) < len(PAGE) / 5
+
+
+def test_old_outputs_are_digested_and_current_step_kept():
+    evictor = ToolEvictor()
+    messages = [*_turn(0), *_turn(1)[:3]]  # second tool result not yet seen by the model
+    out = evictor.evict(messages)
+
+    assert out[2].content.startswith("[compare_prices output digested")
+    assert out[2].tool_call_id == "call_0"
+    assert out[6] is messages[6]
+    assert [type(m) for m in out] == [type(m) for m in messages]
+    assert evictor.stats()["evicted"] == 1
+
+
+def test_small_outputs_and_repeat_calls_are_not_redone():
+    evictor = ToolEvictor()
+    messages = [*_turn(0, content="Added to wishlist."), *_turn(1), HumanMessage(content="next")]
+    first = evictor.evict(messages)
+    assert first[2] is messages[2]
+    again = evictor.evict(messages)
+    assert again[6] is first[6]
+    assert evictor.stats()["evicted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_eviction_keeps_the_summarizer_from_running():
+    messages = []
+    for i in range(4):
+        messages += _turn(i)
+    messages.append(HumanMessage(content="and the cheapest?", id="h_last"))
+    budget = ContextBudget.from_total(2000)
+
+    model = AsyncMock()
+    model.ainvoke.return_value = AIMessage(content="summary")
+    evicting = create_summarization_hook(model, budget=budget)
+    result = await evicting({"messages": messages})
+    model.ainvoke.assert_not_called()
+    assert "summary" not in result
+    assert len(result["llm_input_messages"]) == len(messages)
+
+    plain = create_summarization_hook(model, budget=budget, evict_tools=False)
+    await plain({"messages": messages})
+    model.ainvoke.assert_called_once()